@@ -1,16 +1,16 @@
 import streamlit as st
 import os
-import json
 from datetime import datetime
 from typing import Dict
 import pandas as pd
-from io import BytesIO
 import base64
-import time
-import requests
+import asyncio
+import json
+import tempfile
+from collections import OrderedDict
+from io import BytesIO
 import matplotlib.pyplot as plt
 import numpy as np
-from bs4 import BeautifulSoup
 
 # Configuración de página
 st.set_page_config(
@@ -22,469 +22,143 @@ st.set_page_config(
 
 # Imports para funcionalidades
 from dotenv import load_dotenv
-from openai import OpenAI  # Debe ser openai>=1.0
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_community.vectorstores import Chroma
-from langchain.chains import RetrievalQA
-from langchain.schema import Document
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
+
+from wcag.evaluator import WCAGEvaluator
+from wcag.html_features import STREAM_CHUNK_SIZE
+from wcag.llm import DEFAULT_LLM_CONCURRENCY, DEFAULT_TOKENS_PER_MINUTE
+from wcag.rate_limit import get_rate_limiter
+from wcag.report import ReportGenerator, SiteReportBuilder
+from wcag.result_cache import get_result_cache, hash_content
+from wcag.scraper import RobustWebScraper
+from wcag.templates import SiteTemplates
+from wcag.tracing import ENABLED as TRACING_ENABLED, collect, serve_metrics_from_env
 
 # Cargar variables de entorno
 load_dotenv()
+# Totales por etapa en formato Prometheus si se define WCAG_METRICS_PORT (una vez por proceso)
+serve_metrics_from_env()
 
-# --- CACHÉ DEL VECTORSTORE ---
-@st.cache_resource
-def create_wcag_vectorstore():
-    """Crear y cachear la base de conocimiento WCAG 2.1"""
-    wcag_guidelines = [
-        Document(page_content="""
-        WCAG 2.1 Nivel A - Requisitos básicos:
-        1.1.1 Contenido no textual: Todo contenido no textual debe tener alternativas textuales
-        1.2.1 Audio y video pregrabado: Proporcionar alternativas para medios basados en tiempo
-        1.3.1 Información y relaciones: La información debe ser programáticamente determinable
-        1.4.1 Uso del color: El color no debe ser el único medio visual para transmitir información
-        2.1.1 Teclado: Toda funcionalidad debe estar disponible desde teclado
-        2.1.2 Sin trampas de teclado: El foco del teclado no debe quedar atrapado
-        2.2.1 Tiempo ajustable: Permitir al usuario desactivar, ajustar o extender límites de tiempo
-        2.2.2 Pausar, detener, ocultar: Permitir control sobre contenido en movimiento
-        3.1.1 Idioma de la página: El idioma principal debe estar programáticamente determinado
-        3.2.1 Al recibir el foco: Los componentes no deben causar cambios de contexto inesperados
-        3.2.2 Al recibir entradas: Cambiar configuraciones no debe causar cambios de contexto inesperados
-        3.3.1 Identificación de errores: Los errores deben identificarse y describirse al usuario
-        4.1.1 Procesamiento: El contenido debe poder ser interpretado por tecnologías de asistencia
-        4.1.2 Nombre, función, valor: Los componentes UI deben tener nombres y funciones programáticamente determinables
-        """),
-        Document(page_content="""
-        WCAG 2.1 Nivel AA - Requisitos estándar:
-        1.2.4 Subtítulos en directo: Proporcionar subtítulos para contenido de audio en directo
-        1.2.5 Audiodescripción pregrabada: Proporcionar audiodescripción para video pregrabado
-        1.3.4 Orientación: El contenido no debe restringirse a una sola orientación de pantalla
-        1.3.5 Identificar el propósito de entrada: El propósito de los campos debe ser programáticamente determinable
-        1.4.3 Contraste mínimo: Relación de contraste de al menos 4.5:1 para texto normal
-        1.4.4 Cambio de tamaño del texto: El texto debe poder redimensionarse hasta 200% sin pérdida de funcionalidad
-        1.4.5 Imágenes de texto: Evitar usar imágenes de texto excepto cuando es esencial
-        1.4.10 Reflow: El contenido debe presentarse sin scroll horizontal a 320px de ancho
-        1.4.11 Contraste de elementos no textuales: Contraste de 3:1 para componentes UI y objetos gráficos
-        1.4.12 Espaciado del texto: No debe haber pérdida de contenido o funcionalidad al ajustar espaciado
-        1.4.13 Contenido en hover o focus: El contenido adicional debe ser descartable, hoverable y persistente
-        2.1.4 Atajos de teclado de caracteres: Permitir desactivar o reasignar atajos de una sola tecla
-        2.4.3 Orden del foco: El orden de navegación debe ser lógico y significativo
-        2.4.6 Encabezados y etiquetas: Los encabezados y etiquetas deben describir el tema o propósito
-        2.4.7 Foco visible: Cualquier interfaz operable por teclado debe tener un indicador de foco visible
-        2.5.1 Gestos del puntero: Toda funcionalidad que use gestos multipunto debe tener alternativa de punto único
-        2.5.2 Cancelación del puntero: Para funcionalidad operada por puntero, debe permitirse cancelación
-        2.5.3 Etiqueta en nombre: El nombre accesible debe contener el texto visible de la etiqueta
-        2.5.4 Activación por movimiento: La funcionalidad por movimiento debe tener alternativas y poder desactivarse
-        3.1.2 Idioma de las partes: El idioma de cada pasaje debe estar programáticamente determinado
-        3.2.3 Navegación coherente: Los mecanismos de navegación deben ser coherentes
-        3.2.4 Identificación coherente: Los componentes con misma funcionalidad deben identificarse coherentemente
-        3.3.3 Sugerencia de error: Proporcionar sugerencias cuando se detecten errores
-        3.3.4 Prevención de errores legales/financieros/datos: Permitir revisión y corrección antes de envío
-        4.1.3 Mensajes de estado: Los mensajes de estado deben comunicarse a tecnologías de asistencia
-        """),
-        Document(page_content="""
-        WCAG 2.1 Nivel AAA - Requisitos avanzados:
-        1.2.6 Lengua de señas pregrabada: Proporcionar interpretación en lengua de señas
-        1.2.7 Audiodescripción extendida: Proporcionar audiodescripción extendida para video pregrabado
-        1.2.8 Alternativa para medios pregrabados: Proporcionar alternativa textual para medios pregrabados
-        1.2.9 Solo audio en directo: Proporcionar alternativa textual para contenido de solo audio en directo
-        1.4.6 Contraste mejorado: Relación de contraste de al menos 7:1 para texto normal
-        1.4.7 Audio de fondo bajo o nulo: Audio de fondo debe ser bajo o eliminable
-        1.4.8 Presentación visual: Permitir personalización de presentación visual del texto
-        1.4.9 Imágenes de texto sin excepción: No usar imágenes de texto excepto para logotipos
-        2.1.3 Teclado sin excepción: Toda funcionalidad debe estar disponible desde teclado sin excepciones
-        2.2.3 Sin límite de tiempo: No imponer límites de tiempo excepto para eventos en tiempo real
-        2.2.4 Interrupciones: Las interrupciones pueden ser pospuestas o suprimidas por el usuario
-        2.2.5 Reautenticación: Cuando expire una sesión, el usuario puede continuar sin pérdida de datos
-        2.2.6 Tiempos de espera: Advertir a los usuarios sobre tiempos de espera que causan pérdida de datos
-        2.3.2 Tres destellos: Las páginas no deben contener elementos que destellen más de tres veces por segundo
-        2.3.3 Animación de interacciones: Permitir desactivar animaciones no esenciales
-        2.4.8 Ubicación: Proporcionar información sobre ubicación del usuario dentro de un conjunto de páginas
-        2.4.9 Propósito del enlace solo contexto: El propósito de cada enlace debe determinarse solo por el texto del enlace
-        2.4.10 Encabezados de sección: Usar encabezados de sección para organizar contenido
-        3.1.3 Palabras inusuales: Proporcionar mecanismo para identificar definiciones de palabras inusuales
-        3.1.4 Abreviaciones: Proporcionar mecanismo para identificar la forma expandida de abreviaciones
-        3.1.5 Nivel de lectura: Cuando el texto requiera habilidad de lectura avanzada, proporcionar contenido suplementario
-        3.1.6 Pronunciación: Proporcionar mecanismo para identificar pronunciación específica de palabras
-        3.2.5 Cambio a petición: Los cambios de contexto solo deben iniciarse por petición del usuario
-        3.3.5 Ayuda contextual: Proporcionar ayuda contextual
-        3.3.6 Prevención de errores general: Permitir revisión, corrección y confirmación antes de envío
-        """)
-    ]
-    embeddings = OpenAIEmbeddings(openai_api_key=os.getenv("OPENAI_API_KEY"))
-    return Chroma.from_documents(
-        documents=wcag_guidelines,
-        embedding=embeddings,
-        collection_name="wcag_guidelines"
-    )
-
-
-class RobustWebScraper:
-    def __init__(self):
-        self.session = requests.Session()
-        self.setup_session()
-
-    def setup_session(self):
-        from fake_useragent import UserAgent
-        ua = UserAgent()
-        self.session.headers.update({
-            'User-Agent': ua.random,
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'es-ES,es;q=0.8,en-US;q=0.5,en;q=0.3',
-            'Accept-Encoding': 'gzip, deflate',
-            'DNT': '1',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Sec-Fetch-Dest': 'document',
-            'Sec-Fetch-Mode': 'navigate',
-            'Sec-Fetch-Site': 'none',
-            'Cache-Control': 'max-age=0',
-        })
-
-    def get_with_retries(self, url: str, max_retries: int = 3) -> str | None:
-        for attempt in range(max_retries):
-            try:
-                if attempt > 0:
-                    time.sleep(time.uniform(2, 5))
-                response = self.session.get(url, timeout=30)
-                if response.status_code == 200:
-                    return response.text
-                elif response.status_code == 429:
-                    wait_time = int(response.headers.get('Retry-After', 60))
-                    st.warning(f"Rate limit detectado. Esperando {wait_time} segundos...")
-                    time.sleep(wait_time)
-                    continue
-                elif response.status_code == 403:
-                    from fake_useragent import UserAgent
-                    ua = UserAgent()
-                    self.session.headers['User-Agent'] = ua.random
-                    continue
-            except Exception as e:
-                st.warning(f"Intento {attempt + 1} falló: {str(e)}")
-        return None
-
-    def scrape_with_selenium(self, url: str) -> str | None:
-        try:
-            from selenium import webdriver
-            from selenium.webdriver.chrome.options import Options
-            from selenium.webdriver.common.by import By
-            from selenium.webdriver.support.ui import WebDriverWait
-            from selenium.webdriver.support import expected_conditions as EC
-            import undetected_chromedriver as uc
-
-            options = Options()
-            options.add_argument('--headless')
-            options.add_argument('--no-sandbox')
-            options.add_argument('--disable-dev-shm-usage')
-            options.add_argument('--disable-blink-features=AutomationControlled')
-            options.add_experimental_option("excludeSwitches", ["enable-automation"])
-            options.add_experimental_option('useAutomationExtension', False)
-
-            driver = uc.Chrome(options=options)
-            driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-            driver.get(url)
-            WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(2)
-            html_content = driver.page_source
-            driver.quit()
-            return html_content
-        except Exception as e:
-            st.error(f"Error con Selenium: {str(e)}")
-            return None
-
-    def scrape_with_playwright(self, url: str) -> str | None:
-        try:
-            from playwright.sync_api import sync_playwright
-            with sync_playwright() as p:
-                browser = p.chromium.launch(headless=True)
-                context = browser.new_context(
-                    user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-                )
-                page = context.new_page()
-                page.route("**/*.{png,jpg,jpeg,gif,svg,css,woff,woff2}", lambda route: route.abort())
-                page.goto(url, wait_until='networkidle')
-                page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                page.wait_for_timeout(2000)
-                html_content = page.content()
-                browser.close()
-                return html_content
-        except Exception as e:
-            st.error(f"Error con Playwright: {str(e)}")
-            return None
-
-    def scrape_website(self, url: str) -> str | None:
-        st.info("🔍 Iniciando scraping del sitio web...")
-        content = self.get_with_retries(url)
-        if content and len(content) > 1000:
-            st.success("✅ Contenido obtenido con requests")
-            return content
-
-        st.info("🔄 Intentando con Selenium...")
-        content = self.scrape_with_selenium(url)
-        if content and len(content) > 1000:
-            st.success("✅ Contenido obtenido con Selenium")
-            return content
-
-        st.info("🔄 Intentando con Playwright...")
-        content = self.scrape_with_playwright(url)
-        if content and len(content) > 1000:
-            st.success("✅ Contenido obtenido con Playwright")
-            return content
-
-        st.error("❌ No se pudo obtener el contenido del sitio web")
-        return None
-
-
-class WCAGEvaluator:
-    def __init__(self, openai_api_key: str):
-        self.client = OpenAI(api_key=openai_api_key)  # openai>=1.0
-        self.embeddings = OpenAIEmbeddings(openai_api_key=openai_api_key)
-        self.llm = ChatOpenAI(openai_api_key=openai_api_key, model_name="gpt-4", temperature=0.1)
-        self.vectorstore = create_wcag_vectorstore()
-        self.qa_chain = RetrievalQA.from_chain_type(
-            llm=self.llm,
-            chain_type="stuff",
-            retriever=self.vectorstore.as_retriever(search_kwargs={"k": 3}),
-            return_source_documents=True
-        )
-
-    def analyze_html_accessibility(self, html_content: str) -> Dict:
-        soup = BeautifulSoup(html_content, 'html.parser')
-        analysis_data = {
-            'images': len(soup.find_all('img')),
-            'images_with_alt': len(soup.find_all('img', alt=True)),
-            'headings': [tag.name for tag in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])],
-            'links': len(soup.find_all('a')),
-            'forms': len(soup.find_all('form')),
-            'inputs': len(soup.find_all(['input', 'textarea', 'select'])),
-            'labels': len(soup.find_all('label')),
-            'lang_attr': soup.find('html', lang=True) is not None,
-            'title': soup.find('title') is not None,
-            'skip_links': len(soup.find_all('a', href=lambda x: x and x.startswith('#'))),
-            'aria_labels': len(soup.find_all(attrs={'aria-label': True})),
-            'roles': len(soup.find_all(attrs={'role': True})),
-            'contrast_issues': self._check_contrast_issues(soup),
-            'keyboard_focus': self._check_keyboard_focus(soup),
-            'semantic_structure': self._check_semantic_structure(soup)
-        }
-
-        prompt = f"""
-        Analiza la siguiente información de accesibilidad de un sitio web según los estándares WCAG 2.1:
-        Datos del análisis:
-        - Imágenes totales: {analysis_data['images']}
-        - Imágenes con alt text: {analysis_data['images_with_alt']}
-        - Estructura de encabezados: {analysis_data['headings']}
-        - Enlaces totales: {analysis_data['links']}
-        - Formularios: {analysis_data['forms']}
-        - Campos de entrada: {analysis_data['inputs']}
-        - Etiquetas: {analysis_data['labels']}
-        - Atributo lang en HTML: {analysis_data['lang_attr']}
-        - Título de página: {analysis_data['title']}
-        - Enlaces de salto: {analysis_data['skip_links']}
-        - Elementos con aria-label: {analysis_data['aria_labels']}
-        - Elementos con roles ARIA: {analysis_data['roles']}
-        Problemas detectados:
-        - Contraste: {analysis_data['contrast_issues']}
-        - Navegación por teclado: {analysis_data['keyboard_focus']}
-        - Estructura semántica: {analysis_data['semantic_structure']}
-        Proporciona:
-        1. Evaluación de conformidad WCAG 2.1 (A, AA, o AAA)
-        2. Lista de problemas específicos encontrados
-        3. Recomendaciones detalladas de mejora
-        4. Puntuación numérica del 1-100
-        Responde en formato JSON con las claves: level, score, issues, recommendations, summary
-        """
-
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "Eres un experto en accesibilidad web y WCAG 2.1. Analiza sitios web y proporciona evaluaciones detalladas."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1
-            )
-            result = json.loads(response.choices[0].message.content)
-            return result
-        except Exception as e:
-            st.error(f"Error en análisis con IA: {str(e)}")
-            return self._fallback_analysis(analysis_data)
-
-    def _check_contrast_issues(self, soup) -> list:
-        issues = []
-        elements_with_style = soup.find_all(attrs={'style': True})
-        for elem in elements_with_style:
-            style = elem.get('style', '')
-            if 'color:' in style and 'background' in style:
-                issues.append(f"Posible problema de contraste en {elem.name}")
-        return issues
-
-    def _check_keyboard_focus(self, soup) -> list:
-        issues = []
-        interactive_elements = soup.find_all(['a', 'button', 'input', 'select', 'textarea'])
-        for elem in interactive_elements:
-            if elem.get('tabindex') == '-1':
-                issues.append(f"Elemento {elem.name} excluido de navegación por teclado")
-        return issues
-
-    def _check_semantic_structure(self, soup) -> list:
-        issues = []
-        headings = soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
-        if not headings:
-            issues.append("No se encontraron encabezados en la página")
-        h1_count = len(soup.find_all('h1'))
-        if h1_count == 0:
-            issues.append("Falta encabezado H1 principal")
-        elif h1_count > 1:
-            issues.append("Múltiples encabezados H1 encontrados")
-        return issues
-
-    def _fallback_analysis(self, data: Dict) -> Dict:
-        score = 0
-        issues = []
-        recommendations = []
-
-        if data['images'] > 0:
-            alt_ratio = data['images_with_alt'] / data['images']
-            score += alt_ratio * 20
-            if alt_ratio < 1:
-                issues.append("Algunas imágenes no tienen texto alternativo")
-                recommendations.append("Agregar atributos alt descriptivos a todas las imágenes")
-
-        if data['lang_attr']:
-            score += 10
-        else:
-            issues.append("Falta atributo lang en elemento HTML")
-            recommendations.append("Agregar atributo lang='es' al elemento HTML")
-
-        if data['title']:
-            score += 10
-        else:
-            issues.append("Falta título de página")
-            recommendations.append("Agregar elemento <title> descriptivo")
-
-        level = "AA" if score >= 80 else "A" if score >= 60 else "No conforme"
+STREAMLIT_NOTIFIERS = {'info': st.info, 'success': st.success, 'warning': st.warning, 'error': st.error}
+# Análisis conservados en la sesión con su gráfico y su PDF; acota la memoria por sesión
+MAX_SESSION_ANALYSES = 3
+STAGE_LABELS = {
+    'fetch': 'Descarga', 'parse': 'Parseo', 'walk': 'Recorrido y reglas', 'stream': 'Parseo por fragmentos',
+    'retrieval': 'Recuperación de criterios', 'prompt': 'Construcción del prompt', 'llm': 'Modelo',
+    'pdf': 'Informe PDF', 'rule': 'Regla',
+}
+TIMING_COLUMNS = {
+    'stage': 'Etapa', 'tier': 'Nivel', 'outcome': 'Resultado', 'parser': 'Parser', 'mode': 'Modo', 'report': 'Informe',
+    'rule': 'Regla', 'calls': 'Llamadas', 'seconds': 'Segundos', 'bytes': 'Bytes', 'tokens': 'Tokens',
+    'regions_reused': 'Regiones reutilizadas', 'pages': 'Páginas',
+}
 
-        return {
-            'level': level,
-            'score': int(score),
-            'issues': issues,
-            'recommendations': recommendations,
-            'summary': f"Análisis básico completado. Puntuación: {int(score)}/100"
-        }
 
+def streamlit_notify(level: str, message: str) -> None:
+    """Mostrar en la página los avisos de los componentes de `wcag`"""
+    STREAMLIT_NOTIFIERS.get(level, st.info)(message)
 
-class ReportGenerator:
-    def __init__(self):
-        self.styles = getSampleStyleSheet()
-        self.custom_styles = self._create_custom_styles()
-
-    def _create_custom_styles(self):
-        custom_styles = {}
-        custom_styles['Title'] = ParagraphStyle(
-            'CustomTitle',
-            parent=self.styles['Heading1'],
-            fontSize=24,
-            spaceAfter=30,
-            textColor=colors.HexColor('#1f4e79'),
-            alignment=1
-        )
-        custom_styles['Subtitle'] = ParagraphStyle(
-            'CustomSubtitle',
-            parent=self.styles['Heading2'],
-            fontSize=16,
-            spaceAfter=20,
-            textColor=colors.HexColor('#2c5aa0')
-        )
-        custom_styles['Issue'] = ParagraphStyle(
-            'Issue',
-            parent=self.styles['Normal'],
-            fontSize=11,
-            leftIndent=20,
-            bulletIndent=10,
-            textColor=colors.HexColor('#d63384')
-        )
-        custom_styles['Recommendation'] = ParagraphStyle(
-            'Recommendation',
-            parent=self.styles['Normal'],
-            fontSize=11,
-            leftIndent=20,
-            bulletIndent=10,
-            textColor=colors.HexColor('#198754')
-        )
-        return custom_styles
 
-    def generate_pdf_report(self, analysis_result: Dict, url: str = None) -> BytesIO:
+@st.cache_resource
+def shared_evaluator(openai_api_key: str, offline: bool) -> WCAGEvaluator:
+    """Evaluador compartido por todas las sesiones y reruns (uno por API key y modo)"""
+    # La clave no incluye `streamlit_notify`: se redefine en cada rerun del script
+    return WCAGEvaluator(openai_api_key, offline=offline, notify=streamlit_notify)
+
+
+def display_analysis_data(analysis_data: Dict, container):
+    """Métricas deterministas del DOM; se muestran antes de que responda el modelo"""
+    with container:
+        st.subheader("🔎 Métricas de la página")
+        cols = st.columns(6)
+        cols[0].metric("Imágenes con alt", f"{analysis_data['images_with_alt']}/{analysis_data['images']}")
+        cols[1].metric("Encabezados", len(analysis_data['headings']))
+        cols[2].metric("Enlaces", analysis_data['links'])
+        cols[3].metric("Campos / etiquetas", f"{analysis_data['inputs']}/{analysis_data['labels']}")
+        cols[4].metric("Avisos de contraste", len(analysis_data['contrast_issues']))
+        cols[5].metric("Fuera del foco", len(analysis_data['keyboard_focus']))
+        for issue in analysis_data['semantic_structure']:
+            st.warning(issue)
+
+
+def display_partial_result(partial: Dict, placeholder):
+    """Vista provisional de la evaluación mientras llegan los tokens del modelo"""
+    with placeholder.container():
+        st.caption("✍️ Generando evaluación...")
+        col1, col2 = st.columns(2)
+        col1.metric("Puntuación General", f"{partial['score']}/100" if 'score' in partial else "…")
+        col2.metric("Nivel WCAG 2.1", partial.get('level') or "…")
+        if partial.get('summary'):
+            st.info(partial['summary'])
+        for i, issue in enumerate(partial.get('issues') or [], 1):
+            st.error(f"**{i}.** {issue}")
+        for i, rec in enumerate(partial.get('recommendations') or [], 1):
+            st.info(f"**{i}.** {rec}")
+
+
+def live_callbacks() -> tuple[Dict, object]:
+    """Callbacks para mostrar métricas y resultado parcial; devuelve también el área provisional"""
+    features_area = st.container()
+    live_area = st.empty()
+    callbacks = {
+        'on_analysis_data': lambda analysis_data: display_analysis_data(analysis_data, features_area),
+        'on_partial': lambda partial: display_partial_result(partial, live_area),
+    }
+    return callbacks, live_area
+
+
+def remember_analysis(mode: str, analysis_result: Dict, url: str = None, timings: list = None) -> None:
+    """Guardar el resultado en session_state para que sobreviva a los reruns (descargas, pestañas)"""
+    key = hash_content(json.dumps([url, analysis_result], sort_keys=True, ensure_ascii=False, default=str))
+    analyses = st.session_state.setdefault('analyses', OrderedDict())
+    if key not in analyses:
+        analyses[key] = {'result': analysis_result, 'url': url, 'analyzed_at': datetime.now(), 'chart': None, 'pdf': None}
+    # Los tiempos son los de esta ejecución aunque el resultado se repita
+    analyses[key]['timings'] = timings or []
+    analyses.move_to_end(key)
+    while len(analyses) > MAX_SESSION_ANALYSES:
+        analyses.popitem(last=False)
+    st.session_state.setdefault('current_analysis', {})[mode] = key
+    st.session_state['analysis_result'] = analysis_result
+
+
+def current_analysis(mode: str) -> Dict | None:
+    key = st.session_state.get('current_analysis', {}).get(mode)
+    return st.session_state.get('analyses', {}).get(key)
+
+
+def conformance_chart(score: int, level: str) -> bytes:
+    """Gráfico de conformidad en PNG; la figura se cierra para no acumularla en pyplot"""
+    fig, ax = plt.subplots(figsize=(6, 6))
+    try:
+        values = [score, 100 - score]
+        colors_chart = ['#28a745', '#dc3545']
+        ax.pie(values, labels=['Conforme', 'No Conforme'], autopct='%1.1f%%', colors=colors_chart, startangle=90, wedgeprops=dict(width=0.5))
+        ax.set_title(f'Nivel de Conformidad WCAG 2.1\n({level})', fontsize=14, fontweight='bold')
         buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
-        story = []
-
-        story.append(Paragraph("Reporte de Accesibilidad Web WCAG 2.1", self.custom_styles['Title']))
-        story.append(Spacer(1, 20))
-
-        if url:
-            story.append(Paragraph(f"<b>URL analizada:</b> {url}", self.styles['Normal']))
-        story.append(Paragraph(f"<b>Fecha del análisis:</b> {datetime.now().strftime('%d/%m/%Y %H:%M')}", self.styles['Normal']))
-        story.append(Paragraph(f"<b>Nivel de conformidad:</b> {analysis_result.get('level', 'No determinado')}", self.styles['Normal']))
-        story.append(Paragraph(f"<b>Puntuación:</b> {analysis_result.get('score', 0)}/100", self.styles['Normal']))
-        story.append(Spacer(1, 30))
-
-        story.append(Paragraph("Resumen Ejecutivo", self.custom_styles['Subtitle']))
-        story.append(Paragraph(analysis_result.get('summary', 'No disponible'), self.styles['Normal']))
-        story.append(Spacer(1, 20))
+        fig.savefig(buffer, format='png', bbox_inches='tight')
+    finally:
+        plt.close(fig)
+    return buffer.getvalue()
+
+
+def show_analysis(entry: Dict, file_prefix: str):
+    """Resultados y descarga del PDF; el gráfico y el PDF se generan una vez por resultado"""
+    if entry['pdf'] is None:
+        # Antes de mostrar los resultados, para que su tiempo figure ya en el desglose
+        with collect() as trace:
+            entry['pdf'] = ReportGenerator().generate_pdf_report(entry['result'], entry['url']).getvalue()
+        entry['timings'] = entry.get('timings', []) + trace.breakdown()
+    display_results(entry)
+    st.download_button(
+        label="📥 Descargar Reporte PDF",
+        data=entry['pdf'],
+        file_name=f"{file_prefix}_{entry['analyzed_at'].strftime('%Y%m%d_%H%M%S')}.pdf",
+        mime="application/pdf"
+    )
 
-        story.append(Paragraph("Problemas Identificados", self.custom_styles['Subtitle']))
-        issues = analysis_result.get('issues', [])
-        if issues:
-            for issue in issues:
-                story.append(Paragraph(f"• {issue}", self.custom_styles['Issue']))
-        else:
-            story.append(Paragraph("No se identificaron problemas específicos.", self.styles['Normal']))
-        story.append(Spacer(1, 20))
 
-        story.append(Paragraph("Recomendaciones de Mejora", self.custom_styles['Subtitle']))
-        recommendations = analysis_result.get('recommendations', [])
-        if recommendations:
-            for rec in recommendations:
-                story.append(Paragraph(f"• {rec}", self.custom_styles['Recommendation']))
-        else:
-            story.append(Paragraph("No se generaron recomendaciones específicas.", self.styles['Normal']))
-        story.append(Spacer(1, 30))
-
-        story.append(Paragraph("Criterios WCAG 2.1 Evaluados", self.custom_styles['Subtitle']))
-        table_data = [
-            ['Criterio', 'Nivel', 'Estado', 'Observaciones'],
-            ['1.1.1 Contenido no textual', 'A', '✓' if analysis_result.get('score', 0) > 60 else '✗', 'Texto alternativo para imágenes'],
-            ['1.4.3 Contraste mínimo', 'AA', '✓' if analysis_result.get('score', 0) > 70 else '✗', 'Contraste de colores'],
-            ['2.1.1 Teclado', 'A', '✓' if analysis_result.get('score', 0) > 60 else '✗', 'Navegación por teclado'],
-            ['3.1.1 Idioma de página', 'A', '✓' if analysis_result.get('score', 0) > 50 else '✗', 'Atributo lang definido'],
-            ['4.1.2 Nombre, función, valor', 'A', '✓' if analysis_result.get('score', 0) > 65 else '✗', 'Elementos de interfaz accesibles']
-        ]
-        table = Table(table_data)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1f4e79')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        story.append(table)
-
-        doc.build(story)
-        buffer.seek(0)
-        return buffer
-
-
-def display_results(analysis_result: Dict, url: str = None):
+def display_results(entry: Dict):
+    analysis_result, url = entry['result'], entry['url']
     st.markdown("---")
     st.subheader("📊 Resultados del Análisis")
     col1, col2, col3 = st.columns(3)
@@ -505,21 +179,25 @@ def display_results(analysis_result: Dict, url: str = None):
     with tab1:
         st.subheader("Resumen Ejecutivo")
         st.info(analysis_result.get('summary', 'No disponible'))
-        fig, ax = plt.subplots(figsize=(6, 6))
-        values = [score, 100 - score]
-        colors_chart = ['#28a745', '#dc3545']
-        ax.pie(values, labels=['Conforme', 'No Conforme'], autopct='%1.1f%%', colors=colors_chart, startangle=90, wedgeprops=dict(width=0.5))
-        ax.set_title(f'Nivel de Conformidad WCAG 2.1\n({level})', fontsize=14, fontweight='bold')
-        st.pyplot(fig)
+        if entry['chart'] is None:
+            entry['chart'] = conformance_chart(score, level)
+        st.image(entry['chart'])
 
     with tab2:
         st.subheader("Problemas Identificados")
         issues = analysis_result.get('issues', [])
+        template_issues = analysis_result.get('template_issues')
+        if template_issues is not None:
+            st.markdown("**Específicos de la página**")
         if issues:
             for i, issue in enumerate(issues, 1):
                 st.error(f"**{i}.** {issue}")
         else:
             st.success("🎉 ¡No se identificaron problemas específicos!")
+        if template_issues:
+            st.markdown("**Plantilla compartida con otras páginas**")
+            for i, issue in enumerate(template_issues, 1):
+                st.warning(f"**{i}.** {issue}")
 
     with tab3:
         st.subheader("Recomendaciones de Mejora")
@@ -542,14 +220,144 @@ def display_results(analysis_result: Dict, url: str = None):
         st.dataframe(df, use_container_width=True)
 
         tech_info = f"""
-        **Análisis realizado:** {datetime.now().strftime('%d/%m/%Y a las %H:%M:%S')}
+        **Análisis realizado:** {entry['analyzed_at'].strftime('%d/%m/%Y a las %H:%M:%S')}
         **Método de obtención:** {"Web Scraping" if url else "Código HTML directo"}
-        **Motor de IA:** GPT-4 con RAG
+        **Motor de evaluación:** {"Reglas locales (sin conexión)" if analysis_result.get('engine') == 'local' else "GPT-4 con RAG"}
         **Base de conocimiento:** WCAG 2.1 Guidelines
         **Versión de la aplicación:** 1.0.0
         """
         st.markdown(tech_info)
 
+        usage = analysis_result.get('llm_usage')
+        st.subheader("Consumo del modelo")
+        if usage:
+            usage_cols = st.columns(5)
+            usage_cols[0].metric("Tokens del prompt", f"{usage['prompt_tokens']:,}")
+            usage_cols[1].metric("Tokens de respuesta", f"{usage['completion_tokens']:,}")
+            usage_cols[2].metric("Latencia", f"{usage['latency_s']:.2f} s")
+            usage_cols[3].metric("Primer token", f"{usage['first_token_s']:.2f} s" if usage.get('first_token_s') is not None else "—")
+            usage_cols[4].metric("Coste estimado", f"${usage['cost_usd']:.4f}" if usage.get('cost_usd') is not None else "—")
+            notes = [f"Modelo: {usage['model']}"]
+            if usage.get('prompt_truncated'):
+                notes.append("prompt resumido para ajustarse al presupuesto de tokens")
+            if usage.get('cached'):
+                notes.append("resultado reutilizado de la caché; las cifras corresponden a la llamada original")
+            st.caption(" · ".join(notes))
+        else:
+            st.caption("Sin llamada al modelo: se usó el análisis básico")
+        incremental = analysis_result.get('incremental')
+        if incremental:
+            st.caption(f"♻️ Reauditoría incremental: {incremental['reused']} de {incremental['regions']} "
+                       "regiones del DOM reutilizadas de la auditoría anterior")
+        display_timings(entry.get('timings'))
+
+
+def display_timings(timings: list):
+    """Desglose por etapa de la evaluación (descarga, parseo, reglas, modelo, PDF)"""
+    st.subheader("Tiempos por etapa")
+    if not TRACING_ENABLED:
+        st.caption("Medición desactivada (WCAG_TRACING=0)")
+        return
+    if not timings:
+        st.caption("Sin tiempos registrados para este análisis")
+        return
+    df = pd.DataFrame(timings)
+    df['stage'] = df['stage'].map(lambda stage: STAGE_LABELS.get(stage, stage))
+    st.dataframe(df.rename(columns=TIMING_COLUMNS), use_container_width=True, hide_index=True)
+    # El tiempo por regla (WCAG_TRACE_RULES=1) ya está incluido en el del recorrido
+    total = sum(timing['seconds'] for timing in timings if timing['stage'] != 'rule')
+    st.caption(f"Total medido: {total:.3f} s")
+
+
+async def run_site_audit(scraper: RobustWebScraper, evaluator: WCAGEvaluator, crawl_options: Dict, on_page,
+                         llm_concurrency: int = DEFAULT_LLM_CONCURRENCY, tokens_per_minute: int = DEFAULT_TOKENS_PER_MINUTE,
+                         templates: SiteTemplates = None):
+    """Evaluar cada página en cuanto llega, sin esperar a que termine el rastreo; con `templates`
+    los componentes repetidos entre páginas se evalúan una sola vez"""
+    async with evaluator.async_stage(llm_concurrency, tokens_per_minute) as stage:
+        # Páginas descargadas a la espera de evaluación; al llenarse se deja de leer del rastreador
+        in_flight = asyncio.Semaphore(llm_concurrency * 2)
+        pending = set()
+        failures = []
+
+        async def evaluate(page):
+            try:
+                analysis_result = await evaluator.analyze_html_async(page.html, stage, page.content_hash, page.url, templates)
+            except Exception as e:
+                # Una página que no se pudo evaluar queda como fila de error y la auditoría sigue
+                on_page(page._replace(error=f"Error en la evaluación: {str(e)}"), None)
+            else:
+                on_page(page, analysis_result)
+            finally:
+                in_flight.release()
+
+        def finished(task):
+            pending.discard(task)
+            # Recuperar la excepción aquí: una tarea ya retirada de `pending` no llega al gather final
+            if not task.cancelled() and task.exception() is not None:
+                failures.append(task.exception())
+
+        async for page in scraper.crawl(**crawl_options):
+            if not page.html:
+                on_page(page, None)
+                continue
+            await in_flight.acquire()
+            task = asyncio.create_task(evaluate(page))
+            pending.add(task)
+            task.add_done_callback(finished)
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        if failures:
+            raise failures[0]
+
+
+def display_site_results(rows: list, placeholder):
+    df = pd.DataFrame(rows, columns=['URL', 'Estado', 'Puntuación', 'Nivel', 'Problemas', 'De plantilla', 'Descarga (s)'])
+    placeholder.dataframe(df, use_container_width=True)
+
+
+def display_site_audit(audit: Dict):
+    """Resultado de la última auditoría guardado en la sesión; se vuelve a mostrar en cada rerun"""
+    display_site_results(audit['rows'], st.empty())
+    display_template_summary(audit['summary'])
+    st.download_button(
+        label="📥 Descargar informe del sitio (PDF)",
+        data=audit['pdf'],
+        file_name=f"auditoria_sitio_{audit['finished_at'].strftime('%Y%m%d_%H%M%S')}.pdf",
+        mime="application/pdf"
+    )
+    usage_totals = audit['usage']
+    st.caption(
+        f"🪙 Consumo del modelo: {usage_totals['calls']} llamadas · "
+        f"{usage_totals['tokens']:,} tokens · ${usage_totals['cost_usd']:.4f} estimados"
+    )
+    if audit['throttled']:
+        st.caption("⏳ Tiempo bloqueado por límite de peticiones: " + ", ".join(
+            f"{host} {seconds:.0f} s" for host, seconds in sorted(audit['throttled'].items(), key=lambda item: -item[1])
+        ))
+
+
+def display_template_summary(summary: Dict):
+    """Problemas agrupados en plantilla compartida (una vez para todo el sitio) y específicos de cada página"""
+    st.subheader("🧩 Plantilla compartida y problemas específicos")
+    if not summary['components']:
+        st.caption("No se encontraron componentes repetidos entre las páginas auditadas")
+    else:
+        st.caption(f"{summary['components']} componentes de plantilla repetidos en {summary['pages']} páginas, "
+                   "evaluados una sola vez")
+    if summary['template_findings']:
+        st.dataframe(pd.DataFrame([
+            [f['criteria'], f['title'], f['count'], f['components'], f['pages']] for f in summary['template_findings']
+        ], columns=['Criterio', 'Problema de plantilla', 'Ocurrencias', 'Componentes', 'Páginas afectadas']),
+            use_container_width=True)
+    page_rows = [
+        [url, f['criteria'], f['title'], f['count']]
+        for url, findings in summary['page_findings'].items() for f in findings
+    ]
+    if page_rows:
+        st.dataframe(pd.DataFrame(page_rows, columns=['URL', 'Criterio', 'Problema específico de la página', 'Ocurrencias']),
+                     use_container_width=True)
+
 
 def setup_page_config():
     st.markdown("""
@@ -605,15 +413,28 @@ def main():
     with st.sidebar:
         st.header("⚙️ Configuración")
         openai_key = os.getenv('OPENAI_API_KEY')
-        if not openai_key:
-            st.error("❌ No se encontró OPENAI_API_KEY en el archivo .env")
-            st.stop()
-        st.success("✅ API Key configurada correctamente")
+        if openai_key:
+            st.success("✅ API Key configurada correctamente")
+            offline_mode = st.checkbox(
+                "Modo sin conexión (solo reglas locales)",
+                help="Evalúa con las reglas automáticas en milisegundos, sin llamadas a OpenAI"
+            )
+        else:
+            st.warning("⚠️ No se encontró OPENAI_API_KEY en el archivo .env: solo está disponible el modo sin conexión")
+            offline_mode = True
 
         st.header("📋 Opciones de Análisis")
         analysis_mode = st.radio(
             "Selecciona el modo de análisis:",
-            ["URL del sitio web", "Código HTML directo"]
+            ["URL del sitio web", "Código HTML directo", "Auditoría de sitio completo"]
+        )
+
+        st.header("🗄️ Caché de resultados")
+        cache_stats = get_result_cache().stats()
+        st.caption(
+            f"Aciertos: {cache_stats['memory_hits'] + cache_stats['disk_hits']} "
+            f"(memoria {cache_stats['memory_hits']}, disco {cache_stats['disk_hits']}) · "
+            f"Fallos: {cache_stats['misses']} · Tasa: {cache_stats['hit_rate']:.0%}"
         )
 
         st.header("📊 Niveles WCAG 2.1")
@@ -629,49 +450,149 @@ def main():
         if analysis_mode == "URL del sitio web":
             st.subheader("🔗 Análisis por URL")
             url_input = st.text_input("Ingresa la URL del sitio web a evaluar:", placeholder="https://ejemplo.com")
+            streaming_mode = st.checkbox(
+                "Modo streaming para documentos muy grandes",
+                help="Procesa la página por fragmentos con memoria acotada, sin construir el árbol DOM completo"
+            )
+            rendered_mode = st.checkbox(
+                "Usar estilos renderizados (Playwright)",
+                help="Renderiza la página y mide colores, foco visible y ajuste a 320 px con los estilos reales"
+            )
             if st.button("🚀 Iniciar Análisis", type="primary"):
                 if url_input:
-                    with st.spinner("Analizando sitio web..."):
-                        scraper = RobustWebScraper()
-                        html_content = scraper.scrape_website(url_input)
-                        if html_content:
-                            evaluator = WCAGEvaluator(openai_key)
-                            analysis_result = evaluator.analyze_html_accessibility(html_content)
-                            st.session_state['analysis_result'] = analysis_result
-                            display_results(analysis_result, url_input)
-                            report_gen = ReportGenerator()
-                            pdf_buffer = report_gen.generate_pdf_report(analysis_result, url_input)
-                            st.download_button(
-                                label="📥 Descargar Reporte PDF",
-                                data=pdf_buffer,
-                                file_name=f"reporte_accesibilidad_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                                mime="application/pdf"
-                            )
+                    with st.spinner("Analizando sitio web..."), collect() as trace:
+                        scraper = RobustWebScraper(render_styles=rendered_mode, notify=streamlit_notify)
+                        analysis_result = None
+                        callbacks, live_area = live_callbacks()
+                        chunks = scraper.stream_website(url_input) if streaming_mode and not rendered_mode else None
+                        if chunks is not None:
+                            analysis_result = shared_evaluator(openai_key, offline_mode).analyze_html_stream(chunks, **callbacks)
+                        else:
+                            html_content = scraper.scrape_website(url_input)
+                            if html_content:
+                                analysis_result = shared_evaluator(openai_key, offline_mode).analyze_html_accessibility(
+                                    html_content, scraper.last_content_hash, rendered_styles=scraper.last_rendered,
+                                    page_url=url_input, **callbacks
+                                )
+                        live_area.empty()
+                        if analysis_result:
+                            remember_analysis(analysis_mode, analysis_result, url_input, trace.breakdown())
                         else:
                             st.error("No se pudo obtener el contenido del sitio web")
                 else:
                     st.warning("Por favor, ingresa una URL válida")
+            entry = current_analysis(analysis_mode)
+            if entry is not None:
+                show_analysis(entry, "reporte_accesibilidad")
+
+        elif analysis_mode == "Auditoría de sitio completo":
+            st.subheader("🗺️ Auditoría de múltiples páginas")
+            urls_input = st.text_area("Lista de URLs (una por línea):", height=150, placeholder="https://ejemplo.com/\nhttps://ejemplo.com/contacto")
+            sitemap_input = st.text_input("URL de sitemap.xml (opcional):", placeholder="https://ejemplo.com/sitemap.xml")
+            start_input = st.text_input("URL inicial para rastrear enlaces (opcional):", placeholder="https://ejemplo.com")
+            crawl_col1, crawl_col2, crawl_col3 = st.columns(3)
+            with crawl_col1:
+                max_depth = st.number_input("Profundidad máxima", min_value=0, max_value=10, value=1)
+            with crawl_col2:
+                max_pages = st.number_input("Máximo de páginas", min_value=1, max_value=10000, value=100)
+            with crawl_col3:
+                max_concurrency = st.number_input("Descargas simultáneas", min_value=1, max_value=64, value=8)
+            llm_col1, llm_col2 = st.columns(2)
+            with llm_col1:
+                llm_concurrency = st.number_input("Evaluaciones IA simultáneas", min_value=1, max_value=32, value=DEFAULT_LLM_CONCURRENCY)
+            with llm_col2:
+                tokens_per_minute = st.number_input("Tokens por minuto (OpenAI)", min_value=1000, max_value=10_000_000,
+                                                    value=DEFAULT_TOKENS_PER_MINUTE, step=1000)
+            if st.button("🚀 Iniciar Auditoría", type="primary"):
+                urls = [line.strip() for line in urls_input.splitlines() if line.strip()]
+                if urls or sitemap_input or start_input:
+                    crawl_options = {
+                        'urls': urls,
+                        'sitemap': sitemap_input or None,
+                        'start_url': start_input or None,
+                        'max_depth': int(max_depth),
+                        'max_pages': int(max_pages),
+                        'max_concurrency': int(max_concurrency),
+                    }
+                    progress = st.progress(0.0)
+                    table = st.empty()
+                    rows = []
+                    usage_totals = {'tokens': 0, 'cost_usd': 0.0, 'calls': 0}
+                    site_report = SiteReportBuilder()
+
+                    def on_page(page, analysis_result):
+                        site_report.add(analysis_result or {'error': page.error or "Sin contenido"}, page.url)
+                        usage = (analysis_result or {}).get('llm_usage')
+                        if usage and not usage.get('cached'):
+                            usage_totals['calls'] += 1
+                            usage_totals['tokens'] += usage['total_tokens']
+                            usage_totals['cost_usd'] += usage.get('cost_usd') or 0.0
+                        rows.append([
+                            page.url,
+                            page.error or "OK",
+                            analysis_result.get('score', 0) if analysis_result else None,
+                            analysis_result.get('level', '—') if analysis_result else '—',
+                            len(analysis_result.get('issues', [])) if analysis_result else None,
+                            len(analysis_result.get('template_issues', [])) if analysis_result else None,
+                            round(page.elapsed, 2),
+                        ])
+                        progress.progress(min(1.0, len(rows) / int(max_pages)), text=f"{len(rows)} páginas evaluadas")
+                        display_site_results(rows, table)
+
+                    templates = SiteTemplates()
+                    # La auditoría anterior se descarta antes de empezar: solo se conserva una por sesión
+                    st.session_state.pop('site_audit', None)
+                    # El limitador es del proceso: se muestra solo lo bloqueado durante esta auditoría
+                    throttled_before = get_rate_limiter().report()
+                    try:
+                        asyncio.run(run_site_audit(
+                            RobustWebScraper(notify=streamlit_notify), shared_evaluator(openai_key, offline_mode), crawl_options, on_page,
+                            llm_concurrency=int(llm_concurrency), tokens_per_minute=int(tokens_per_minute), templates=templates
+                        ))
+                        progress.progress(1.0, text=f"Auditoría completada: {len(rows)} páginas")
+                        with st.spinner("Generando el informe PDF del sitio..."):
+                            report_file = tempfile.NamedTemporaryFile(suffix='.pdf', delete=False)
+                            report_file.close()
+                            site_report.write(report_file.name)
+                        with open(report_file.name, 'rb') as report_pdf:
+                            pdf = report_pdf.read()
+                        os.unlink(report_file.name)
+                        table.empty()
+                        st.session_state['site_audit'] = {
+                            'rows': rows, 'summary': templates.summary(), 'pdf': pdf, 'usage': usage_totals,
+                            'throttled': get_rate_limiter().report(since=throttled_before), 'finished_at': datetime.now(),
+                        }
+                    except Exception as e:
+                        st.error(f"Error durante la auditoría: {str(e)}")
+                    finally:
+                        site_report.close()
+                else:
+                    st.warning("Indica al menos una URL, un sitemap o una URL inicial")
+            if 'site_audit' in st.session_state:
+                display_site_audit(st.session_state['site_audit'])
 
         else:
             st.subheader("📝 Análisis de Código HTML")
             html_input = st.text_area("Pega aquí el código HTML a evaluar:", height=300, placeholder="<html>...</html>")
+            uploaded_file = st.file_uploader("O sube un archivo HTML (recomendado para documentos grandes):", type=['html', 'htm'])
             if st.button("🔍 Analizar HTML", type="primary"):
-                if html_input.strip():
-                    with st.spinner("Analizando código HTML..."):
-                        evaluator = WCAGEvaluator(openai_key)
-                        analysis_result = evaluator.analyze_html_accessibility(html_input)
-                        st.session_state['analysis_result'] = analysis_result
-                        display_results(analysis_result)
-                        report_gen = ReportGenerator()
-                        pdf_buffer = report_gen.generate_pdf_report(analysis_result)
-                        st.download_button(
-                            label="📥 Descargar Reporte PDF",
-                            data=pdf_buffer,
-                            file_name=f"reporte_accesibilidad_html_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                            mime="application/pdf"
-                        )
+                if uploaded_file is not None or html_input.strip():
+                    with st.spinner("Analizando código HTML..."), collect() as trace:
+                        evaluator = shared_evaluator(openai_key, offline_mode)
+                        callbacks, live_area = live_callbacks()
+                        if uploaded_file is not None:
+                            # El archivo se procesa por fragmentos en lugar de copiarse al área de texto
+                            chunks = iter(lambda: uploaded_file.read(STREAM_CHUNK_SIZE), b'')
+                            analysis_result = evaluator.analyze_html_stream(chunks, **callbacks)
+                        else:
+                            analysis_result = evaluator.analyze_html_accessibility(html_input, **callbacks)
+                        live_area.empty()
+                        remember_analysis(analysis_mode, analysis_result, timings=trace.breakdown())
                 else:
                     st.warning("Por favor, ingresa código HTML válido")
+            entry = current_analysis(analysis_mode)
+            if entry is not None:
+                show_analysis(entry, "reporte_accesibilidad_html")
 
     with col2:
         st.subheader("ℹ️ Información")
@@ -0,0 +1,71 @@
+"""Medir la latencia de preparación del evaluador por petición: antes y después de compartirlo.
+
+"Antes" reproduce lo que hacía main() en cada clic: crear el cliente de OpenAI, OpenAIEmbeddings,
+ChatOpenAI y la cadena RetrievalQA sobre el vectorstore ya cacheado. "Después" obtiene el
+evaluador compartido con get_evaluator(). Ninguna de las dos variantes hace llamadas de red:
+el vectorstore se sustituye por uno en memoria sin documentos.
+
+Uso:
+    python -m benchmarks.bench_evaluator_setup --requests 50
+"""
+import argparse
+import statistics
+import time
+
+FAKE_KEY = "sk-benchmark"
+
+
+def legacy_setup(vectorstore):
+    from langchain.chains import RetrievalQA
+    from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+    from openai import OpenAI
+
+    OpenAI(api_key=FAKE_KEY)
+    OpenAIEmbeddings(openai_api_key=FAKE_KEY)
+    llm = ChatOpenAI(openai_api_key=FAKE_KEY, model_name="gpt-4", temperature=0.1)
+    RetrievalQA.from_chain_type(
+        llm=llm,
+        chain_type="stuff",
+        retriever=vectorstore.as_retriever(search_kwargs={"k": 3}),
+        return_source_documents=True
+    )
+
+
+def _summary(label: str, timings: list) -> None:
+    timings_ms = sorted(t * 1000 for t in timings)
+    p95 = timings_ms[min(len(timings_ms) - 1, int(len(timings_ms) * 0.95))]
+    print(f"  {label:<34} primera {timings[0] * 1000:8.2f} ms  "
+          f"p50 {statistics.median(timings_ms):8.3f} ms  p95 {p95:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=50)
+    args = parser.parse_args()
+
+    from langchain_core.embeddings import FakeEmbeddings
+    from langchain_core.vectorstores import InMemoryVectorStore
+
+    from wcag.evaluator import get_evaluator
+
+    vectorstore = InMemoryVectorStore(FakeEmbeddings(size=8))
+
+    legacy = []
+    for _ in range(args.requests):
+        started = time.perf_counter()
+        legacy_setup(vectorstore)
+        legacy.append(time.perf_counter() - started)
+
+    shared = []
+    for _ in range(args.requests):
+        started = time.perf_counter()
+        get_evaluator(FAKE_KEY)
+        shared.append(time.perf_counter() - started)
+
+    print(f"Preparación por petición ({args.requests} peticiones):")
+    _summary("antes: componentes por clic", legacy)
+    _summary("después: get_evaluator compartido", shared)
+
+
+if __name__ == '__main__':
+    main()
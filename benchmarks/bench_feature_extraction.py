@@ -0,0 +1,101 @@
+"""Comparar la extracción de un solo recorrido con la implementación basada en find_all.
+
+Uso:
+    python -m benchmarks.bench_feature_extraction --size-mb 4 --repeat 3
+    python -m benchmarks.bench_feature_extraction pagina1.html pagina2.html
+"""
+import argparse
+import statistics
+import time
+from typing import Dict
+
+from bs4 import BeautifulSoup
+
+from benchmarks.corpus import generate_page
+from wcag.html_features import etree, extract_analysis_data
+
+
+def legacy_analysis_data(html_content: str) -> Dict:
+    """Réplica de la extracción original de WCAGEvaluator (un find_all por contador)."""
+    soup = BeautifulSoup(html_content, 'html.parser')
+
+    contrast_issues = []
+    for elem in soup.find_all(attrs={'style': True}):
+        style = elem.get('style', '')
+        if 'color:' in style and 'background' in style:
+            contrast_issues.append(f"Posible problema de contraste en {elem.name}")
+
+    keyboard_focus = []
+    for elem in soup.find_all(['a', 'button', 'input', 'select', 'textarea']):
+        if elem.get('tabindex') == '-1':
+            keyboard_focus.append(f"Elemento {elem.name} excluido de navegación por teclado")
+
+    semantic_structure = []
+    if not soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
+        semantic_structure.append("No se encontraron encabezados en la página")
+    h1_count = len(soup.find_all('h1'))
+    if h1_count == 0:
+        semantic_structure.append("Falta encabezado H1 principal")
+    elif h1_count > 1:
+        semantic_structure.append("Múltiples encabezados H1 encontrados")
+
+    return {
+        'images': len(soup.find_all('img')),
+        'images_with_alt': len(soup.find_all('img', alt=True)),
+        'headings': [tag.name for tag in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])],
+        'links': len(soup.find_all('a')),
+        'forms': len(soup.find_all('form')),
+        'inputs': len(soup.find_all(['input', 'textarea', 'select'])),
+        'labels': len(soup.find_all('label')),
+        'lang_attr': soup.find('html', lang=True) is not None,
+        'title': soup.find('title') is not None,
+        'skip_links': len(soup.find_all('a', href=lambda x: x and x.startswith('#'))),
+        'aria_labels': len(soup.find_all(attrs={'aria-label': True})),
+        'roles': len(soup.find_all(attrs={'role': True})),
+        'contrast_issues': contrast_issues,
+        'keyboard_focus': keyboard_focus,
+        'semantic_structure': semantic_structure
+    }
+
+
+def _time(func, html_content: str, repeat: int):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(html_content)
+        timings.append(time.perf_counter() - started)
+    return result, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('files', nargs='*', help="Archivos HTML a medir (por defecto una página sintética)")
+    parser.add_argument('--size-mb', type=float, default=4.0)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    if args.files:
+        documents = [(path, open(path, encoding='utf-8', errors='replace').read()) for path in args.files]
+    else:
+        documents = [("página sintética", generate_page(int(args.size_mb * 1024 * 1024)))]
+
+    candidates = [('legacy find_all', legacy_analysis_data),
+                  ('single-pass html.parser', lambda h: extract_analysis_data(h, parser='html.parser'))]
+    if etree is not None:
+        candidates.append(('single-pass lxml', lambda h: extract_analysis_data(h, parser='lxml')))
+
+    for name, html_content in documents:
+        print(f"\n{name}: {len(html_content) / 1024 / 1024:.2f} MB")
+        reference, legacy_timings = _time(legacy_analysis_data, html_content, args.repeat)
+        baseline = statistics.median(legacy_timings)
+        for label, func in candidates:
+            result, timings = (reference, legacy_timings) if func is legacy_analysis_data else _time(func, html_content, args.repeat)
+            median = statistics.median(timings)
+            diff = sorted(k for k in reference if reference[k] != result.get(k))
+            status = "idéntico" if not diff else f"difiere en {', '.join(diff)}"
+            print(f"  {label:<26} {median * 1000:9.1f} ms  x{baseline / median:5.1f}  {status}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Medir la reauditoría incremental tras editar un solo párrafo dentro de `<main>`.
+
+Compara un recorrido completo, la primera auditoría incremental (sin estado previo) y la
+segunda tras cambiar una palabra de un párrafo central. Comprueba que el resultado incremental
+coincide con el completo y termina con código 1 si difiere o si la reauditoría cuesta más de
+`--max-ratio` veces la auditoría en frío.
+
+Uso:
+    python -m benchmarks.bench_incremental --size-mb 2
+    python -m benchmarks.bench_incremental --size-mb 10 --repeat 3 --max-ratio 0.3
+"""
+import argparse
+import statistics
+import sys
+import time
+
+from benchmarks.corpus import generate_page
+from wcag.html_features import extract_analysis_data
+from wcag.incremental import extract_analysis_data_incremental
+from wcag.wcag_rules import RuleEngine
+
+
+def edit_one_paragraph(html_content: str) -> str:
+    """Cambiar una palabra del párrafo más cercano al centro del documento."""
+    position = html_content.find('<p', len(html_content) // 2)
+    marker = html_content.index('texto de relleno', position)
+    return html_content[:marker] + 'texto editado' + html_content[marker + len('texto de relleno'):]
+
+
+def _median_ms(func, repeat: int):
+    timings, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=float, default=2.0)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--max-ratio', type=float, default=0.5,
+                        help="Coste máximo de la reauditoría como fracción de la auditoría en frío")
+    args = parser.parse_args()
+
+    original = generate_page(int(args.size_mb * 1024 * 1024))
+    edited = edit_one_paragraph(original)
+
+    full_ms, expected = _median_ms(lambda: extract_analysis_data(edited, rules=RuleEngine()), args.repeat)
+    cold_ms, cold = _median_ms(lambda: extract_analysis_data_incremental(original), args.repeat)
+    warm_ms, warm = _median_ms(lambda: extract_analysis_data_incremental(edited, cold.regions), args.repeat)
+
+    print(f"Página sintética de {args.size_mb:.1f} MB, un párrafo editado:")
+    print(f"  recorrido completo           {full_ms:>8.1f} ms")
+    print(f"  incremental en frío          {cold_ms:>8.1f} ms  {cold.total} regiones")
+    print(f"  incremental tras la edición  {warm_ms:>8.1f} ms  {warm.reused}/{warm.total} reutilizadas"
+          f"  ({warm_ms / cold_ms:.0%} del coste en frío)")
+
+    failed = False
+    if warm.analysis_data != expected:
+        print("  el resultado incremental difiere del recorrido completo")
+        failed = True
+    if warm_ms > args.max_ratio * cold_ms:
+        print(f"  la reauditoría supera {args.max_ratio:.0%} del coste en frío")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
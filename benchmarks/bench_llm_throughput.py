@@ -0,0 +1,90 @@
+"""Medir el rendimiento de la evaluación con IA de muchas páginas: secuencial frente a la etapa
+asíncrona con concurrencia acotada.
+
+Las llamadas van a un servidor local compatible con OpenAI (benchmarks.fake_openai_server) con
+latencia simulada, de modo que el resultado mide la orquestación y no la red. La recuperación de
+criterios usa vectores sintéticos y cada variante parte de una caché de resultados vacía.
+
+Uso:
+    python -m benchmarks.bench_llm_throughput --pages 40 --latency 0.5 --concurrency 8
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.corpus import generate_page
+from benchmarks.fake_openai_server import FAKE_RESULT, FakeOpenAI, start_in_thread
+
+FAKE_KEY = "sk-benchmark"
+
+
+def _fake_embed(texts):
+    return [np.random.default_rng(abs(hash(text)) % 2 ** 32).standard_normal(32).tolist() for text in texts]
+
+
+def _evaluator(cache_dir: str):
+    from wcag.evaluator import WCAGEvaluator
+    from wcag.knowledge import parse_criteria
+    from wcag.result_cache import ResultCache
+    from wcag.retrieval import CriterionIndex, QueryEmbedder
+
+    evaluator = WCAGEvaluator(FAKE_KEY, result_cache=ResultCache(cache_dir))
+    criteria = parse_criteria()
+    evaluator._index = CriterionIndex(criteria, _fake_embed([c.text for c in criteria]))
+    evaluator._query_embedder = QueryEmbedder(_fake_embed)
+    return evaluator
+
+
+def run_sequential(pages, cache_dir: str) -> list:
+    evaluator = _evaluator(cache_dir)
+    return [evaluator.analyze_html_accessibility(page) for page in pages]
+
+
+async def run_async(pages, cache_dir: str, concurrency: int, tokens_per_minute: int):
+    evaluator = _evaluator(cache_dir)
+    async with evaluator.async_stage(concurrency, tokens_per_minute) as stage:
+        results = await asyncio.gather(*(evaluator.analyze_html_async(page, stage) for page in pages))
+    return results, stage.retries
+
+
+def _report(label: str, elapsed: float, results: list, server: FakeOpenAI, retries: int = 0) -> None:
+    fallbacks = sum(result.get('summary') != FAKE_RESULT['summary'] for result in results)
+    print(f"  {label:<28} {elapsed:7.2f} s  {len(results) / elapsed:7.2f} páginas/s  "
+          f"máx. simultáneas {server.max_in_flight:3d}  reintentos {retries:3d}  fallback {fallbacks}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=40)
+    parser.add_argument('--latency', type=float, default=0.5)
+    parser.add_argument('--error-rate', type=float, default=0.05)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--tpm', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    # Páginas distintas para que ninguna evaluación salga de la caché
+    pages = [generate_page(20 * 1024, seed=seed) for seed in range(args.pages)]
+
+    print(f"Evaluación de {args.pages} páginas (latencia simulada {args.latency} s, errores {args.error_rate:.0%}):")
+    for label in ('secuencial', f'asíncrona x{args.concurrency}'):
+        server = FakeOpenAI(latency=args.latency, error_rate=args.error_rate)
+        base_url, stop = start_in_thread(server)
+        os.environ['OPENAI_BASE_URL'] = base_url
+        try:
+            with tempfile.TemporaryDirectory() as cache_dir:
+                started = time.perf_counter()
+                if label == 'secuencial':
+                    results, retries = run_sequential(pages, cache_dir), 0
+                else:
+                    results, retries = asyncio.run(run_async(pages, cache_dir, args.concurrency, args.tpm))
+                _report(label, time.perf_counter() - started, results, server, retries)
+        finally:
+            stop()
+
+
+if __name__ == '__main__':
+    main()
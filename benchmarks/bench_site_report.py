@@ -0,0 +1,71 @@
+"""Medir la construcción del informe PDF de sitio: tiempo por página y memoria al crecer el lote.
+
+Genera resultados sintéticos (como los de `wcag.cli`) y construye el informe para varios
+tamaños. Si la construcción escala linealmente, los milisegundos por página se mantienen
+constantes y el pico de memoria apenas varía con el número de páginas.
+
+Uso:
+    python -m benchmarks.bench_site_report --pages 200 800 3200
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+ISSUES = (
+    '1.1.1 Imágenes sin texto alternativo (3)',
+    '2.4.4 Enlaces sin texto (12)',
+    '1.3.1/4.1.2 Campos de formulario sin etiqueta (1)',
+    '1.4.3 Texto con contraste insuficiente (4)',
+    '3.1.1 Falta atributo lang en el elemento html (1)',
+    'El contraste del pie de página no cumple 1.4.3',
+)
+
+
+def synthetic_records(pages: int, seed: int = 1):
+    rnd = random.Random(seed)
+    for i in range(pages):
+        if i % 97 == 5:
+            yield {'source': f"https://ejemplo.com/p{i}", 'error': "TimeoutError: sin respuesta"}
+            continue
+        score = rnd.randint(20, 100)
+        yield {
+            'source': f"https://ejemplo.com/seccion/{i}/pagina",
+            'score': score,
+            'level': rnd.choice(['A', 'AA', 'No conforme']),
+            'summary': f"Evaluación local con reglas automáticas. Puntuación: {score}/100",
+            'issues': rnd.sample(ISSUES, rnd.randint(0, len(ISSUES))),
+            'template_issues': list(ISSUES[:2]),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, nargs='+', default=[200, 800, 3200])
+    args = parser.parse_args()
+
+    from wcag.report import SiteReportBuilder, report_styles
+
+    report_styles()  # Fuera de la medida: se construye una vez por proceso
+    print(f"  {'páginas':>8} {'total':>9} {'ms/página p50':>14} {'p95':>8} {'1er décimo':>11} {'último':>8} "
+          f"{'pico MB':>8} {'PDF KB':>8}")
+    for pages in args.pages:
+        with tempfile.TemporaryDirectory() as directory, SiteReportBuilder() as builder:
+            path = os.path.join(directory, 'sitio.pdf')
+            tracemalloc.start()
+            started = time.perf_counter()
+            for record in synthetic_records(pages):
+                builder.add(record)
+            timings = builder.write(path)
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"  {pages:>8} {elapsed:>8.2f}s {timings['per_page_ms_p50']:>14.2f} {timings['per_page_ms_p95']:>8.2f} "
+                  f"{timings['first_tenth_ms']:>11.2f} {timings['last_tenth_ms']:>8.2f} "
+                  f"{peak / 2 ** 20:>8.1f} {os.path.getsize(path) // 1024:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Medir la memoria máxima del modo streaming frente al árbol completo según el tamaño de entrada.
+
+Cada medición corre en un subproceso para que el pico de RSS no se arrastre entre tamaños.
+
+Uso:
+    python -m benchmarks.bench_streaming_memory --sizes 4 16 64
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+BLOCK = ('<div class="item"><h3>Producto</h3><img src="/p.png" alt="Producto">'
+         '<p style="color: #555; background: #eee">Descripción <a href="/p">ver</a></p></div>')
+
+_CHILD = r'''
+import json, resource, sys, time
+from wcag.html_features import extract_analysis_data, extract_analysis_data_stream
+size_mb, mode, block = float(sys.argv[1]), sys.argv[2], sys.argv[3]
+def chunks():
+    yield '<html lang="es"><head><title>Catálogo</title></head><body><h1>Catálogo</h1>'
+    batch = block * 100
+    for _ in range(int(size_mb * 1024 * 1024 / len(batch))):
+        yield batch
+    yield '</body></html>'
+started = time.perf_counter()
+if mode == 'stream':
+    data = extract_analysis_data_stream(chunks())
+else:
+    data = extract_analysis_data(''.join(chunks()))
+print(json.dumps({'seconds': time.perf_counter() - started,
+                  'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                  'images': data['images']}))
+'''
+
+
+def measure(size_mb: float, mode: str) -> dict:
+    output = subprocess.run([sys.executable, '-c', _CHILD, str(size_mb), mode, BLOCK],
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=float, nargs='+', default=[4, 16, 64])
+    parser.add_argument('--modes', nargs='+', default=['stream', 'dom'], choices=['stream', 'dom'])
+    args = parser.parse_args()
+
+    print(f"{'modo':<8}{'MB':>8}{'RSS máx. (MB)':>16}{'segundos':>11}")
+    for mode in args.modes:
+        for size_mb in args.sizes:
+            result = measure(size_mb, mode)
+            print(f"{mode:<8}{size_mb:>8.0f}{result['max_rss_mb']:>16.1f}{result['seconds']:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Comprobar que lxml, html.parser y el streaming dan el mismo `analysis_data` con reglas.
+
+lxml aplica los cierres implícitos de HTML5 (un `<p>` sin cerrar termina en el siguiente
+bloque); html.parser y el streaming entregan las etiquetas tal cual y el analizador de
+contraste los reproduce. Se comparan unos fragmentos con etiquetas sin cerrar, páginas
+sintéticas (benchmarks.corpus) y, opcionalmente, archivos propios. Termina con código 1 si
+algún documento difiere.
+
+Uso:
+    python -m benchmarks.check_parser_parity
+    python -m benchmarks.check_parser_parity pagina1.html pagina2.html
+"""
+import argparse
+import sys
+from typing import Dict
+
+from benchmarks.corpus import generate_page
+from wcag.html_features import STREAM_CHUNK_SIZE, etree, extract_analysis_data, extract_analysis_data_stream
+from wcag.wcag_rules import RuleEngine
+
+FRAGMENTS = {
+    'párrafos sin cerrar': '<html><body style="background:#fff"><p style="color:#eee">a<p>b<p>c</body></html>',
+    'bloque tras párrafo': '<body style="background:#fff"><p style="color:#ddd">a<div>b</div><p>c</body>',
+    'listas': '<body style="background:#fff"><ul><li style="color:#ddd">a<li>b<li>c</ul>'
+              '<dl><dt style="color:#eee">t<dd>d</dl></body>',
+    'tablas': '<body style="background:#fff"><table><tr><td style="color:#eee">x<td>y<tr><th>z</table></body>',
+    'opciones': '<body style="background:#fff"><select><option style="color:#eee">1<option>2</select></body>',
+}
+
+
+def backends(html_content: str) -> Dict[str, Dict]:
+    results = {
+        'html.parser': extract_analysis_data(html_content, parser='html.parser', rules=RuleEngine()),
+        'stream': extract_analysis_data_stream(
+            (html_content[i:i + STREAM_CHUNK_SIZE] for i in range(0, len(html_content), STREAM_CHUNK_SIZE)),
+            rules=RuleEngine()
+        ),
+    }
+    if etree is not None:
+        results['lxml'] = extract_analysis_data(html_content, parser='lxml', rules=RuleEngine())
+    return results
+
+
+def differences(reference: Dict, result: Dict) -> list:
+    return sorted(key for key in reference.keys() | result.keys() if reference.get(key) != result.get(key))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('files', nargs='*', help="Archivos HTML adicionales")
+    parser.add_argument('--pages', type=int, default=3, help="Páginas sintéticas de 100 KB")
+    args = parser.parse_args()
+
+    documents = list(FRAGMENTS.items())
+    documents += [(f"sintética {seed}", generate_page(100 * 1024, seed=seed)) for seed in range(args.pages)]
+    documents += [(path, open(path, encoding='utf-8', errors='replace').read()) for path in args.files]
+
+    failed = False
+    for name, html_content in documents:
+        results = backends(html_content)
+        reference_name = 'lxml' if 'lxml' in results else 'html.parser'
+        reference = results[reference_name]
+        mismatches = {label: differences(reference, result) for label, result in results.items() if label != reference_name}
+        status = '; '.join(f"{label} difiere en {', '.join(diff)}" for label, diff in mismatches.items() if diff)
+        failed = failed or bool(status)
+        print(f"  {name:<24} {status or 'idéntico'}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""Generador reproducible de páginas HTML sintéticas de 10 KB a 50 MB.
+
+La densidad de imágenes, formularios, encabezados y estilos en línea se controla como la
+fracción de bloques de cada tipo; el resto son párrafos con enlaces. Con la misma semilla se
+obtiene exactamente el mismo documento, de modo que las mediciones son comparables entre
+ejecuciones y máquinas.
+
+Uso:
+    python -m benchmarks.corpus corpus/ --sizes 10k 100k 1m 10m 50m
+    python -m benchmarks.corpus corpus/ --sizes 1m --pages 20 --images 0.3 --styles 0.5
+"""
+import argparse
+import os
+import random
+from typing import List, NamedTuple
+
+DEFAULT_SIZES = ('10k', '100k', '1m', '10m', '50m')
+_UNITS = {'k': 1024, 'm': 1024 * 1024}
+
+
+class Density(NamedTuple):
+    """Fracción de bloques de cada tipo (el resto, párrafos)."""
+    images: float = 0.15
+    forms: float = 0.05
+    headings: float = 0.1
+    inline_styles: float = 0.2
+
+
+DEFAULT_DENSITY = Density()
+
+
+def parse_size(text: str) -> int:
+    """'10k', '1m', '50m' o un número de bytes."""
+    text = text.strip().lower()
+    if text[-1:] in _UNITS:
+        return int(float(text[:-1]) * _UNITS[text[-1]])
+    return int(text)
+
+
+def size_label(size: int) -> str:
+    if size >= _UNITS['m'] and size % _UNITS['m'] == 0:
+        return f"{size // _UNITS['m']}m"
+    if size >= _UNITS['k'] and size % _UNITS['k'] == 0:
+        return f"{size // _UNITS['k']}k"
+    return str(size)
+
+
+def _block(rng: random.Random, i: int, density: Density) -> str:
+    styled = rng.random() < density.inline_styles
+    style = f' style="color: #{rng.choice(("777", "999", "333", "ccc"))}; background: #fff"' if styled else ''
+    roll = rng.random()
+    if roll < density.images:
+        alt = ' alt="Fotografía del producto"' if rng.random() < 0.7 else ''
+        return f'<figure{style}><img src="/img/{i}.png"{alt}><figcaption>Figura {i}</figcaption></figure>'
+    roll -= density.images
+    if roll < density.forms:
+        label = f'<label for="f{i}">Campo {i}</label>' if rng.random() < 0.6 else ''
+        return (f'<form action="/enviar"{style}>{label}<input id="f{i}" name="f{i}">'
+                f'<select name="s{i}"><option>Uno</option><option>Dos</option></select><button>Enviar</button></form>')
+    roll -= density.forms
+    if roll < density.headings:
+        level = rng.randint(2, 6)
+        return f'<h{level}{style}>Sección {i}</h{level}>'
+    # Algunos enlaces vacíos y fuera del orden de tabulación para que las reglas tengan trabajo
+    extra = f' y otro <a href="#c{i}" tabindex="-1"></a>' if rng.random() < 0.05 else ''
+    return f'<p{style}>Párrafo {i} con texto de relleno y un <a href="/pagina/{i}">enlace relacionado</a>{extra}.</p>'
+
+
+def generate_page(size: int, density: Density = DEFAULT_DENSITY, seed: int = 0) -> str:
+    """Documento de unos `size` bytes (UTF-8) con cabecera, navegación y pie comunes."""
+    rng = random.Random(seed)
+    head = ('<!DOCTYPE html><html lang="es"><head><meta charset="utf-8"><title>Página sintética</title>'
+            '<style>.card{color:#555;background:#fafafa} nav a{color:#06c}</style></head><body>'
+            '<header><a href="#main">Saltar al contenido</a><nav aria-label="Principal">'
+            + ''.join(f'<a href="/seccion/{n}">Sección {n}</a>' for n in range(8)) +
+            '</nav></header><main id="main"><h1>Página sintética</h1>')
+    tail = '</main><footer class="card"><p>Pie de página</p></footer></body></html>'
+    parts = [head]
+    written = len(head.encode('utf-8')) + len(tail)
+    i = 0
+    while written < size:
+        block = _block(rng, i, density)
+        parts.append(block)
+        written += len(block.encode('utf-8'))
+        i += 1
+    parts.append(tail)
+    return ''.join(parts)
+
+
+def write_corpus(directory: str, sizes=DEFAULT_SIZES, pages: int = 1, density: Density = DEFAULT_DENSITY,
+                 seed: int = 0) -> List[str]:
+    """Escribir `pages` documentos por tamaño; devuelve las rutas en orden."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for size_text in sizes:
+        size = parse_size(size_text)
+        for page in range(pages):
+            path = os.path.join(directory, f"page_{size_label(size)}_{page}.html")
+            with open(path, 'w', encoding='utf-8') as handle:
+                handle.write(generate_page(size, density, seed=seed + page))
+            paths.append(path)
+    return paths
+
+
+def add_density_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--images', type=float, default=DEFAULT_DENSITY.images, help="Fracción de bloques con imagen")
+    parser.add_argument('--forms', type=float, default=DEFAULT_DENSITY.forms, help="Fracción de bloques con formulario")
+    parser.add_argument('--headings', type=float, default=DEFAULT_DENSITY.headings, help="Fracción de encabezados")
+    parser.add_argument('--styles', type=float, default=DEFAULT_DENSITY.inline_styles,
+                        help="Fracción de bloques con estilo en línea")
+
+
+def density_from_args(args) -> Density:
+    return Density(args.images, args.forms, args.headings, args.styles)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('directory')
+    parser.add_argument('--sizes', nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--pages', type=int, default=1, help="Documentos distintos por tamaño")
+    parser.add_argument('--seed', type=int, default=0)
+    add_density_arguments(parser)
+    args = parser.parse_args()
+    for path in write_corpus(args.directory, args.sizes, args.pages, density_from_args(args), args.seed):
+        print(f"{path}  {os.path.getsize(path) / 1024:,.0f} KB")
+
+
+if __name__ == '__main__':
+    main()
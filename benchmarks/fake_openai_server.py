@@ -0,0 +1,167 @@
+"""Servidor local compatible con la API de OpenAI para medir el rendimiento sin red ni coste.
+
+Responde `/v1/chat/completions` con una evaluación JSON fija tras una latencia configurable
+(también en streaming, fragmento a fragmento) y puede devolver errores 429/500 con cierta
+probabilidad para ejercitar los reintentos.
+`/v1/embeddings` devuelve vectores deterministas derivados del texto.
+
+Uso:
+    python -m benchmarks.fake_openai_server --port 8900 --latency 0.5 --error-rate 0.05
+    OPENAI_BASE_URL=http://127.0.0.1:8900/v1 streamlit run app.py
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+from typing import Dict
+
+from aiohttp import web
+
+FAKE_RESULT = {
+    'level': 'A',
+    'score': 72,
+    'issues': ["Algunas imágenes no tienen texto alternativo", "Salto en la jerarquía de encabezados"],
+    'recommendations': ["Agregar atributos alt descriptivos", "Respetar el orden h1 > h2 > h3"],
+    'summary': "Evaluación simulada por el servidor de pruebas",
+}
+
+
+class FakeOpenAI:
+    def __init__(self, latency: float = 0.5, jitter: float = 0.1, error_rate: float = 0.0,
+                 embedding_size: int = 64, seed: int = 0, token_delay: float = 0.01, chunk_chars: int = 8):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.chunk_chars = chunk_chars
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.embedding_size = embedding_size
+        self._rng = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post('/v1/chat/completions', self.chat_completions)
+        app.router.add_post('/v1/embeddings', self.embeddings)
+        return app
+
+    async def _simulate(self):
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter)))
+        finally:
+            self.in_flight -= 1
+        if self._rng.random() < self.error_rate:
+            self.errors += 1
+            status = self._rng.choice((429, 500))
+            return web.json_response({'error': {'message': 'simulated', 'type': 'server_error'}}, status=status,
+                                     headers={'retry-after': '0.1'} if status == 429 else None)
+        return None
+
+    async def chat_completions(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        error = await self._simulate()
+        if error is not None:
+            return error
+        prompt_tokens = sum(len(message['content']) for message in body['messages']) // 4
+        content = json.dumps(FAKE_RESULT, ensure_ascii=False)
+        usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': len(content) // 4,
+                 'total_tokens': prompt_tokens + len(content) // 4}
+        if body.get('stream'):
+            return await self._stream(request, body, content, usage)
+        return web.json_response({
+            'id': f"chatcmpl-{self.requests}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body['model'],
+            'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': content}}],
+            'usage': usage,
+        })
+
+    async def _stream(self, request: web.Request, body: Dict, content: str, usage: Dict) -> web.StreamResponse:
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+        await response.prepare(request)
+        base = {'id': f"chatcmpl-{self.requests}", 'object': 'chat.completion.chunk',
+                'created': int(time.time()), 'model': body['model']}
+
+        async def send(payload):
+            await response.write(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode('utf-8'))
+
+        for start in range(0, len(content), self.chunk_chars):
+            delta = {'content': content[start:start + self.chunk_chars]}
+            await send({**base, 'choices': [{'index': 0, 'delta': delta, 'finish_reason': None}]})
+            await asyncio.sleep(self.token_delay)
+        await send({**base, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]})
+        if (body.get('stream_options') or {}).get('include_usage'):
+            await send({**base, 'choices': [], 'usage': usage})
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    def _vector(self, text: str) -> list:
+        rng = random.Random(hashlib.sha256(text.encode('utf-8')).digest())
+        return [rng.uniform(-1, 1) for _ in range(self.embedding_size)]
+
+    async def embeddings(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        inputs = body['input'] if isinstance(body['input'], list) else [body['input']]
+        error = await self._simulate()
+        if error is not None:
+            return error
+        return web.json_response({
+            'object': 'list',
+            'model': body['model'],
+            'data': [{'object': 'embedding', 'index': i, 'embedding': self._vector(str(text))} for i, text in enumerate(inputs)],
+            'usage': {'prompt_tokens': 0, 'total_tokens': 0},
+        })
+
+
+def start_in_thread(server: FakeOpenAI, host: str = '127.0.0.1', port: int = 0):
+    """Arrancar el servidor en un hilo propio; devuelve (base_url, stop)."""
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    state = {}
+
+    async def start():
+        runner = web.AppRunner(server.app())
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+        state['runner'] = runner
+        state['port'] = runner.addresses[0][1]
+        ready.set()
+
+    thread = threading.Thread(target=lambda: (loop.run_until_complete(start()), loop.run_forever()), daemon=True)
+    thread.start()
+    ready.wait()
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(state['runner'].cleanup(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+    return f"http://{host}:{state['port']}/v1", stop
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--latency', type=float, default=0.5)
+    parser.add_argument('--jitter', type=float, default=0.1)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--token-delay', type=float, default=0.01)
+    args = parser.parse_args()
+    server = FakeOpenAI(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, token_delay=args.token_delay)
+    web.run_app(server.app(), host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
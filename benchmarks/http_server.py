@@ -0,0 +1,58 @@
+"""Servidor HTTP local que sirve un directorio de páginas para medir el scraper sin red.
+
+La latencia simulada se aplica antes de cada respuesta. Los registros de acceso se descartan
+para no medir la escritura en la consola.
+
+Uso:
+    python -m benchmarks.http_server corpus/ --port 8901 --latency 0.05
+"""
+import argparse
+import functools
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(SimpleHTTPRequestHandler):
+    latency = 0.0
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(directory: str, latency: float = 0.0, host: str = '127.0.0.1', port: int = 0) -> ThreadingHTTPServer:
+    handler = type('CorpusHandler', (_Handler,), {'latency': latency})
+    return ThreadingHTTPServer((host, port), functools.partial(handler, directory=directory))
+
+
+def start_in_thread(directory: str, latency: float = 0.0, host: str = '127.0.0.1', port: int = 0):
+    """Arrancar el servidor en un hilo propio; devuelve (base_url, stop)."""
+    server = make_server(directory, latency, host, port)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def stop():
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+    return f"http://{host}:{server.server_address[1]}", stop
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('directory')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8901)
+    parser.add_argument('--latency', type=float, default=0.0)
+    args = parser.parse_args()
+    make_server(args.directory, args.latency, args.host, args.port).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
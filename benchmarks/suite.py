@@ -0,0 +1,244 @@
+"""Batería de rendimiento sin red: extracción, evaluación, scraping e informe PDF.
+
+Cada etapa se mide sobre documentos sintéticos (benchmarks.corpus) de varios tamaños. El
+modelo lo sustituye el servidor local compatible con OpenAI (benchmarks.fake_openai_server),
+con latencia configurable, y el scraper descarga de un servidor HTTP local
+(benchmarks.http_server). Para cada etapa y tamaño se informa de la latencia p50/p95, el
+rendimiento en MB/s y el pico de memoria (con tracemalloc, en una ejecución aparte para no
+distorsionar los tiempos). tracemalloc solo ve la memoria de Python: los árboles de lxml, que
+se reservan en C, no cuentan.
+
+Con `--save-baseline` los resultados se guardan como referencia; con `--baseline` se comparan y
+el proceso termina con código 1 si alguna métrica empeora más que `--threshold`.
+
+Uso:
+    python -m benchmarks.suite --save-baseline benchmarks/baseline.json
+    python -m benchmarks.suite --baseline benchmarks/baseline.json --threshold 0.2
+    python -m benchmarks.suite --sizes 10k 1m --stages extract offline --repeat 10
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from benchmarks.corpus import DEFAULT_SIZES, add_density_arguments, density_from_args, generate_page, parse_size, size_label
+
+STAGES = ('extract', 'offline', 'llm', 'scrape', 'pdf')
+# Por encima de este tamaño se repite menos: una pasada ya dura segundos
+LARGE_DOCUMENT = 10 * 1024 * 1024
+# Diferencias absolutas por debajo de estas se consideran ruido al comparar con la referencia
+MIN_REGRESSION_MS = 2.0
+MIN_REGRESSION_MB = 1.0
+FAKE_KEY = "sk-benchmark"
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def measure(run: Callable[[], object], repeat: int, size: int, warmup: bool, memory: bool) -> Dict:
+    """Latencias de `repeat` ejecuciones y, aparte, el pico de memoria de una más."""
+    if warmup:
+        run()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    ordered = sorted(timings)
+    p50 = statistics.median(ordered)
+    stats = {
+        'p50_ms': round(p50 * 1000, 3),
+        'p95_ms': round(_percentile(ordered, 0.95) * 1000, 3),
+        'mb_per_s': round(size / 2 ** 20 / p50, 3) if p50 else None,
+        'runs': repeat,
+    }
+    if memory:
+        tracemalloc.start()
+        try:
+            run()
+            stats['peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 2)
+        finally:
+            tracemalloc.stop()
+    return stats
+
+
+class _Environment:
+    """Servidores locales y directorios temporales compartidos por las etapas."""
+
+    def __init__(self, directory: str, llm_latency: float, http_latency: float):
+        from benchmarks.fake_openai_server import FakeOpenAI, start_in_thread as start_openai
+        from benchmarks.http_server import start_in_thread as start_http
+
+        self.directory = directory
+        self.pages_dir = os.path.join(directory, 'pages')
+        os.makedirs(self.pages_dir)
+        self.openai_url, self._stop_openai = start_openai(FakeOpenAI(latency=llm_latency, jitter=0.0))
+        # Se restaura en `close`: el suite puede ejecutarse dentro de otro proceso
+        self._previous_base_url = os.environ.get('OPENAI_BASE_URL')
+        os.environ['OPENAI_BASE_URL'] = self.openai_url
+        self.http_url, self._stop_http = start_http(self.pages_dir, http_latency)
+        self._runs = 0
+
+    def scratch(self) -> str:
+        """Directorio nuevo para cada ejecución: ninguna sale de una caché."""
+        self._runs += 1
+        path = os.path.join(self.directory, f"run{self._runs}")
+        os.makedirs(path)
+        return path
+
+    def close(self) -> None:
+        self._stop_http()
+        self._stop_openai()
+        if self._previous_base_url is None:
+            os.environ.pop('OPENAI_BASE_URL', None)
+        else:
+            os.environ['OPENAI_BASE_URL'] = self._previous_base_url
+
+
+def _llm_evaluator(env: _Environment):
+    from benchmarks.bench_llm_throughput import _fake_embed
+    from wcag.evaluator import WCAGEvaluator
+    from wcag.knowledge import parse_criteria
+    from wcag.result_cache import ResultCache
+    from wcag.retrieval import CriterionIndex, QueryEmbedder
+
+    evaluator = WCAGEvaluator(FAKE_KEY, result_cache=ResultCache(env.scratch()))
+    criteria = parse_criteria()
+    evaluator._index = CriterionIndex(criteria, _fake_embed([c.text for c in criteria]))
+    evaluator._query_embedder = QueryEmbedder(_fake_embed)
+    return evaluator
+
+
+def stage_runner(stage: str, html: str, name: str, env: _Environment) -> Callable[[], object]:
+    """Función sin argumentos que ejecuta `stage` una vez sobre el documento."""
+    from wcag.evaluator import WCAGEvaluator
+    from wcag.html_features import extract_analysis_data
+    from wcag.wcag_rules import RuleEngine
+
+    if stage == 'extract':
+        return lambda: extract_analysis_data(html, rules=RuleEngine())
+    if stage == 'offline':
+        evaluator = WCAGEvaluator(None, offline=True)
+        return lambda: evaluator.analyze_html_accessibility(html)
+    if stage == 'llm':
+        return lambda: _llm_evaluator(env).analyze_html_accessibility(html)
+    if stage == 'scrape':
+        from wcag.fetch_strategy import DomainStrategyStore
+        from wcag.http_cache import HttpPageCache
+        from wcag.rate_limit import HostRateLimiter
+        from wcag.scraper import RobustWebScraper
+
+        with open(os.path.join(env.pages_dir, name), 'w', encoding='utf-8') as handle:
+            handle.write(html)
+        url = f"{env.http_url}/{name}"
+        # Construir el scraper (fake_useragent, sesión) queda fuera de la medición; cada ejecución
+        # solo estrena caché HTTP y estrategia para que ninguna descarga salga de disco
+        scratch = env.scratch()
+        scraper = RobustWebScraper(strategy=DomainStrategyStore(os.path.join(scratch, 'strategy.json')),
+                                   rate_limiter=HostRateLimiter(rate=1e6, burst=10 ** 6),
+                                   page_cache=HttpPageCache(scratch))
+
+        def scrape():
+            scratch = env.scratch()
+            scraper.strategy = DomainStrategyStore(os.path.join(scratch, 'strategy.json'))
+            scraper.page_cache = HttpPageCache(scratch)
+            if scraper.scrape_website(url) is None:
+                raise RuntimeError(f"No se pudo descargar {url}")
+        return scrape
+    if stage == 'pdf':
+        from wcag.report import ReportGenerator
+
+        result = WCAGEvaluator(None, offline=True).analyze_html_accessibility(html)
+        return lambda: ReportGenerator().generate_pdf_report(result, 'https://ejemplo.com/')
+    raise ValueError(f"Etapa desconocida: {stage}")
+
+
+def run_suite(sizes, stages, density, repeat: int, large_repeat: int, llm_latency: float, http_latency: float,
+              llm_max_size: int, memory: bool, seed: int = 0) -> Dict[str, Dict]:
+    """Resultados por 'etapa/tamaño' (p. ej. 'extract/1m')."""
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        env = _Environment(directory, llm_latency, http_latency)
+        try:
+            for size_text in sizes:
+                size = parse_size(size_text)
+                label = size_label(size)
+                html = generate_page(size, density, seed)
+                actual_size = len(html.encode('utf-8'))
+                for stage in stages:
+                    if stage == 'llm' and size > llm_max_size:
+                        continue
+                    runner = stage_runner(stage, html, f"page_{label}.html", env)
+                    large = size >= LARGE_DOCUMENT
+                    stats = measure(runner, large_repeat if large else repeat, actual_size, warmup=not large, memory=memory)
+                    results[f"{stage}/{label}"] = stats
+                    print(f"  {stage + '/' + label:<16} p50 {stats['p50_ms']:>10.1f} ms  p95 {stats['p95_ms']:>10.1f} ms  "
+                          f"{stats['mb_per_s'] or 0:>8.2f} MB/s" + (f"  pico {stats['peak_mb']:>8.1f} MB" if memory else ''),
+                          flush=True)
+        finally:
+            env.close()
+    return results
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> List[str]:
+    """Métricas que empeoran más que `threshold` (fracción) y que el umbral de ruido absoluto."""
+    regressions = []
+    for key, current in sorted(results.items()):
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        for metric, floor in (('p50_ms', MIN_REGRESSION_MS), ('peak_mb', MIN_REGRESSION_MB)):
+            if metric not in current or metric not in previous or not previous[metric]:
+                continue
+            change = current[metric] / previous[metric] - 1
+            if change > threshold and current[metric] - previous[metric] > floor:
+                regressions.append(f"{key} {metric}: {previous[metric]} -> {current[metric]} (+{change:.0%})")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.suite', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES))
+    parser.add_argument('--repeat', type=int, default=5, help="Repeticiones por etapa y tamaño")
+    parser.add_argument('--large-repeat', type=int, default=1, help="Repeticiones para documentos de 10 MB o más")
+    parser.add_argument('--llm-latency', type=float, default=0.05, help="Latencia simulada del modelo (s)")
+    parser.add_argument('--http-latency', type=float, default=0.0, help="Latencia simulada del servidor HTTP (s)")
+    parser.add_argument('--llm-max-size', default='1m', help="Tamaño máximo de documento para la etapa llm")
+    parser.add_argument('--no-memory', action='store_true', help="No medir el pico de memoria")
+    parser.add_argument('--seed', type=int, default=0)
+    add_density_arguments(parser)
+    parser.add_argument('--json', help="Guardar los resultados en este archivo")
+    parser.add_argument('--save-baseline', help="Guardar los resultados como referencia")
+    parser.add_argument('--baseline', help="Comparar con esta referencia")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Empeoramiento máximo admitido (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    print(f"Etapas {', '.join(args.stages)} · tamaños {', '.join(args.sizes)}:")
+    results = run_suite(args.sizes, args.stages, density_from_args(args), args.repeat, args.large_repeat,
+                        args.llm_latency, args.http_latency, parse_size(args.llm_max_size), not args.no_memory, args.seed)
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as handle:
+                json.dump(results, handle, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as handle:
+            regressions = compare(results, json.load(handle), args.threshold)
+        if regressions:
+            print(f"Regresiones por encima del {args.threshold:.0%}:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            return 1
+        print(f"Sin regresiones por encima del {args.threshold:.0%} respecto a {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1 @@
+"""Componentes del evaluador de accesibilidad WCAG 2.1 independientes de la interfaz."""
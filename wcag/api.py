@@ -0,0 +1,201 @@
+"""API HTTP (WSGI) para evaluar páginas en segundo plano: scraping → evaluación → PDF.
+
+Las peticiones devuelven un identificador de trabajo al instante y un pool acotado de hilos
+ejecuta el análisis. Los trabajos viven en la memoria del proceso, por lo que se despliega con
+un único proceso de gunicorn y varios hilos:
+
+    gunicorn 'wcag.api:create_app()' --workers 1 --threads 8 --bind 0.0.0.0:8000
+
+Rutas:
+    POST /jobs                      {"url": ...} o {"html": ...}; también un cuerpo text/html
+    GET  /jobs/<id>                 estado y etapa del trabajo
+    GET  /jobs/<id>/result          evaluación en JSON
+    GET  /jobs/<id>/report.pdf      informe PDF
+    GET  /metrics                   profundidad de la cola y ocupación de los workers
+    GET  /metrics/prometheus        tiempos por etapa y cola en formato de texto de Prometheus
+    GET  /health
+"""
+import json
+import os
+import re
+import threading
+from typing import Dict
+
+from wcag.jobs import DEFAULT_JOB_WORKERS, DEFAULT_QUEUE_SIZE, DONE, FAILED, Job, JobQueue, QueueFull
+from wcag.tracing import collect, registry
+
+# Tamaño máximo del HTML enviado en el cuerpo de la petición
+MAX_BODY_BYTES = int(os.getenv('WCAG_API_MAX_BODY', str(20 * 1024 * 1024)))
+RETRY_AFTER_SECONDS = 5
+
+_JOB_ROUTE = re.compile(r'^/jobs/([0-9a-f]{32})(/result|/report\.pdf)?$')
+_STATUS_TEXT = {200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                409: 'Conflict', 413: 'Payload Too Large', 503: 'Service Unavailable'}
+
+
+class AnalysisPipeline:
+    """Etapas de un trabajo; cada hilo del pool usa su propio scraper (requests.Session no es seguro entre hilos)."""
+
+    def __init__(self, openai_api_key: str | None, offline: bool = False):
+        self.openai_api_key = openai_api_key
+        self.offline = offline or not openai_api_key
+        self._local = threading.local()
+
+    def _scraper(self):
+        scraper = getattr(self._local, 'scraper', None)
+        if scraper is None:
+            from wcag.scraper import RobustWebScraper
+            scraper = self._local.scraper = RobustWebScraper()
+        return scraper
+
+    def __call__(self, job: Job) -> None:
+        with collect() as trace:
+            self._run(job)
+        # Desglose por etapa de este trabajo; no forma parte de la evaluación cacheada
+        job.result['timings'] = trace.breakdown()
+
+    def _run(self, job: Job) -> None:
+        from wcag.evaluator import get_evaluator
+        from wcag.report import ReportGenerator
+        from wcag.result_cache import hash_content
+
+        payload = job.payload
+        content_hash = None
+        # El trabajo terminado se conserva un tiempo: del documento recibido solo se guardan su hash
+        # y su tamaño, no hasta MAX_BODY_BYTES por trabajo
+        html = payload.pop('html', None)
+        if html is not None:
+            payload['html_sha256'], payload['html_length'] = hash_content(html), len(html)
+        if payload.get('url'):
+            job.stage = 'scraping'
+            scraper = self._scraper()
+            html = scraper.scrape_website(payload['url'])
+            if html is None:
+                raise RuntimeError("No se pudo obtener el contenido del sitio web")
+            content_hash = scraper.last_content_hash
+        else:
+            content_hash = payload['html_sha256']
+        job.stage = 'evaluating'
+        offline = self.offline or bool(payload.get('offline'))
+        job.result = get_evaluator(self.openai_api_key, offline).analyze_html_accessibility(
+            html, content_hash, page_url=payload.get('url')
+        )
+        job.stage = 'report'
+        job.artifacts['pdf'] = ReportGenerator().generate_pdf_report(job.result, payload.get('url')).getvalue()
+
+
+class WCAGApi:
+    def __init__(self, jobs: JobQueue):
+        self.jobs = jobs
+
+    def __call__(self, environ, start_response):
+        method = environ['REQUEST_METHOD']
+        path = environ.get('PATH_INFO') or '/'
+        try:
+            if path == '/jobs':
+                if method != 'POST':
+                    return self._json(start_response, 405, {'error': "Usa POST"})
+                return self._create(environ, start_response)
+            if method != 'GET':
+                return self._json(start_response, 405, {'error': "Usa GET"})
+            if path == '/health':
+                return self._json(start_response, 200, {'status': 'ok'})
+            if path == '/metrics':
+                return self._json(start_response, 200, self.jobs.metrics())
+            if path == '/metrics/prometheus':
+                return self._prometheus(start_response)
+            match = _JOB_ROUTE.match(path)
+            if match:
+                return self._job(start_response, match.group(1), match.group(2))
+            return self._json(start_response, 404, {'error': "Ruta desconocida"})
+        except ValueError as e:
+            return self._json(start_response, 400, {'error': str(e)})
+
+    def _create(self, environ, start_response):
+        length = int(environ.get('CONTENT_LENGTH') or 0)
+        if length > MAX_BODY_BYTES:
+            return self._json(start_response, 413, {'error': f"El cuerpo supera {MAX_BODY_BYTES} bytes"})
+        body = environ['wsgi.input'].read(length) if length else b''
+        content_type = (environ.get('CONTENT_TYPE') or '').split(';')[0].strip()
+        if content_type == 'text/html':
+            payload = {'html': body.decode('utf-8', errors='replace')}
+        else:
+            try:
+                payload = json.loads(body or b'{}')
+            except ValueError:
+                raise ValueError("El cuerpo no es JSON válido")
+        if not isinstance(payload, dict) or not (payload.get('url') or payload.get('html')):
+            raise ValueError("Indica 'url' o 'html'")
+        if payload.get('url') and not str(payload['url']).startswith(('http://', 'https://')):
+            raise ValueError("La URL debe empezar por http:// o https://")
+        try:
+            job = self.jobs.submit(payload)
+        except QueueFull:
+            return self._json(start_response, 503, {'error': "Cola llena, inténtalo más tarde"},
+                              [('Retry-After', str(RETRY_AFTER_SECONDS))])
+        return self._json(start_response, 202, {**job.describe(), 'links': self._links(job.id)},
+                          [('Location', f"/jobs/{job.id}")])
+
+    def _job(self, start_response, job_id: str, resource: str | None):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return self._json(start_response, 404, {'error': "Trabajo desconocido o caducado"})
+        if resource is None:
+            return self._json(start_response, 200, {**job.describe(), 'links': self._links(job.id)})
+        if job.status == FAILED:
+            return self._json(start_response, 409, job.describe())
+        if job.status != DONE:
+            return self._json(start_response, 409, job.describe(), [('Retry-After', '1')])
+        if resource == '/result':
+            return self._json(start_response, 200, job.result)
+        pdf = job.artifacts['pdf']
+        start_response('200 OK', [('Content-Type', 'application/pdf'), ('Content-Length', str(len(pdf))),
+                                  ('Content-Disposition', f'attachment; filename="reporte_{job.id}.pdf"')])
+        return [pdf]
+
+    def _prometheus(self, start_response):
+        gauges = {f"jobs_{name}": value for name, value in self.jobs.metrics().items()}
+        body = registry.prometheus_text(gauges).encode('utf-8')
+        start_response('200 OK', [('Content-Type', 'text/plain; version=0.0.4; charset=utf-8'),
+                                  ('Content-Length', str(len(body)))])
+        return [body]
+
+    @staticmethod
+    def _links(job_id: str) -> Dict:
+        return {'status': f"/jobs/{job_id}", 'result': f"/jobs/{job_id}/result",
+                'report': f"/jobs/{job_id}/report.pdf"}
+
+    @staticmethod
+    def _json(start_response, status: int, payload, headers=()):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        start_response(f"{status} {_STATUS_TEXT[status]}", [
+            ('Content-Type', 'application/json; charset=utf-8'), ('Content-Length', str(len(body))), *headers
+        ])
+        return [body]
+
+
+def create_app(workers: int = DEFAULT_JOB_WORKERS, max_queued: int = DEFAULT_QUEUE_SIZE, offline: bool = False) -> WCAGApi:
+    """Aplicación WSGI con su cola de trabajos; los hilos arrancan al crearla."""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    pipeline = AnalysisPipeline(os.getenv('OPENAI_API_KEY'), offline=offline)
+    return WCAGApi(JobQueue(pipeline, workers=workers, max_queued=max_queued))
+
+
+def main():
+    import argparse
+    from wsgiref.simple_server import make_server
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=DEFAULT_JOB_WORKERS)
+    parser.add_argument('--offline', action='store_true')
+    args = parser.parse_args()
+    # Servidor de desarrollo de un solo hilo; en producción, gunicorn
+    make_server(args.host, args.port, create_app(args.workers, offline=args.offline)).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
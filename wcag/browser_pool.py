@@ -0,0 +1,277 @@
+"""Pools acotados de navegadores headless de larga duración para Selenium y Playwright.
+
+Los navegadores se reutilizan entre peticiones y se reciclan tras `max_pages` páginas o
+cuando fallan. En lugar de esperas fijas, las páginas se consideran listas cuando el DOM
+deja de mutar durante `quiet_ms` milisegundos (con un tiempo máximo).
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from functools import lru_cache
+
+DEFAULT_POOL_SIZE = int(os.getenv('WCAG_BROWSER_POOL_SIZE', '2'))
+DEFAULT_MAX_PAGES = int(os.getenv('WCAG_BROWSER_MAX_PAGES', '50'))
+DEFAULT_QUIET_MS = 500
+DEFAULT_READY_TIMEOUT = 10
+# Cada cuánto comprueba `run` que quedan workers vivos mientras espera
+WORKER_CHECK_INTERVAL = 1.0
+# Recursos que no hacen falta para obtener el HTML final
+BLOCKED_RESOURCES = "**/*.{png,jpg,jpeg,gif,svg,css,woff,woff2}"
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# Registra el instante de la última mutación del DOM; se instala una vez por página
+INSTALL_MUTATION_TRACKER_JS = """
+() => {
+    if (window.__wcagLastMutation !== undefined) return;
+    window.__wcagLastMutation = performance.now();
+    new MutationObserver(() => { window.__wcagLastMutation = performance.now(); })
+        .observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+}
+"""
+DOM_QUIET_JS = "(quietMs) => performance.now() - window.__wcagLastMutation >= quietMs"
+
+
+class PlaywrightPool:
+    """Cada worker es un hilo dueño de su navegador (la API síncrona no se comparte entre hilos)."""
+
+    def __init__(self, size: int = DEFAULT_POOL_SIZE, max_pages: int = DEFAULT_MAX_PAGES,
+                 quiet_ms: int = DEFAULT_QUIET_MS, ready_timeout: float = DEFAULT_READY_TIMEOUT):
+        self.size = size
+        self.max_pages = max_pages
+        self.quiet_ms = quiet_ms
+        self.ready_timeout = ready_timeout
+        self._jobs = queue.Queue()
+        self._workers = []
+        self._spawned = 0
+        self._lock = threading.Lock()
+        self.recycled = 0
+
+    def _ensure_workers(self) -> None:
+        # Falla en el hilo que llama si Playwright no está instalado
+        import playwright.sync_api  # noqa: F401
+
+        with self._lock:
+            # Un worker que terminó por un error de Playwright se sustituye por uno nuevo
+            self._workers = [worker for worker in self._workers if worker.is_alive()]
+            while len(self._workers) < self.size:
+                worker = threading.Thread(target=self._worker, name=f"playwright-{self._spawned}", daemon=True)
+                self._spawned += 1
+                worker.start()
+                self._workers.append(worker)
+
+    def run(self, url: str, page_callback, timeout: float = 120, blocked_resources: str = BLOCKED_RESOURCES):
+        """Abrir `url` en un contexto nuevo de un navegador del pool y devolver `page_callback(page)`."""
+        self._ensure_workers()
+        future = Future()
+        self._jobs.put((url, page_callback, blocked_resources, future))
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return future.result(timeout=max(0.0, min(WORKER_CHECK_INTERVAL, deadline - time.monotonic())))
+            except FutureTimeout:
+                if time.monotonic() >= deadline:
+                    raise
+                # Si los workers murieron antes de recoger el trabajo, los sustitutos lo atienden o lo fallan
+                self._ensure_workers()
+
+    def fetch(self, url: str, timeout: float = 120) -> str:
+        return self.run(url, lambda page: page.content(), timeout=timeout)
+
+    def shutdown(self, timeout: float = 5) -> None:
+        for _ in self._workers:
+            self._jobs.put(None)
+        for worker in self._workers:
+            worker.join(timeout)
+
+    def _worker(self) -> None:
+        future = None
+        try:
+            from playwright.sync_api import sync_playwright
+
+            with sync_playwright() as playwright:
+                browser = None
+                pages_served = 0
+                while True:
+                    job = self._jobs.get()
+                    if job is None:
+                        break
+                    url, page_callback, blocked_resources, future = job
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        if browser is None or not browser.is_connected():
+                            browser = playwright.chromium.launch(headless=True)
+                            pages_served = 0
+                        future.set_result(self._render(browser, url, page_callback, blocked_resources))
+                        pages_served += 1
+                    except Exception as e:
+                        future.set_exception(e)
+                        # Un navegador caído se descarta; el siguiente trabajo lanza uno nuevo
+                        if browser is not None and not browser.is_connected():
+                            browser = None
+                            self.recycled += 1
+                    if browser is not None and pages_served >= self.max_pages:
+                        self._close_browser(browser)
+                        browser = None
+                        self.recycled += 1
+                if browser is not None:
+                    self._close_browser(browser)
+        except Exception as e:
+            # Playwright no arrancó o falló fuera de un trabajo: el hilo termina, pero nadie
+            # espera hasta el timeout; el siguiente `run` arranca un worker en su lugar
+            self._fail_pending(e, future)
+
+    @staticmethod
+    def _close_browser(browser) -> None:
+        try:
+            browser.close()
+        except Exception:
+            pass  # Un navegador que ya no responde se abandona igualmente
+
+    def _fail_pending(self, error: Exception, current: Future | None) -> None:
+        futures = [current] if current is not None else []
+        sentinels = 0
+        while True:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                sentinels += 1
+            else:
+                futures.append(job[3])
+        # Las señales de parada de `shutdown` siguen siendo para los demás workers
+        for _ in range(sentinels):
+            self._jobs.put(None)
+        for future in futures:
+            if not future.done():
+                future.set_exception(error)
+
+    def _render(self, browser, url: str, page_callback, blocked_resources: str):
+        context = browser.new_context(user_agent=USER_AGENT)
+        try:
+            page = context.new_page()
+            page.route(blocked_resources, lambda route: route.abort())
+            page.goto(url, wait_until='networkidle')
+            page.evaluate(INSTALL_MUTATION_TRACKER_JS)
+            page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+            try:
+                page.wait_for_function(DOM_QUIET_JS, arg=self.quiet_ms, timeout=self.ready_timeout * 1000)
+            except Exception:
+                pass  # Páginas que nunca dejan de mutar: se usa el estado actual
+            return page_callback(page)
+        finally:
+            context.close()
+
+
+class SeleniumPool:
+    """Drivers de undetected-chromedriver reutilizables; se prestan de a uno por petición."""
+
+    def __init__(self, size: int = DEFAULT_POOL_SIZE, max_pages: int = DEFAULT_MAX_PAGES,
+                 quiet_ms: int = DEFAULT_QUIET_MS, ready_timeout: float = DEFAULT_READY_TIMEOUT):
+        self.size = size
+        self.max_pages = max_pages
+        self.quiet_ms = quiet_ms
+        self.ready_timeout = ready_timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._pages_served = {}
+        self.recycled = 0
+
+    @staticmethod
+    def _new_driver():
+        from selenium.webdriver.chrome.options import Options
+        import undetected_chromedriver as uc
+
+        options = Options()
+        options.add_argument('--headless')
+        options.add_argument('--no-sandbox')
+        options.add_argument('--disable-dev-shm-usage')
+        options.add_argument('--disable-blink-features=AutomationControlled')
+        options.add_experimental_option("excludeSwitches", ["enable-automation"])
+        options.add_experimental_option('useAutomationExtension', False)
+        driver = uc.Chrome(options=options)
+        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        return driver
+
+    @contextmanager
+    def checkout(self):
+        self._slots.acquire()
+        try:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                driver = self._new_driver()
+                self._pages_served[id(driver)] = 0
+            healthy = False
+            try:
+                yield driver
+                healthy = True
+            finally:
+                self._pages_served[id(driver)] += 1
+                if healthy and self._pages_served[id(driver)] < self.max_pages and self._reset(driver):
+                    self._idle.put(driver)
+                else:
+                    self._discard(driver)
+        finally:
+            self._slots.release()
+
+    def fetch(self, url: str) -> str:
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+
+        with self.checkout() as driver:
+            driver.get(url)
+            WebDriverWait(driver, self.ready_timeout).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+            driver.execute_script(f"({INSTALL_MUTATION_TRACKER_JS})()")
+            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+            try:
+                WebDriverWait(driver, self.ready_timeout, poll_frequency=0.1).until(
+                    lambda d: d.execute_script(f"return ({DOM_QUIET_JS})(arguments[0])", self.quiet_ms)
+                )
+            except Exception:
+                pass  # Páginas que nunca dejan de mutar: se usa el estado actual
+            return driver.page_source
+
+    @staticmethod
+    def _reset(driver) -> bool:
+        try:
+            driver.delete_all_cookies()
+            driver.get('about:blank')
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, driver) -> None:
+        self._pages_served.pop(id(driver), None)
+        self.recycled += 1
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def shutdown(self) -> None:
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+
+@lru_cache(maxsize=None)
+def get_playwright_pool() -> PlaywrightPool:
+    pool = PlaywrightPool()
+    atexit.register(pool.shutdown)
+    return pool
+
+
+@lru_cache(maxsize=None)
+def get_selenium_pool() -> SeleniumPool:
+    pool = SeleniumPool()
+    atexit.register(pool.shutdown)
+    return pool
@@ -0,0 +1,275 @@
+"""Evaluación por lotes sin Streamlit, repartida en un pool de procesos.
+
+Acepta archivos HTML, directorios (se buscan *.html y *.htm recursivamente), patrones glob,
+URLs y listas de URLs (`--url-list`, una por línea). Cada página produce una línea JSON en la
+salida en cuanto termina, así que un lote interrumpido se puede continuar con `--resume`:
+se omiten las fuentes que ya tienen un resultado sin error en el archivo de salida.
+
+Uso:
+    python -m wcag.cli sitio/ 'archivo/**/*.html' https://ejemplo.com -o resultados.jsonl
+    python -m wcag.cli --url-list urls.txt -o resultados.jsonl --resume --workers 8
+    python -m wcag.cli build/ --offline --fail-under 80
+    python -m wcag.cli --url-list urls.txt -o resultados.jsonl --report sitio.pdf
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Dict, Iterator, Set
+
+from wcag.notify import logger
+
+HTML_SUFFIXES = ('.html', '.htm')
+# Páginas encoladas por proceso; acota la memoria sin dejar procesos ociosos
+QUEUE_PER_WORKER = 4
+
+_worker_options = {}
+
+
+def is_url(source: str) -> bool:
+    return source.startswith(('http://', 'https://'))
+
+
+def expand_sources(inputs, url_lists=()) -> Iterator[str]:
+    """Fuentes a evaluar en orden y sin repetir."""
+    seen = set()
+
+    def fresh(source):
+        if source in seen:
+            return False
+        seen.add(source)
+        return True
+
+    for path in url_lists:
+        with open(path, encoding='utf-8') as handle:
+            for line in handle:
+                line = line.strip()
+                if line and not line.startswith('#') and fresh(line):
+                    yield line
+    for item in inputs:
+        if is_url(item):
+            candidates = [item]
+        elif os.path.isdir(item):
+            candidates = sorted(
+                os.path.join(root, name)
+                for root, _, names in os.walk(item) for name in names if name.lower().endswith(HTML_SUFFIXES)
+            )
+        elif glob.has_magic(item):
+            candidates = sorted(path for path in glob.glob(item, recursive=True) if os.path.isfile(path))
+        elif os.path.isfile(item):
+            candidates = [item]
+        else:
+            logger.warning("No existe: %s", item)
+            candidates = []
+        for source in candidates:
+            if fresh(source):
+                yield source
+
+
+def completed_sources(path: str) -> Set[str]:
+    """Fuentes con resultado válido en una salida previa; descarta una última línea a medio escribir."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, 'rb+') as handle:
+        data = handle.read()
+        if data and not data.endswith(b'\n'):
+            # El proceso se interrumpió escribiendo: la línea incompleta se elimina
+            handle.truncate(data.rfind(b'\n') + 1)
+            data = data[:data.rfind(b'\n') + 1]
+    for line in data.splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if not record.get('error'):
+            done.add(record['source'])
+    return done
+
+
+def _init_worker(openai_api_key: str, offline: bool, log_level: int, workers: int = 1) -> None:
+    logging.basicConfig(level=log_level, format='%(processName)s %(levelname)s %(message)s')
+    _worker_options.update(openai_api_key=openai_api_key, offline=offline, workers=workers)
+
+
+@lru_cache(maxsize=None)
+def _scraper():
+    from wcag.rate_limit import DEFAULT_BURST, DEFAULT_RATE, HostRateLimiter
+    from wcag.scraper import RobustWebScraper
+
+    # Cada proceso tiene su limitador: el límite por host se reparte para que el lote no lo multiplique
+    workers = _worker_options.get('workers', 1)
+    return RobustWebScraper(rate_limiter=HostRateLimiter(rate=DEFAULT_RATE / workers, burst=max(1, DEFAULT_BURST // workers)))
+
+
+def evaluate_source(source: str) -> Dict:
+    """Evaluar una fuente dentro de un proceso del pool; los fallos se devuelven en `error`."""
+    from wcag.evaluator import get_evaluator
+
+    started = time.perf_counter()
+    record = {'source': source}
+    try:
+        content_hash = None
+        if is_url(source):
+            scraper = _scraper()
+            html = scraper.scrape_website(source)
+            if html is None:
+                raise RuntimeError("No se pudo obtener el contenido")
+            content_hash = scraper.last_content_hash
+        else:
+            with open(source, 'rb') as handle:
+                html = handle.read().decode('utf-8', errors='replace')
+        evaluator = get_evaluator(_worker_options['openai_api_key'], _worker_options['offline'])
+        page_url = source if is_url(source) else None
+        record.update(evaluator.analyze_html_accessibility(html, content_hash, page_url=page_url))
+    except Exception as e:
+        record['error'] = f"{type(e).__name__}: {e}"
+    record['elapsed_s'] = round(time.perf_counter() - started, 3)
+    return record
+
+
+def run_batch(sources, output, workers: int, openai_api_key: str, offline: bool,
+              log_level: int = logging.WARNING, on_record=None) -> Dict:
+    """Evaluar `sources` en `workers` procesos escribiendo cada resultado en `output` al terminar."""
+    totals = {'pages': 0, 'errors': 0, 'min_score': None}
+    sources = iter(sources)
+
+    def new_executor():
+        return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(openai_api_key, offline, log_level, workers))
+
+    def emit(future, source) -> bool:
+        """Escribir el resultado; devuelve True si el pool quedó roto."""
+        try:
+            record = future.result()
+        except Exception as e:
+            # Un proceso del pool murió: la fuente queda con error y --resume la repite
+            record = {'source': source, 'error': f"{type(e).__name__}: {e}"}
+        output.write(json.dumps(record, ensure_ascii=False) + '\n')
+        output.flush()
+        totals['pages'] += 1
+        if record.get('error'):
+            totals['errors'] += 1
+        elif totals['min_score'] is None or record.get('score', 0) < totals['min_score']:
+            totals['min_score'] = record.get('score', 0)
+        if on_record is not None:
+            on_record(record)
+        return isinstance(future.exception(), BrokenProcessPool)
+
+    executor = new_executor()
+    pending = {}
+    exhausted = False
+    try:
+        while pending or not exhausted:
+            while not exhausted and len(pending) < workers * QUEUE_PER_WORKER:
+                source = next(sources, None)
+                if source is None:
+                    exhausted = True
+                else:
+                    pending[executor.submit(evaluate_source, source)] = source
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            broken = False
+            for future in done:
+                broken = emit(future, pending.pop(future)) or broken
+            if broken:
+                # El resto de lo encolado en ese pool falla con el mismo error; el lote sigue en uno nuevo
+                for future in wait(pending).done:
+                    emit(future, pending.pop(future))
+                executor.shutdown(wait=False)
+                executor = new_executor()
+    except KeyboardInterrupt:
+        # Lo ya escrito sirve para continuar con --resume
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    finally:
+        executor.shutdown()
+    return totals
+
+
+def write_site_report(results_path: str, report_path: str) -> Dict:
+    """Informe PDF consolidado a partir de la salida JSONL, sin cargarla entera en memoria."""
+    from wcag.report import SiteReportBuilder
+
+    # Con --resume puede haber un error previo de una fuente que luego se evaluó bien
+    succeeded = completed_sources(results_path)
+    with SiteReportBuilder() as builder, open(results_path, encoding='utf-8') as handle:
+        for line in handle:
+            record = json.loads(line)
+            if record.get('error') and record['source'] in succeeded:
+                continue
+            builder.add(record)
+        return builder.write(report_path)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m wcag.cli', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('inputs', nargs='*', help="Archivos, directorios, patrones glob o URLs")
+    parser.add_argument('--url-list', action='append', default=[], help="Archivo con una URL por línea")
+    parser.add_argument('-o', '--output', default='-', help="Archivo JSONL de salida (por defecto, stdout)")
+    parser.add_argument('--resume', action='store_true', help="Omitir las fuentes ya evaluadas en --output")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--offline', action='store_true', help="Solo reglas locales, sin llamadas a OpenAI")
+    parser.add_argument('--fail-under', type=int, default=None,
+                        help="Salir con código 1 si alguna página puntúa por debajo de este valor")
+    parser.add_argument('--report', default=None, help="Escribir además un informe PDF consolidado del lote")
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    log_level = logging.INFO if args.verbose else logging.WARNING
+    logging.basicConfig(level=log_level, format='%(levelname)s %(message)s')
+    if not args.inputs and not args.url_list:
+        parser.error("indica al menos un archivo, directorio, patrón, URL o --url-list")
+    if args.resume and args.output == '-':
+        parser.error("--resume necesita --output")
+    if args.report and args.output == '-':
+        parser.error("--report necesita --output")
+
+    openai_api_key = os.getenv('OPENAI_API_KEY')
+    offline = args.offline or not openai_api_key
+    if offline and not args.offline:
+        logger.warning("Sin OPENAI_API_KEY: se evalúa solo con las reglas locales")
+
+    sources = expand_sources(args.inputs, args.url_list)
+    if args.resume:
+        done = completed_sources(args.output)
+        logger.info("Reanudando: %d fuentes ya evaluadas", len(done))
+        sources = (source for source in sources if source not in done)
+
+    started = time.perf_counter()
+    output = sys.stdout if args.output == '-' else open(args.output, 'a' if args.resume else 'w', encoding='utf-8')
+    try:
+        totals = run_batch(sources, output, max(1, args.workers), openai_api_key, offline, log_level)
+    except KeyboardInterrupt:
+        logger.warning("Interrumpido; usa --resume para continuar")
+        return 130
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    elapsed = time.perf_counter() - started
+    print(f"{totals['pages']} páginas en {elapsed:.1f} s ({totals['pages'] / elapsed if elapsed else 0:.1f}/s), "
+          f"{totals['errors']} con error", file=sys.stderr)
+    if args.report:
+        timings = write_site_report(args.output, args.report)
+        print(f"Informe {args.report}: {timings['pages']} páginas en {timings['total_s']:.1f} s "
+              f"(p50 {timings['per_page_ms_p50']} ms/página)", file=sys.stderr)
+    if totals['errors'] and not totals['pages'] - totals['errors']:
+        return 1
+    if args.fail_under is not None and totals['min_score'] is not None and totals['min_score'] < args.fail_under:
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,499 @@
+"""Cálculo de contraste WCAG a partir de los estilos CSS del documento.
+
+`ContrastAnalyzer` recibe los eventos del recorrido del DOM, resuelve los colores de las
+hojas `<style>` y de los atributos `style` (con herencia del color de texto y el fondo visible
+del ancestro) y registra un estado de estilo por cada nodo de texto. Al terminar, la luminancia
+relativa y la razón de contraste se calculan con NumPy para todos los nodos a la vez.
+Solo se interpretan selectores simples (etiqueta, .clase, #id y sus combinaciones) y se ignoran
+las reglas condicionales (@media, @supports), cuyo efecto no se puede conocer sin renderizar.
+"""
+import colorsys
+import re
+from collections import Counter, defaultdict
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+
+# Umbrales de WCAG 2.1: 1.4.3 (AA), 1.4.6 (AAA) y 1.4.11 (componentes de interfaz, AA)
+AA_NORMAL, AA_LARGE = 4.5, 3.0
+AAA_NORMAL, AAA_LARGE = 7.0, 4.5
+NON_TEXT_MINIMUM = 3.0
+# Texto grande: 18pt (24px) o 14pt (18.66px) en negrita
+LARGE_TEXT_PX = 24.0
+LARGE_BOLD_TEXT_PX = 18.66
+BASE_FONT_PX = 16.0
+
+BLACK = (0.0, 0.0, 0.0)
+WHITE = (255.0, 255.0, 255.0)
+
+VOID_TAGS = frozenset({'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+                       'param', 'source', 'track', 'wbr'})
+NON_RENDERED_TAGS = frozenset({'head', 'script', 'style', 'title', 'template', 'noscript', 'svg'})
+CONTROL_TAGS = frozenset({'button', 'input', 'select', 'textarea'})
+# Cierres implícitos del parser HTML5: lxml los aplica, html.parser y el streaming no.
+# Cada etiqueta cierra las abiertas de `closes` que encuentre antes de un límite de ámbito
+_SCOPE = frozenset({'html', 'body', 'table', 'td', 'th', 'caption', 'button', 'template', 'object'})
+_CLOSES_P = ((frozenset({'p'}), _SCOPE),)
+_CELLS = frozenset({'td', 'th'})
+_TABLE_SCOPE = frozenset({'table', 'html'})
+IMPLIED_END = {
+    **dict.fromkeys(('address', 'article', 'aside', 'blockquote', 'details', 'dialog', 'div', 'dl', 'fieldset',
+                     'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header',
+                     'hgroup', 'hr', 'main', 'menu', 'nav', 'ol', 'p', 'pre', 'section', 'table', 'ul'), _CLOSES_P),
+    'li': _CLOSES_P + ((frozenset({'li'}), _SCOPE | {'ul', 'ol', 'menu'}),),
+    'dd': _CLOSES_P + ((frozenset({'dd', 'dt'}), _SCOPE | {'dl'}),),
+    'dt': _CLOSES_P + ((frozenset({'dd', 'dt'}), _SCOPE | {'dl'}),),
+    'td': ((_CELLS, _TABLE_SCOPE | {'tr'}),),
+    'th': ((_CELLS, _TABLE_SCOPE | {'tr'}),),
+    'tr': ((_CELLS | {'tr'}, _TABLE_SCOPE | {'thead', 'tbody', 'tfoot'}),),
+    **dict.fromkeys(('thead', 'tbody', 'tfoot'), ((_CELLS | {'tr', 'thead', 'tbody', 'tfoot'}, _TABLE_SCOPE),)),
+    'option': ((frozenset({'option'}), frozenset({'select', 'datalist', 'html'})),),
+    'optgroup': ((frozenset({'option', 'optgroup'}), frozenset({'select', 'html'})),),
+}
+_IMPLICITLY_CLOSED = frozenset(tag for rules in IMPLIED_END.values() for closes, _ in rules for tag in closes)
+# Estilos por defecto de los navegadores que afectan al tamaño y peso del texto
+UA_FONT_SCALE = {'h1': 2.0, 'h2': 1.5, 'h3': 1.17, 'h4': 1.0, 'h5': 0.83, 'h6': 0.67, 'small': 0.83}
+UA_BOLD_TAGS = frozenset({'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'b', 'strong', 'th'})
+FONT_SIZE_KEYWORDS = {'xx-small': 9.0, 'x-small': 10.0, 'small': 13.0, 'medium': 16.0, 'large': 18.0,
+                      'x-large': 24.0, 'xx-large': 32.0, 'xxx-large': 48.0}
+
+NAMED_COLORS = {
+    name: tuple(float(int(value[i:i + 2], 16)) for i in (0, 2, 4))
+    for name, value in (item.split(':') for item in (
+        "aliceblue:f0f8ff antiquewhite:faebd7 aqua:00ffff aquamarine:7fffd4 azure:f0ffff beige:f5f5dc "
+        "bisque:ffe4c4 black:000000 blanchedalmond:ffebcd blue:0000ff blueviolet:8a2be2 brown:a52a2a "
+        "burlywood:deb887 cadetblue:5f9ea0 chartreuse:7fff00 chocolate:d2691e coral:ff7f50 "
+        "cornflowerblue:6495ed cornsilk:fff8dc crimson:dc143c cyan:00ffff darkblue:00008b darkcyan:008b8b "
+        "darkgoldenrod:b8860b darkgray:a9a9a9 darkgreen:006400 darkgrey:a9a9a9 darkkhaki:bdb76b "
+        "darkmagenta:8b008b darkolivegreen:556b2f darkorange:ff8c00 darkorchid:9932cc darkred:8b0000 "
+        "darksalmon:e9967a darkseagreen:8fbc8f darkslateblue:483d8b darkslategray:2f4f4f "
+        "darkslategrey:2f4f4f darkturquoise:00ced1 darkviolet:9400d3 deeppink:ff1493 deepskyblue:00bfff "
+        "dimgray:696969 dimgrey:696969 dodgerblue:1e90ff firebrick:b22222 floralwhite:fffaf0 "
+        "forestgreen:228b22 fuchsia:ff00ff gainsboro:dcdcdc ghostwhite:f8f8ff gold:ffd700 "
+        "goldenrod:daa520 gray:808080 green:008000 greenyellow:adff2f grey:808080 honeydew:f0fff0 "
+        "hotpink:ff69b4 indianred:cd5c5c indigo:4b0082 ivory:fffff0 khaki:f0e68c lavender:e6e6fa "
+        "lavenderblush:fff0f5 lawngreen:7cfc00 lemonchiffon:fffacd lightblue:add8e6 lightcoral:f08080 "
+        "lightcyan:e0ffff lightgoldenrodyellow:fafad2 lightgray:d3d3d3 lightgreen:90ee90 lightgrey:d3d3d3 "
+        "lightpink:ffb6c1 lightsalmon:ffa07a lightseagreen:20b2aa lightskyblue:87cefa "
+        "lightslategray:778899 lightslategrey:778899 lightsteelblue:b0c4de lightyellow:ffffe0 lime:00ff00 "
+        "limegreen:32cd32 linen:faf0e6 magenta:ff00ff maroon:800000 mediumaquamarine:66cdaa "
+        "mediumblue:0000cd mediumorchid:ba55d3 mediumpurple:9370db mediumseagreen:3cb371 "
+        "mediumslateblue:7b68ee mediumspringgreen:00fa9a mediumturquoise:48d1cc mediumvioletred:c71585 "
+        "midnightblue:191970 mintcream:f5fffa mistyrose:ffe4e1 moccasin:ffe4b5 navajowhite:ffdead "
+        "navy:000080 oldlace:fdf5e6 olive:808000 olivedrab:6b8e23 orange:ffa500 orangered:ff4500 "
+        "orchid:da70d6 palegoldenrod:eee8aa palegreen:98fb98 paleturquoise:afeeee palevioletred:db7093 "
+        "papayawhip:ffefd5 peachpuff:ffdab9 peru:cd853f pink:ffc0cb plum:dda0dd powderblue:b0e0e6 "
+        "purple:800080 rebeccapurple:663399 red:ff0000 rosybrown:bc8f8f royalblue:4169e1 "
+        "saddlebrown:8b4513 salmon:fa8072 sandybrown:f4a460 seagreen:2e8b57 seashell:fff5ee sienna:a0522d "
+        "silver:c0c0c0 skyblue:87ceeb slateblue:6a5acd slategray:708090 slategrey:708090 snow:fffafa "
+        "springgreen:00ff7f steelblue:4682b4 tan:d2b48c teal:008080 thistle:d8bfd8 tomato:ff6347 "
+        "turquoise:40e0d0 violet:ee82ee wheat:f5deb3 white:ffffff whitesmoke:f5f5f5 yellow:ffff00 "
+        "yellowgreen:9acd32"
+    ).split())
+}
+
+_COLOR_TOKEN = re.compile(r'#[0-9a-fA-F]{3,8}\b|(?:rgba?|hsla?)\([^)]*\)|[a-zA-Z]+')
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_SIMPLE_SELECTOR = re.compile(r'^([a-zA-Z][\w-]*|\*)?((?:[.#][\w-]+)*)$')
+_LENGTH = re.compile(r'^([\d.]+)(px|pt|em|rem|%)?$')
+
+
+@lru_cache(maxsize=4096)
+def parse_color(value: str) -> Tuple[Tuple[float, float, float], float] | None:
+    """((r, g, b), alfa) de un color CSS; None si no es un color reconocible."""
+    value = value.strip().lower()
+    if value in NAMED_COLORS:
+        return NAMED_COLORS[value], 1.0
+    if value == 'transparent':
+        return BLACK, 0.0
+    if value.startswith('#'):
+        digits = value[1:]
+        if len(digits) in (3, 4):
+            digits = ''.join(c * 2 for c in digits)
+        if len(digits) not in (6, 8):
+            return None
+        try:
+            channels = [int(digits[i:i + 2], 16) for i in range(0, len(digits), 2)]
+        except ValueError:
+            return None
+        alpha = channels[3] / 255 if len(channels) == 4 else 1.0
+        return (float(channels[0]), float(channels[1]), float(channels[2])), alpha
+    match = re.match(r'^(rgba?|hsla?)\((.*)\)$', value)
+    if not match:
+        return None
+    parts = [part for part in re.split(r'[\s,/]+', match.group(2).strip()) if part]
+    if len(parts) not in (3, 4):
+        return None
+    try:
+        alpha = _channel(parts[3], 1.0) if len(parts) == 4 else 1.0
+        if match.group(1).startswith('rgb'):
+            rgb = tuple(_channel(part, 255.0) for part in parts[:3])
+        else:
+            hue = float(parts[0].replace('deg', '')) / 360 % 1.0
+            lightness, saturation = _channel(parts[2], 1.0), _channel(parts[1], 1.0)
+            rgb = tuple(channel * 255 for channel in colorsys.hls_to_rgb(hue, lightness, saturation))
+    except ValueError:
+        return None
+    return rgb, min(1.0, max(0.0, alpha))
+
+
+def _channel(part: str, scale: float) -> float:
+    if part.endswith('%'):
+        return min(scale, max(0.0, float(part[:-1]) / 100 * scale))
+    value = float(part)
+    # En hsl() la saturación y luminosidad sin % se interpretan como fracciones (0-1)
+    return min(scale, max(0.0, value if scale != 1.0 or value <= 1 else value / 100))
+
+
+def background_color(value: str):
+    """Color de `background`/`background-color`; 'unknown' si hay imagen o degradado."""
+    value = value.strip().lower()
+    if 'url(' in value or 'gradient(' in value:
+        return 'unknown'
+    for token in _COLOR_TOKEN.findall(value):
+        color = parse_color(token)
+        if color is not None:
+            return color
+    return None
+
+
+def blend(foreground: Tuple[float, float, float], alpha: float, background: Tuple[float, float, float]):
+    if alpha >= 1.0:
+        return foreground
+    return tuple(alpha * f + (1 - alpha) * b for f, b in zip(foreground, background))
+
+
+@lru_cache(maxsize=4096)
+def parse_declarations(text: str) -> Dict[str, str]:
+    """Declaraciones de un bloque CSS; el dict se comparte entre llamadas y no debe modificarse."""
+    declarations = {}
+    for item in text.split(';'):
+        name, sep, value = item.partition(':')
+        if sep:
+            declarations[name.strip().lower()] = value.replace('!important', '').strip()
+    return declarations
+
+
+class StyleSheet:
+    """Reglas CSS con selectores simples, indexadas por id, clase y etiqueta."""
+
+    def __init__(self):
+        self._by_id = defaultdict(list)
+        self._by_class = defaultdict(list)
+        self._by_tag = defaultdict(list)
+        self._universal = []
+        self._order = 0
+        self._matches = {}
+
+    def __bool__(self) -> bool:
+        return self._order > 0
+
+    def add_css(self, css: str) -> None:
+        self._matches = {}
+        css = _CSS_COMMENT.sub('', css)
+        position, depth, selector_start = 0, 0, 0
+        while position < len(css):
+            char = css[position]
+            if char == '{':
+                if depth == 0:
+                    # Las sentencias @import/@charset terminan en ';' y no forman parte del selector
+                    selectors = css[selector_start:position].rsplit(';', 1)[-1].strip()
+                    end = css.find('}', position)
+                    if selectors.startswith('@'):
+                        # Reglas condicionales: se salta el bloque completo, con sus llaves anidadas
+                        depth = 1
+                        selector_start = None
+                    elif end < 0:
+                        return
+                    else:
+                        self._add_rule(selectors, parse_declarations(css[position + 1:end]))
+                        position = end
+                        selector_start = end + 1
+                else:
+                    depth += 1
+            elif char == '}' and depth:
+                depth -= 1
+                if depth == 0:
+                    selector_start = position + 1
+            position += 1
+
+    def _add_rule(self, selectors: str, declarations: Dict[str, str]) -> None:
+        relevant = {name: value for name, value in declarations.items()
+                    if name in ('color', 'background', 'background-color', 'border-color', 'font-size', 'font-weight')}
+        if not relevant:
+            return
+        for selector in selectors.split(','):
+            match = _SIMPLE_SELECTOR.match(selector.strip())
+            if not match or not selector.strip():
+                continue
+            tag = (match.group(1) or '*').lower()
+            ids = re.findall(r'#([\w-]+)', match.group(2))
+            classes = frozenset(re.findall(r'\.([\w-]+)', match.group(2)))
+            specificity = (len(ids), len(classes), 0 if tag == '*' else 1)
+            self._order += 1
+            rule = (specificity, self._order, tag, ids[0] if ids else None, classes, relevant)
+            if ids:
+                self._by_id[ids[0]].append(rule)
+            elif classes:
+                self._by_class[next(iter(classes))].append(rule)
+            elif tag != '*':
+                self._by_tag[tag].append(rule)
+            else:
+                self._universal.append(rule)
+
+    def match(self, tag: str, element_id: str | None, classes: frozenset) -> Tuple[tuple, Dict[str, str]]:
+        """(identificador de las reglas aplicadas, declaraciones resultantes por especificidad)."""
+        cache_key = (tag, element_id, classes)
+        cached = self._matches.get(cache_key)
+        if cached is not None:
+            return cached
+        candidates = list(self._universal)
+        candidates.extend(self._by_tag.get(tag, ()))
+        if element_id:
+            candidates.extend(self._by_id.get(element_id, ()))
+        for name in classes:
+            candidates.extend(self._by_class.get(name, ()))
+        applied, declarations = [], {}
+        for _, order, rule_tag, rule_id, rule_classes, values in sorted(candidates, key=lambda rule: rule[:2]):
+            if (rule_tag in ('*', tag)) and (rule_id is None or rule_id == element_id) and rule_classes <= classes:
+                applied.append(order)
+                declarations.update(values)
+        result = self._matches[cache_key] = (tuple(applied), declarations)
+        return result
+
+
+class _Style(NamedTuple):
+    foreground: Tuple[float, float, float]
+    background: object  # (r, g, b) o 'unknown'
+    font_px: float
+    bold: bool
+
+
+def _font_size(value: str, parent_px: float) -> float:
+    value = value.strip().lower()
+    if value in FONT_SIZE_KEYWORDS:
+        return FONT_SIZE_KEYWORDS[value]
+    if value == 'smaller':
+        return parent_px * 0.83
+    if value == 'larger':
+        return parent_px * 1.2
+    match = _LENGTH.match(value)
+    if not match:
+        return parent_px
+    number, unit = float(match.group(1)), match.group(2) or 'px'
+    return {'px': number, 'pt': number * 4 / 3, 'em': number * parent_px, 'rem': number * BASE_FONT_PX,
+            '%': number * parent_px / 100}[unit]
+
+
+def _is_bold(value: str, parent_bold: bool) -> bool:
+    value = value.strip().lower()
+    if value in ('bold', 'bolder'):
+        return True
+    if value in ('normal', 'lighter'):
+        return False
+    return int(value) >= 700 if value.isdigit() else parent_bold
+
+
+def relative_luminance(rgb: np.ndarray) -> np.ndarray:
+    """Luminancia relativa de WCAG 2.1 para una matriz (n, 3) de canales 0-255."""
+    channels = rgb / 255.0
+    linear = np.where(channels <= 0.03928, channels / 12.92, ((channels + 0.055) / 1.055) ** 2.4)
+    return linear @ np.array([0.2126, 0.7152, 0.0722])
+
+
+def contrast_ratios(foreground: np.ndarray, background: np.ndarray) -> np.ndarray:
+    first, second = relative_luminance(foreground), relative_luminance(background)
+    return (np.maximum(first, second) + 0.05) / (np.minimum(first, second) + 0.05)
+
+
+class ContrastReport(NamedTuple):
+    text_nodes: int
+    undetermined: int
+    aa_failures: int
+    aaa_failures: int
+    non_text_failures: int
+    # Etiqueta -> nodos de texto que no alcanzan el mínimo AA
+    failures_by_tag: Dict[str, int]
+    min_ratio: float | None
+
+
+class ContrastAnalyzer:
+    def __init__(self):
+        self.sheet = StyleSheet()
+        # Pila de (etiqueta, estilo calculado); la raíz representa los valores por defecto
+        self._stack: List[Tuple[str, _Style]] = [('', _Style(BLACK, WHITE, BASE_FONT_PX, False))]
+        # Elementos abiertos que un cierre implícito podría cerrar; con 0 no hace falta buscarlos
+        self._closable = 0
+        self._in_style = False
+        self._css = []
+        # Estilos ya resueltos por (estilo del padre, etiqueta, reglas aplicadas, estilo en línea)
+        self._resolved = {}
+        # Un estado por combinación distinta de etiqueta y estilo con su número de nodos de texto;
+        # la memoria depende de los estilos distintos, no del tamaño del documento
+        self._states: Dict[Tuple[str, _Style], int] = {}
+        self._node_counts: List[int] = []
+        self._controls = Counter()
+
+    def start(self, tag: str, attrs) -> None:
+        if self._closable:
+            implied = IMPLIED_END.get(tag)
+            if implied is not None:
+                self._close_implied(implied)
+        parent = self._stack[-1][1]
+        applied, declarations = None, None
+        if self.sheet:
+            classes = attrs.get('class') if attrs else None
+            if isinstance(classes, str):
+                classes = classes.split()
+            applied, declarations = self.sheet.match(tag, attrs.get('id') if attrs else None, frozenset(classes or ()))
+        inline = attrs.get('style') if attrs else None
+        if applied or inline or tag in UA_FONT_SCALE or tag in UA_BOLD_TAGS:
+            key = (parent, tag, applied, inline)
+            resolved = self._resolved.get(key)
+            if resolved is None:
+                if inline:
+                    declarations = {**(declarations or {}), **parse_declarations(inline)}
+                resolved = self._resolved[key] = self._resolve(parent, tag, declarations)
+            style, control = resolved
+            if control is not None:
+                self._controls[control] += 1
+        else:
+            style = parent
+        if tag == 'style':
+            self._in_style = True
+        if tag not in VOID_TAGS:
+            self._stack.append((tag, style))
+            if tag in _IMPLICITLY_CLOSED:
+                self._closable += 1
+
+    def _close_implied(self, implied) -> None:
+        # Sin esto el estilo de un <p> sin cerrar se heredaría en todos los párrafos siguientes
+        stack = self._stack
+        for closes, boundary in implied:
+            cut = None
+            for depth in range(len(stack) - 1, 0, -1):
+                open_tag = stack[depth][0]
+                if open_tag in closes:
+                    cut = depth
+                elif open_tag in boundary:
+                    break
+            if cut is not None:
+                self._truncate(cut)
+
+    def _truncate(self, depth: int) -> None:
+        stack = self._stack
+        self._closable -= sum(1 for tag, _ in stack[depth:] if tag in _IMPLICITLY_CLOSED)
+        del stack[depth:]
+
+    def _resolve(self, parent: _Style, tag: str, declarations: Dict[str, str] | None):
+        style = parent
+        if tag in UA_FONT_SCALE:
+            style = style._replace(font_px=parent.font_px * UA_FONT_SCALE[tag])
+        if tag in UA_BOLD_TAGS:
+            style = style._replace(bold=True)
+        control = None
+        if declarations:
+            style = self._apply(style, parent, declarations)
+            if tag in CONTROL_TAGS and parent.background != 'unknown':
+                control = self._control_colors(style, parent, declarations)
+        return style, control
+
+    def _apply(self, style: _Style, parent: _Style, declarations: Dict[str, str]) -> _Style:
+        if 'font-size' in declarations:
+            style = style._replace(font_px=_font_size(declarations['font-size'], parent.font_px))
+        if 'font-weight' in declarations:
+            style = style._replace(bold=_is_bold(declarations['font-weight'], parent.bold))
+        background = declarations.get('background-color') or declarations.get('background')
+        if background is not None:
+            color = background_color(background)
+            if color == 'unknown' or parent.background == 'unknown':
+                style = style._replace(background='unknown')
+            elif color is not None:
+                rgb, alpha = color
+                style = style._replace(background=blend(rgb, alpha, parent.background))
+        color = declarations.get('color')
+        if color is not None and color.strip().lower() not in ('inherit', 'currentcolor'):
+            parsed = parse_color(color)
+            if parsed is not None:
+                rgb, alpha = parsed
+                # Un texto semitransparente se ve mezclado con su fondo
+                surface = style.background if style.background != 'unknown' else WHITE
+                style = style._replace(foreground=blend(rgb, alpha, surface))
+        return style
+
+    @staticmethod
+    def _control_colors(style: _Style, parent: _Style, declarations: Dict[str, str]):
+        # 1.4.11: el borde (o, si no lo hay, el fondo) del control frente al fondo que lo rodea
+        border = declarations.get('border-color')
+        component = parse_color(border) if border else None
+        if component is not None:
+            rgb, alpha = component
+            return blend(rgb, alpha, parent.background), parent.background
+        if ('background-color' in declarations or 'background' in declarations) and style.background != 'unknown':
+            return style.background, parent.background
+        return None
+
+    def end(self, tag: str) -> None:
+        if tag == 'style' and self._in_style:
+            self._in_style = False
+            self.sheet.add_css(''.join(self._css))
+            self._css = []
+        if tag in VOID_TAGS:
+            return
+        # Etiquetas sin cerrar (p, li) en HTML real: se desapila hasta la que coincide
+        stack = self._stack
+        for depth in range(len(stack) - 1, 0, -1):
+            if stack[depth][0] == tag:
+                if depth == len(stack) - 1:
+                    # Caso habitual: se cierra el elemento de la cima
+                    stack.pop()
+                    if tag in _IMPLICITLY_CLOSED:
+                        self._closable -= 1
+                else:
+                    self._truncate(depth)
+                return
+
+    def data(self, text: str) -> None:
+        if self._in_style:
+            self._css.append(text)
+            return
+        state = self._stack[-1]
+        if state[0] in NON_RENDERED_TAGS or text.isspace():
+            return
+        index = self._states.get(state)
+        if index is None:
+            index = self._states[state] = len(self._states)
+            self._node_counts.append(0)
+        self._node_counts[index] += 1
+
+    def report(self) -> ContrastReport:
+        states = [style for _, style in self._states]
+        tags = [tag for tag, _ in self._states]
+        counts = np.array(self._node_counts, dtype=np.int64)
+        known = np.array([state.background != 'unknown' for state in states], dtype=bool)
+        aa_failures = aaa_failures = 0
+        failures_by_tag = Counter()
+        min_ratio = None
+        if states and known.any():
+            foreground = np.array([state.foreground for state in states], dtype=float)
+            background = np.array([state.background if state.background != 'unknown' else WHITE for state in states], dtype=float)
+            large = np.array([state.font_px >= LARGE_TEXT_PX or (state.bold and state.font_px >= LARGE_BOLD_TEXT_PX)
+                              for state in states], dtype=bool)
+            # La razón se calcula una vez por estado y cuenta tantas veces como nodos de texto tiene
+            ratios = contrast_ratios(foreground, background)
+            aa_fail = known & (ratios < np.where(large, AA_LARGE, AA_NORMAL))
+            aaa_fail = known & (ratios < np.where(large, AAA_LARGE, AAA_NORMAL))
+            aa_failures, aaa_failures = int(counts[aa_fail].sum()), int(counts[aaa_fail].sum())
+            for state_index in np.flatnonzero(aa_fail):
+                failures_by_tag[tags[state_index]] += int(counts[state_index])
+            min_ratio = round(float(ratios[known].min()), 2)
+        non_text_failures = 0
+        if self._controls:
+            pairs = list(self._controls)
+            components = np.array(pairs, dtype=float)
+            failing = contrast_ratios(components[:, 0], components[:, 1]) < NON_TEXT_MINIMUM
+            non_text_failures = sum(self._controls[pair] for pair, fails in zip(pairs, failing) if fails)
+        undetermined = int(counts[~known].sum()) if states else 0
+        return ContrastReport(int(counts.sum()), undetermined, aa_failures, aaa_failures, non_text_failures,
+                              dict(failures_by_tag), min_ratio)
@@ -0,0 +1,211 @@
+"""Rastreo asíncrono de listas de URL, sitemaps o un sitio completo con profundidad limitada.
+
+Las páginas se entregan por un iterador asíncrono a medida que llegan; la cola de resultados
+es acotada, de modo que si el consumidor (el evaluador) es más lento los workers esperan en
+lugar de acumular documentos en memoria. Las URL de un host limitado se reprograman para más
+tarde y los workers siguen con otros hosts.
+"""
+import asyncio
+import time
+import xml.etree.ElementTree as ET
+from html.parser import HTMLParser
+from typing import AsyncIterator, Dict, Iterable, List, NamedTuple
+from urllib.parse import urldefrag, urljoin, urlsplit
+
+import aiohttp
+
+from wcag.http_cache import HttpPageCache
+from wcag.rate_limit import HostRateLimiter, get_rate_limiter, parse_retry_after
+
+SKIPPED_EXTENSIONS = ('.pdf', '.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp', '.zip', '.mp4', '.mp3', '.css', '.js')
+
+
+class CrawlResult(NamedTuple):
+    url: str
+    depth: int
+    status: int | None
+    html: str | None
+    error: str | None
+    elapsed: float
+    content_hash: str | None = None
+
+
+class _LinkExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.links = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a':
+            href = dict(attrs).get('href')
+            if href:
+                self.links.append(href)
+
+
+def extract_links(html_content: str, base_url: str) -> List[str]:
+    """Enlaces del mismo host que `base_url`, absolutos y sin fragmento."""
+    parser = _LinkExtractor()
+    parser.feed(html_content)
+    host = urlsplit(base_url).netloc
+    links = []
+    for href in parser.links:
+        url, _ = urldefrag(urljoin(base_url, href))
+        parts = urlsplit(url)
+        if parts.scheme in ('http', 'https') and parts.netloc == host and not parts.path.lower().endswith(SKIPPED_EXTENSIONS):
+            links.append(url)
+    return links
+
+
+def parse_sitemap(xml_content: bytes) -> tuple[List[str], List[str]]:
+    """Devuelve (páginas, sitemaps anidados) de un sitemap o índice de sitemaps."""
+    pages, sitemaps = [], []
+    root = ET.fromstring(xml_content)
+    is_index = root.tag.endswith('sitemapindex')
+    for element in root.iter():
+        if element.tag.endswith('loc') and element.text:
+            (sitemaps if is_index else pages).append(element.text.strip())
+    return pages, sitemaps
+
+
+class AsyncCrawler:
+    """Descarga concurrente con límites global y por host sobre un único pool de conexiones."""
+
+    def __init__(self, max_concurrency: int = 16, per_host_concurrency: int = 4, timeout: float = 30,
+                 max_pages: int = 500, headers: Dict[str, str] = None, result_buffer: int = 8,
+                 rate_limiter: HostRateLimiter = None, max_retries: int = 3, page_cache: HttpPageCache = None):
+        self.max_concurrency = max_concurrency
+        self.per_host_concurrency = per_host_concurrency
+        self.timeout = timeout
+        self.max_pages = max_pages
+        self.headers = headers or {}
+        self.result_buffer = result_buffer
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.max_retries = max_retries
+        # Opcional: con caché se envían peticiones condicionales y los 304 se sirven desde disco
+        self.page_cache = page_cache
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host_concurrency)
+        return self._host_limits[host]
+
+    async def _fetch(self, session: aiohttp.ClientSession, url: str) -> tuple[int | None, str | None, str | None, float | None, str | None]:
+        """(estado, html, error, retry_after, hash del contenido)"""
+        # La caché lee y escribe gzip en disco: fuera del bucle de eventos para no frenar el resto del rastreo
+        cached = await asyncio.to_thread(self.page_cache.lookup, url) if self.page_cache else None
+        async with self._host_limit(url):
+            try:
+                while True:
+                    async with session.get(url, headers=HttpPageCache.conditional_headers(cached)) as response:
+                        if response.status == 304 and cached is not None:
+                            html_content = await asyncio.to_thread(self.page_cache.load_body, cached)
+                            if html_content is not None:
+                                return response.status, html_content, None, None, cached.content_hash
+                            # Copia local ilegible: se repite la petición sin cabeceras condicionales
+                            cached = None
+                            continue
+                        if response.status != 200:
+                            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                            return response.status, None, f"HTTP {response.status}", retry_after, None
+                        html_content = await response.text(errors='replace')
+                        stored = await asyncio.to_thread(
+                            self.page_cache.store, url, html_content,
+                            response.headers.get('ETag'), response.headers.get('Last-Modified')
+                        ) if self.page_cache else None
+                        return response.status, html_content, None, None, stored.content_hash if stored else None
+            except Exception as e:
+                return None, None, str(e) or type(e).__name__, None, None
+
+    async def _sitemap_urls(self, session: aiohttp.ClientSession, sitemap_url: str, seen: set) -> List[str]:
+        if sitemap_url in seen:
+            return []
+        seen.add(sitemap_url)
+        async with self._host_limit(sitemap_url):
+            async with session.get(sitemap_url) as response:
+                response.raise_for_status()
+                content = await response.read()
+        pages, nested = parse_sitemap(content)
+        for nested_url in nested:
+            pages.extend(await self._sitemap_urls(session, nested_url, seen))
+        return pages
+
+    async def crawl(self, urls: Iterable[str] = (), sitemap: str = None, start_url: str = None,
+                    max_depth: int = 0) -> AsyncIterator[CrawlResult]:
+        """Rastrear `urls`, las páginas de `sitemap` y/o el sitio desde `start_url` hasta `max_depth`."""
+        # Los semáforos quedan ligados al bucle de eventos: se crean de nuevo en cada rastreo
+        self._host_limits = {}
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency, limit_per_host=self.per_host_concurrency)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=self.headers) as session:
+            frontier: asyncio.Queue = asyncio.Queue()
+            results: asyncio.Queue = asyncio.Queue(maxsize=self.result_buffer)
+            seen = set()
+
+            loop = asyncio.get_running_loop()
+
+            def enqueue(url: str, depth: int) -> None:
+                url, _ = urldefrag(url)
+                if url not in seen and len(seen) < self.max_pages:
+                    seen.add(url)
+                    frontier.put_nowait((url, depth, 0))
+
+            def requeue(item) -> None:
+                frontier.put_nowait(item)
+                frontier.task_done()
+
+            def defer(item, delay: float) -> None:
+                # task_done se llama al reencolar: mientras tanto frontier.join() no termina
+                loop.call_later(delay, requeue, item)
+
+            for url in urls:
+                enqueue(url, max_depth)
+            if sitemap:
+                for url in await self._sitemap_urls(session, sitemap, set()):
+                    enqueue(url, max_depth)
+            if start_url:
+                enqueue(start_url, 0)
+
+            async def worker():
+                while True:
+                    url, depth, attempt = await frontier.get()
+                    host = urlsplit(url).netloc
+                    wait = self.rate_limiter.try_acquire(host)
+                    if wait > 0:
+                        defer((url, depth, attempt), wait)
+                        continue
+                    started = time.perf_counter()
+                    status, html_content, error, retry_after, content_hash = await self._fetch(session, url)
+                    if (status is None or status == 429 or status >= 500) and attempt < self.max_retries:
+                        self.rate_limiter.backoff(host, retry_after if status == 429 else None)
+                        defer((url, depth, attempt + 1), 0)
+                        continue
+                    try:
+                        if html_content:
+                            self.rate_limiter.on_success(host)
+                            if depth < max_depth:
+                                for link in extract_links(html_content, url):
+                                    enqueue(link, depth + 1)
+                        await results.put(CrawlResult(url, depth, status, html_content, error, time.perf_counter() - started, content_hash))
+                    finally:
+                        frontier.task_done()
+
+            workers = [asyncio.create_task(worker()) for _ in range(self.max_concurrency)]
+
+            async def close_when_done():
+                await frontier.join()
+                await results.put(None)
+
+            closer = asyncio.create_task(close_when_done())
+            try:
+                while True:
+                    result = await results.get()
+                    if result is None:
+                        break
+                    yield result
+            finally:
+                closer.cancel()
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(closer, *workers, return_exceptions=True)
@@ -0,0 +1,335 @@
+"""Evaluación WCAG de un documento: reglas locales, recuperación de criterios y modelo de OpenAI."""
+import asyncio
+import json
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Dict
+
+from openai import AsyncOpenAI, OpenAI  # Debe ser openai>=1.0
+
+from wcag.html_features import extract_analysis_data, extract_analysis_data_stream
+from wcag.incremental import extract_analysis_data_incremental, region_cache_key
+from wcag.knowledge import EMBEDDING_MODEL
+from wcag.llm import (DEFAULT_LLM_CONCURRENCY, DEFAULT_TOKENS_PER_MINUTE, JSON_RESPONSE_FORMAT, MAX_COMPLETION_TOKENS,
+                      AsyncLLMStage, larger_max_tokens, usage_record)
+from wcag.notify import log_notify
+from wcag.partial_json import PartialJSONParser
+from wcag.prompt import DEFAULT_PROMPT_TOKEN_BUDGET, build_prompt
+from wcag.rendered import apply_rendered_styles
+from wcag.result_cache import ResultCache, get_result_cache, hash_content, make_cache_key, make_content_key
+from wcag.retrieval import CriterionIndex, QueryEmbedder, issue_queries
+from wcag.templates import SiteTemplates
+from wcag.tracing import count, span
+from wcag.wcag_rules import RuleEngine, evaluate_offline, issue_text
+
+
+@lru_cache(maxsize=None)
+def create_wcag_index() -> CriterionIndex:
+    """Crear y cachear el índice de criterios WCAG 2.1 a partir de embeddings persistidos"""
+    from langchain_openai import OpenAIEmbeddings
+
+    embeddings = OpenAIEmbeddings(openai_api_key=os.getenv("OPENAI_API_KEY"), model=EMBEDDING_MODEL)
+    # Solo se llama a la API de embeddings si el texto de los criterios cambió desde el último artefacto
+    return CriterionIndex.from_embeddings(embeddings.embed_documents)
+
+
+class WCAGEvaluator:
+    # El modo JSON requiere un modelo que admita response_format (gpt-4-turbo, gpt-4o, ...)
+    MODEL = os.getenv('WCAG_OPENAI_MODEL', "gpt-4-turbo")
+    # Incrementar al cambiar el prompt para invalidar los resultados cacheados
+    PROMPT_VERSION = "5"
+    # Criterios recuperados por cada problema detectado
+    CRITERIA_PER_ISSUE = 3
+    MAX_CRITERIA = 10
+    # Tokens máximos del prompt; por encima se resumen los hallazgos con menos detalle
+    PROMPT_TOKEN_BUDGET = DEFAULT_PROMPT_TOKEN_BUDGET
+    # Intervalo mínimo entre actualizaciones de la interfaz durante el streaming de la respuesta
+    STREAM_UPDATE_INTERVAL = 0.15
+
+    def __init__(self, openai_api_key: str, result_cache: ResultCache = None, offline: bool = False,
+                 notify=log_notify):
+        self.openai_api_key = openai_api_key
+        self.notify = notify
+        # Sin conexión el veredicto sale solo de las reglas locales, sin llamadas de red
+        self.offline = offline
+        self.result_cache = result_cache or get_result_cache()
+        # Los clientes y componentes de LangChain/RAG se construyen al primer uso; el
+        # RLock permite que una fábrica dependa de otra (query_embedder -> embeddings)
+        self._lock = threading.RLock()
+        self._client = None
+        self._embeddings = None
+        self._query_embedder = None
+        self._index = None
+
+    def _lazy(self, attr: str, factory):
+        value = getattr(self, attr)
+        if value is None:
+            with self._lock:
+                value = getattr(self, attr)
+                if value is None:
+                    value = factory()
+                    setattr(self, attr, value)
+        return value
+
+    @property
+    def client(self) -> OpenAI:
+        return self._lazy('_client', lambda: OpenAI(api_key=self.openai_api_key))  # openai>=1.0
+
+    @asynccontextmanager
+    async def async_stage(self, max_concurrency: int = DEFAULT_LLM_CONCURRENCY,
+                          tokens_per_minute: int = DEFAULT_TOKENS_PER_MINUTE):
+        """Etapa asíncrona para evaluar muchas páginas a la vez; el cliente vive en el bucle actual"""
+        # Los reintentos los gestiona la etapa, con backoff y presupuesto de tokens
+        if self.offline:
+            yield None
+            return
+        client = AsyncOpenAI(api_key=self.openai_api_key, max_retries=0)
+        try:
+            yield AsyncLLMStage(client, self.MODEL, max_concurrency=max_concurrency, tokens_per_minute=tokens_per_minute)
+        finally:
+            await client.close()
+
+    @property
+    def embeddings(self):
+        from langchain_openai import OpenAIEmbeddings
+        return self._lazy('_embeddings', lambda: OpenAIEmbeddings(openai_api_key=self.openai_api_key, model=EMBEDDING_MODEL))
+
+    @property
+    def query_embedder(self) -> QueryEmbedder:
+        return self._lazy('_query_embedder', lambda: QueryEmbedder(self.embeddings.embed_documents))
+
+    @property
+    def index(self) -> CriterionIndex:
+        return self._lazy('_index', create_wcag_index)
+
+    def analyze_html_accessibility(self, html_content: str, content_hash: str = None,
+                                   on_analysis_data=None, on_partial=None, rendered_styles: Dict = None,
+                                   page_url: str = None, templates: SiteTemplates = None) -> Dict:
+        """Con `on_analysis_data`/`on_partial` se notifican las métricas del DOM en cuanto están
+        listas y el resultado parcial del modelo a medida que llegan los tokens. `rendered_styles`
+        son los estilos calculados por el navegador (wcag.rendered). Con `page_url` solo se vuelven
+        a recorrer las regiones del DOM que cambiaron desde la auditoría anterior de esa URL. Con
+        `templates` (auditoría de sitio) los componentes compartidos con otras páginas se evalúan
+        una vez y se informan aparte"""
+        if rendered_styles is not None:
+            # El mismo HTML con estilos distintos da otro resultado: no se usa la clave por contenido
+            analysis_data = apply_rendered_styles(extract_analysis_data(html_content, rules=RuleEngine()), rendered_styles)
+            return self._evaluate_analysis_data(analysis_data, None, on_analysis_data, on_partial)
+        if self.offline:
+            analysis_data, incremental = self._extract(html_content, page_url, templates)
+            return self._with_incremental(self._evaluate_analysis_data(analysis_data, None, on_analysis_data), incremental)
+        # Un documento idéntico a uno ya evaluado no se vuelve a analizar; con plantillas el
+        # resultado depende de las demás páginas de la auditoría y solo vale la clave por datos
+        content_key = None
+        if templates is None:
+            content_key = make_content_key(content_hash or hash_content(html_content), self.PROMPT_VERSION, self.MODEL)
+            cached = self._cached_result(content_key)
+            if cached is not None:
+                return cached
+        analysis_data, incremental = self._extract(html_content, page_url, templates)
+        result = self._evaluate_analysis_data(analysis_data, content_key, on_analysis_data, on_partial)
+        return self._with_incremental(result, incremental)
+
+    def _extract(self, html_content: str, page_url: str = None,
+                 templates: SiteTemplates = None) -> tuple[Dict, Dict | None]:
+        """`analysis_data` del documento; con `page_url`, reutilizando las regiones sin cambios"""
+        if page_url is None:
+            return extract_analysis_data(html_content, rules=RuleEngine()), None
+        state_key = region_cache_key(page_url)
+        if templates is None:
+            run = extract_analysis_data_incremental(html_content, self.result_cache.get(state_key, kind='regions'))
+            self._store_regions(state_key, run.regions)
+            return run.analysis_data, {'regions': run.total, 'reused': run.reused}
+        run = templates.extract(html_content, page_url, self.result_cache.get(state_key, kind='regions'))
+        self._store_regions(state_key, run.regions)
+        return run.analysis_data, {'regions': run.total, 'reused': run.reused, 'template_regions': run.template_regions}
+
+    def _store_regions(self, state_key: str, regions) -> None:
+        # Sin estado guardado la próxima auditoría recorre todo; el análisis actual sigue valiendo
+        try:
+            self.result_cache.set(state_key, regions, kind='regions')
+        except OSError as e:
+            self.notify('warning', f"No se pudo guardar el estado incremental en la caché: {str(e)}")
+
+    @staticmethod
+    def _with_template_issues(result: Dict, analysis_data: Dict) -> Dict:
+        # El modelo solo lista lo específico de la página; los componentes compartidos, aparte
+        if 'template_findings' in analysis_data:
+            result['template_issues'] = [issue_text(finding) for finding in analysis_data['template_findings']]
+        return result
+
+    @staticmethod
+    def _with_incremental(result: Dict, incremental: Dict | None) -> Dict:
+        # Fuera de analysis_data: no debe cambiar la clave de caché del resultado
+        if incremental is not None:
+            result['incremental'] = incremental
+        return result
+
+    def analyze_html_stream(self, chunks, on_analysis_data=None, on_partial=None) -> Dict:
+        """Analizar un documento recibido por fragmentos sin construir el árbol completo"""
+        analysis_data = extract_analysis_data_stream(chunks, rules=RuleEngine())
+        return self._evaluate_analysis_data(analysis_data, None, on_analysis_data, on_partial)
+
+    async def analyze_html_async(self, html_content: str, stage: AsyncLLMStage, content_hash: str = None,
+                                 page_url: str = None, templates: SiteTemplates = None) -> Dict:
+        """Variante asíncrona para auditorías: el análisis del DOM corre en un hilo y la llamada
+        al modelo comparte la concurrencia y el presupuesto de tokens de `stage`"""
+        if self.offline:
+            return await asyncio.to_thread(self.analyze_html_accessibility, html_content,
+                                           page_url=page_url, templates=templates)
+        content_key = None
+        if templates is None:
+            content_key = make_content_key(content_hash or hash_content(html_content), self.PROMPT_VERSION, self.MODEL)
+            cached = self._cached_result(content_key)
+            if cached is not None:
+                return cached
+        analysis_data, incremental = await asyncio.to_thread(self._extract, html_content, page_url, templates)
+        cache_key = make_cache_key(analysis_data, self.PROMPT_VERSION, self.MODEL)
+        cached = self._cached_result(cache_key, content_key)
+        if cached is not None:
+            return self._with_incremental(cached, incremental)
+
+        related_criteria = await asyncio.to_thread(self._retrieve_criteria, analysis_data)
+        with span('prompt'):
+            prompt = build_prompt(analysis_data, related_criteria, self.MODEL, self.PROMPT_TOKEN_BUDGET)
+        try:
+            result, usage = await stage.complete_json(prompt.messages, prompt.prompt_tokens)
+        except Exception as e:
+            self.notify('warning', f"Error en análisis con IA: {str(e)}")
+            return self._with_incremental(self._fallback_analysis(analysis_data), incremental)
+        result['llm_usage'] = {**usage, 'prompt_truncated': prompt.truncated}
+        self._store_result(self._with_template_issues(result, analysis_data), cache_key, content_key)
+        return self._with_incremental(result, incremental)
+
+    def _cached_result(self, cache_key: str, content_key: str = None) -> Dict | None:
+        cached = self.result_cache.get(cache_key)
+        count('result_cache', outcome='miss' if cached is None else 'hit')
+        if cached is not None:
+            if content_key:
+                self._store_result(cached, content_key)
+            if 'llm_usage' in cached:
+                # El consumo registrado es el de la llamada original; esta respuesta no costó nada
+                cached['llm_usage']['cached'] = True
+        return cached
+
+    def _store_result(self, result: Dict, cache_key: str, content_key: str = None) -> None:
+        # Un fallo al guardar no debe descartar una respuesta válida del modelo
+        try:
+            self.result_cache.set(cache_key, result)
+            if content_key:
+                self.result_cache.set(content_key, result)
+        except OSError as e:
+            self.notify('warning', f"No se pudo guardar el resultado en la caché: {str(e)}")
+
+    def _evaluate_analysis_data(self, analysis_data: Dict, content_key: str = None,
+                                on_analysis_data=None, on_partial=None) -> Dict:
+        if on_analysis_data is not None:
+            on_analysis_data(analysis_data)
+        if self.offline:
+            return evaluate_offline(analysis_data)
+        cache_key = make_cache_key(analysis_data, self.PROMPT_VERSION, self.MODEL)
+        cached = self._cached_result(cache_key, content_key)
+        if cached is not None:
+            return cached
+
+        related_criteria = self._retrieve_criteria(analysis_data)
+        with span('prompt'):
+            prompt = build_prompt(analysis_data, related_criteria, self.MODEL, self.PROMPT_TOKEN_BUDGET)
+        try:
+            if on_partial is None:
+                result, usage = self._complete(prompt)
+            else:
+                result, usage = self._complete_streaming(prompt, on_partial)
+        except Exception as e:
+            # Mismo nivel que la ruta asíncrona: hay veredicto, el de las reglas locales
+            self.notify('warning', f"Error en análisis con IA: {str(e)}")
+            return self._fallback_analysis(analysis_data)
+        result['llm_usage'] = {**usage, 'prompt_truncated': prompt.truncated}
+        self._store_result(self._with_template_issues(result, analysis_data), cache_key, content_key)
+        return result
+
+    def _complete(self, prompt) -> tuple[Dict, Dict]:
+        # Mismo límite que la ruta asíncrona; una respuesta cortada se repite con más margen
+        max_tokens = MAX_COMPLETION_TOKENS
+        while True:
+            started = time.perf_counter()
+            with span('llm', mode='sync') as call:
+                response = self.client.chat.completions.create(
+                    model=self.MODEL,
+                    messages=prompt.messages,
+                    temperature=0.1,
+                    max_tokens=max_tokens,
+                    response_format=JSON_RESPONSE_FORMAT
+                )
+                usage = usage_record(self.MODEL, response.usage, time.perf_counter() - started, prompt.prompt_tokens)
+                call.add('tokens', usage['total_tokens'])
+            choice = response.choices[0]
+            try:
+                return json.loads(choice.message.content), usage
+            except json.JSONDecodeError:
+                max_tokens = larger_max_tokens(choice, max_tokens)
+                if max_tokens is None:
+                    raise
+
+    def _complete_streaming(self, prompt, on_partial) -> tuple[Dict, Dict]:
+        """Igual que `_complete`, pero entrega a `on_partial` el objeto JSON parcial según llega"""
+        started = time.perf_counter()
+        # Incluye el tiempo de `on_partial`, que se ejecuta entre fragmentos de la respuesta
+        with span('llm', mode='stream') as call:
+            stream = self.client.chat.completions.create(
+                model=self.MODEL,
+                messages=prompt.messages,
+                temperature=0.1,
+                max_tokens=MAX_COMPLETION_TOKENS,
+                response_format=JSON_RESPONSE_FORMAT,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            parser = PartialJSONParser()
+            response_usage = None
+            first_token = None
+            last_update = 0.0
+            for chunk in stream:
+                if chunk.usage is not None:
+                    response_usage = chunk.usage
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+                now = time.perf_counter()
+                if first_token is None:
+                    first_token = now - started
+                parser.feed(chunk.choices[0].delta.content)
+                if now - last_update >= self.STREAM_UPDATE_INTERVAL:
+                    partial = parser.snapshot()
+                    if partial:
+                        on_partial(partial)
+                        last_update = now
+            usage = usage_record(self.MODEL, response_usage, time.perf_counter() - started, prompt.prompt_tokens)
+            call.add('tokens', usage['total_tokens'])
+        usage['first_token_s'] = round(first_token, 3) if first_token is not None else None
+        return json.loads(parser.text), usage
+
+    def _retrieve_criteria(self, analysis_data: Dict) -> list:
+        """Criterios más cercanos a los problemas detectados, con una sola búsqueda por lotes"""
+        queries = issue_queries(analysis_data)
+        if not queries:
+            return []
+        try:
+            with span('retrieval'):
+                query_vectors = self.query_embedder(queries)
+                return [criterion for criterion, _ in self.index.related_criteria(query_vectors, k=self.CRITERIA_PER_ISSUE)][:self.MAX_CRITERIA]
+        except Exception as e:
+            self.notify('warning', f"No se pudieron recuperar criterios WCAG: {str(e)}")
+            return []
+
+    def _fallback_analysis(self, data: Dict) -> Dict:
+        # Si el modelo no responde se usa el mismo veredicto que el modo sin conexión
+        return evaluate_offline(data)
+
+
+@lru_cache(maxsize=None)
+def get_evaluator(openai_api_key: str, offline: bool = False) -> WCAGEvaluator:
+    """Evaluador compartido por todo el proceso (uno por API key y modo); los avisos van al logger"""
+    return WCAGEvaluator(openai_api_key, offline=offline)
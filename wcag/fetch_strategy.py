@@ -0,0 +1,177 @@
+"""Memoria por dominio del método de descarga que obtiene contenido útil.
+
+Para cada dominio y nivel (requests, Selenium, Playwright) se guardan intentos, éxitos y una
+media móvil de la latencia. Las descargas siguientes empiezan por el mejor nivel conocido y,
+de vez en cuando, vuelven a probar un nivel más barato por si el sitio cambió.
+
+El archivo lo comparten varios procesos (CLI, workers de gunicorn): los cambios se acumulan y
+se guardan como mucho cada `save_interval` segundos (y al salir), sumando los contadores nuevos
+a lo que haya en disco en ese momento en lugar de sobrescribirlo.
+"""
+import atexit
+import json
+import multiprocessing.util
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, List
+
+from wcag.notify import logger
+from wcag.result_cache import CACHE_ROOT
+
+# Ordenados de menor a mayor coste
+TIERS = ('requests', 'selenium', 'playwright')
+DEFAULT_STRATEGY_PATH = os.path.join(CACHE_ROOT, 'fetch_strategy.json')
+LATENCY_SMOOTHING = 0.3
+DEFAULT_SAVE_INTERVAL = 5.0
+# Espera máxima por el archivo de bloqueo y antigüedad a partir de la que se da por abandonado
+LOCK_TIMEOUT = 2.0
+STALE_LOCK_SECONDS = 30.0
+
+
+@contextmanager
+def _file_lock(path: str):
+    """Exclusión entre procesos con un archivo creado en exclusiva (portable, sin fcntl)."""
+    lock_path = f"{path}.lock"
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while True:
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > STALE_LOCK_SECONDS:
+                    os.remove(lock_path)
+                    continue
+            except OSError:
+                continue
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"{lock_path} ocupado")
+            time.sleep(0.01)
+    try:
+        yield
+    finally:
+        try:
+            os.remove(lock_path)
+        except OSError:
+            pass
+
+
+class DomainStrategyStore:
+    def __init__(self, path: str = DEFAULT_STRATEGY_PATH, reprobe_probability: float = 0.1, rng: random.Random = None,
+                 save_interval: float = DEFAULT_SAVE_INTERVAL):
+        self.path = path
+        self.reprobe_probability = reprobe_probability
+        self.save_interval = save_interval
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._domains: Dict[str, Dict] = self._load()
+        # Intentos y éxitos aún no guardados, por dominio y nivel
+        self._pending: Dict[str, Dict[str, Dict]] = {}
+        self._saved_at = time.monotonic()
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path, encoding='utf-8') as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return {}
+
+    def _merged(self) -> Dict[str, Dict]:
+        """Lo guardado por otros procesos más los cambios pendientes de este (con el lock tomado)."""
+        domains = self._load()
+        for domain, tiers in self._pending.items():
+            ours = self._domains[domain]
+            entry = domains.setdefault(domain, {'tiers': {}})
+            for tier, delta in tiers.items():
+                stats = entry['tiers'].setdefault(tier, {'attempts': 0, 'successes': 0})
+                stats['attempts'] += delta['attempts']
+                stats['successes'] += delta['successes']
+                stats['latency'] = ours['tiers'][tier]['latency']
+            if ours.get('last_success', 0) > entry.get('last_success', 0):
+                entry['last_tier'], entry['last_success'] = ours['last_tier'], ours['last_success']
+        return domains
+
+    def _save(self) -> None:
+        """Guardar los cambios pendientes (con el lock tomado); un fallo de disco no interrumpe la descarga."""
+        self._saved_at = time.monotonic()
+        if not self._pending:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            # Leer, sumar y sustituir sin que otro proceso guarde en medio
+            with _file_lock(self.path):
+                domains = self._merged()
+                tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as handle:
+                    json.dump(domains, handle)
+                os.replace(tmp_path, self.path)
+        except OSError as e:
+            # Los cambios siguen pendientes y se reintentan en el próximo guardado
+            logger.warning("No se pudo guardar la estrategia de descarga en %s: %s", self.path, e)
+            return
+        self._domains = domains
+        self._pending = {}
+
+    def flush(self) -> None:
+        with self._lock:
+            self._save()
+
+    @staticmethod
+    def _success_rate(stats: Dict) -> float:
+        # Suavizado de Laplace: un único fallo no descarta un nivel para siempre
+        return (stats['successes'] + 1) / (stats['attempts'] + 2)
+
+    def best_tier(self, domain: str) -> str | None:
+        tiers = self._domains.get(domain, {}).get('tiers', {})
+        tried = [tier for tier in TIERS if tiers.get(tier, {}).get('successes')]
+        if not tried:
+            return None
+        # Mayor tasa de éxito; a igualdad, menor latencia y luego el nivel más barato
+        return max(tried, key=lambda tier: (self._success_rate(tiers[tier]), -tiers[tier]['latency'], -TIERS.index(tier)))
+
+    def plan(self, domain: str) -> List[str]:
+        """Orden de niveles a intentar para `domain`."""
+        with self._lock:
+            best = self.best_tier(domain)
+        if best is None:
+            return list(TIERS)
+        order = [best] + [tier for tier in TIERS if tier != best]
+        cheaper = TIERS[:TIERS.index(best)]
+        if cheaper and self._rng.random() < self.reprobe_probability:
+            probe = cheaper[0]
+            order.remove(probe)
+            order.insert(0, probe)
+        return order
+
+    def record(self, domain: str, tier: str, success: bool, latency: float) -> None:
+        with self._lock:
+            entry = self._domains.setdefault(domain, {'tiers': {}})
+            stats = entry['tiers'].setdefault(tier, {'attempts': 0, 'successes': 0, 'latency': latency})
+            delta = self._pending.setdefault(domain, {}).setdefault(tier, {'attempts': 0, 'successes': 0})
+            stats['attempts'] += 1
+            delta['attempts'] += 1
+            stats['latency'] += LATENCY_SMOOTHING * (latency - stats['latency'])
+            if success:
+                stats['successes'] += 1
+                delta['successes'] += 1
+                entry['last_tier'] = tier
+                entry['last_success'] = time.time()
+            if time.monotonic() - self._saved_at >= self.save_interval:
+                self._save()
+
+    def snapshot(self, domain: str) -> Dict:
+        with self._lock:
+            return json.loads(json.dumps(self._domains.get(domain, {})))
+
+
+@lru_cache(maxsize=None)
+def get_strategy_store() -> DomainStrategyStore:
+    store = DomainStrategyStore()
+    atexit.register(store.flush)
+    # Los procesos de un pool de multiprocessing terminan sin ejecutar atexit
+    multiprocessing.util.Finalize(None, store.flush, exitpriority=0)
+    return store
@@ -0,0 +1,317 @@
+"""Extracción de características de accesibilidad en un único recorrido del DOM."""
+import codecs
+from html.parser import HTMLParser
+from typing import Dict, Iterable
+
+from bs4 import BeautifulSoup, NavigableString, Tag
+from bs4.element import PreformattedString
+
+from wcag.tracing import ENABLED as TRACING, span
+
+try:
+    from lxml import etree
+except ImportError:  # lxml es opcional; sin él se usa html.parser
+    etree = None
+
+
+HEADING_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+INPUT_TAGS = ('input', 'textarea', 'select')
+INTERACTIVE_TAGS = ('a', 'button', 'input', 'select', 'textarea')
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class AccessibilityFeatureCollector:
+    """Acumula los contadores y problemas de `analysis_data` a partir de eventos de etiqueta."""
+
+    def __init__(self, rules=None):
+        # Motor de reglas (wcag.wcag_rules.RuleEngine) que comparte este recorrido, si lo hay
+        self.rules = rules
+        self.images = 0
+        self.images_with_alt = 0
+        self.headings = []
+        self.h1_count = 0
+        self.links = 0
+        self.forms = 0
+        self.inputs = 0
+        self.labels = 0
+        self.lang_attr = False
+        self.title = False
+        self.skip_links = 0
+        self.aria_labels = 0
+        self.roles = 0
+        self.contrast_issues = []
+        self.keyboard_focus = []
+        # Los mensajes repetidos comparten la misma cadena para no crecer con el documento
+        self._messages = {}
+        self._handlers = {
+            'img': self._on_img,
+            'a': self._on_link,
+            'form': self._on_form,
+            'label': self._on_label,
+            'html': self._on_html,
+            'title': self._on_title,
+        }
+        for tag in HEADING_TAGS:
+            self._handlers[tag] = self._on_heading
+        for tag in INPUT_TAGS:
+            self._handlers[tag] = self._on_input
+
+    def start(self, tag: str, attrs) -> None:
+        if attrs:
+            if 'aria-label' in attrs:
+                self.aria_labels += 1
+            if 'role' in attrs:
+                self.roles += 1
+            style = attrs.get('style')
+            # Con motor de reglas el contraste se calcula de verdad (wcag.contrast)
+            if self.rules is None and style is not None and 'color:' in style and 'background' in style:
+                self.contrast_issues.append(self._message("Posible problema de contraste en {}", tag))
+            if tag in INTERACTIVE_TAGS and attrs.get('tabindex') == '-1':
+                self.keyboard_focus.append(self._message("Elemento {} excluido de navegación por teclado", tag))
+        handler = self._handlers.get(tag)
+        if handler is not None:
+            handler(tag, attrs)
+        if self.rules is not None:
+            self.rules.start(tag, attrs)
+
+    def end(self, tag: str) -> None:
+        self.rules.end(tag)
+
+    def data(self, text: str) -> None:
+        self.rules.data(text)
+
+    # Campos que se suman (o se concatenan) al combinar regiones del documento
+    ADDITIVE_FIELDS = ('images', 'images_with_alt', 'h1_count', 'links', 'forms', 'inputs', 'labels',
+                       'skip_links', 'aria_labels', 'roles', 'headings', 'contrast_issues', 'keyboard_focus')
+
+    def state(self) -> Dict:
+        """Contadores de la región recorrida y estado de sus reglas, en valores JSON."""
+        state = {field: getattr(self, field) for field in self.ADDITIVE_FIELDS}
+        state['lang_attr'], state['title'] = self.lang_attr, self.title
+        if self.rules is not None:
+            state['rules'] = self.rules.states()
+        return state
+
+    @classmethod
+    def merged(cls, states) -> 'AccessibilityFeatureCollector':
+        """Colector equivalente a haber recorrido seguidas las regiones de `states`."""
+        rules = None
+        if states and all('rules' in state for state in states):
+            from wcag.wcag_rules import RuleEngine
+            rules = RuleEngine.merged([state['rules'] for state in states])
+        collector = cls(rules)
+        for state in states:
+            for field in cls.ADDITIVE_FIELDS:
+                setattr(collector, field, getattr(collector, field) + state[field])
+            collector.lang_attr = collector.lang_attr or state['lang_attr']
+            collector.title = collector.title or state['title']
+        return collector
+
+    def _message(self, template: str, tag: str) -> str:
+        key = (template, tag)
+        message = self._messages.get(key)
+        if message is None:
+            message = self._messages[key] = template.format(tag)
+        return message
+
+    def _on_img(self, tag, attrs):
+        self.images += 1
+        if 'alt' in attrs:
+            self.images_with_alt += 1
+
+    def _on_heading(self, tag, attrs):
+        self.headings.append(tag)
+        if tag == 'h1':
+            self.h1_count += 1
+
+    def _on_link(self, tag, attrs):
+        self.links += 1
+        href = attrs.get('href')
+        if href and href.startswith('#'):
+            self.skip_links += 1
+
+    def _on_form(self, tag, attrs):
+        self.forms += 1
+
+    def _on_input(self, tag, attrs):
+        self.inputs += 1
+
+    def _on_label(self, tag, attrs):
+        self.labels += 1
+
+    def _on_html(self, tag, attrs):
+        if 'lang' in attrs:
+            self.lang_attr = True
+
+    def _on_title(self, tag, attrs):
+        self.title = True
+
+    def _semantic_structure(self) -> list:
+        issues = []
+        if not self.headings:
+            issues.append("No se encontraron encabezados en la página")
+        if self.h1_count == 0:
+            issues.append("Falta encabezado H1 principal")
+        elif self.h1_count > 1:
+            issues.append("Múltiples encabezados H1 encontrados")
+        return issues
+
+    def result(self) -> Dict:
+        data = {
+            'images': self.images,
+            'images_with_alt': self.images_with_alt,
+            'headings': self.headings,
+            'links': self.links,
+            'forms': self.forms,
+            'inputs': self.inputs,
+            'labels': self.labels,
+            'lang_attr': self.lang_attr,
+            'title': self.title,
+            'skip_links': self.skip_links,
+            'aria_labels': self.aria_labels,
+            'roles': self.roles,
+            'contrast_issues': self.contrast_issues,
+            'keyboard_focus': self.keyboard_focus,
+            'semantic_structure': self._semantic_structure()
+        }
+        if self.rules is not None:
+            data['rule_findings'] = [finding._asdict() for finding in self.rules.findings()]
+            contrast = self.rules.get('contrast')
+            if contrast is not None:
+                data['contrast_issues'] = contrast.messages()
+        return data
+
+
+def walk_soup(soup: BeautifulSoup, collector: AccessibilityFeatureCollector) -> None:
+    with span('walk', parser='html.parser'):
+        if collector.rules is not None:
+            return _walk_soup_events(soup, collector)
+        start = collector.start
+        for node in soup.descendants:
+            if isinstance(node, Tag):
+                start(node.name, node.attrs)
+
+
+def _walk_soup_events(soup: BeautifulSoup, collector: AccessibilityFeatureCollector) -> None:
+    """Recorrido con eventos de fin y texto; pila explícita para no depender de la recursión."""
+    stack = [iter(soup.contents)]
+    open_tags = []
+    while stack:
+        node = next(stack[-1], None)
+        if node is None:
+            stack.pop()
+            if open_tags:
+                collector.end(open_tags.pop())
+        elif isinstance(node, Tag):
+            collector.start(node.name, node.attrs)
+            open_tags.append(node.name)
+            stack.append(iter(node.contents))
+        elif isinstance(node, NavigableString) and not isinstance(node, PreformattedString):
+            collector.data(node)
+
+
+def parse_lxml(html_content: str):
+    """Raíz del árbol de lxml; None si el documento está vacío."""
+    encoded = html_content.encode('utf-8', 'replace')
+    with span('parse', parser='lxml') as parsing:
+        parsing.add('bytes', len(encoded))
+        return etree.fromstring(encoded, etree.HTMLParser(encoding='utf-8', huge_tree=True))
+
+
+def walk_lxml(html_content: str, collector: AccessibilityFeatureCollector) -> None:
+    root = parse_lxml(html_content)
+    if root is None:
+        return
+    with span('walk', parser='lxml'):
+        if collector.rules is not None:
+            return _walk_lxml_events(root, collector)
+        start = collector.start
+        for node in root.iter():
+            # Comentarios e instrucciones de procesamiento no tienen tag de tipo str
+            if isinstance(node.tag, str):
+                start(node.tag, node.attrib)
+
+
+def _walk_lxml_events(root, collector: AccessibilityFeatureCollector) -> None:
+    start, end, data = collector.start, collector.end, collector.data
+    for event, node in etree.iterwalk(root, events=('start', 'end', 'comment', 'pi')):
+        if event == 'start':
+            start(node.tag, node.attrib)
+            if node.text:
+                data(node.text)
+            continue
+        if event == 'end':
+            end(node.tag)
+        # Tras el cierre de un elemento, un comentario o una instrucción sigue texto del padre
+        # (el de la raíz recorrida pertenece a su padre, fuera del recorrido)
+        if node.tail and node is not root:
+            data(node.tail)
+
+
+class _StreamingHTMLParser(HTMLParser):
+    """Parser incremental de la biblioteca estándar: solo retiene el fragmento sin procesar."""
+
+    def __init__(self, collector: AccessibilityFeatureCollector):
+        super().__init__(convert_charrefs=True)
+        self._start = collector.start
+        if collector.rules is not None:
+            self.handle_endtag = collector.end
+            self.handle_data = collector.data
+
+    def handle_starttag(self, tag, attrs):
+        # Igual que BeautifulSoup: los atributos sin valor se registran como cadena vacía
+        self._start(tag, {name: '' if value is None else value for name, value in attrs})
+
+
+def _iter_text(chunks: Iterable) -> Iterable[str]:
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    for chunk in chunks:
+        yield decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+    yield decoder.decode(b'', final=True)
+
+
+def stream_stdlib(chunks: Iterable, collector: AccessibilityFeatureCollector) -> None:
+    parser = _StreamingHTMLParser(collector)
+    # Parseo y recorrido van intercalados: una sola etapa
+    with span('stream', parser='html.parser'):
+        for text in _iter_text(chunks):
+            if text:
+                parser.feed(text)
+        parser.close()
+
+
+def resolve_parser(parser: str = 'auto') -> str:
+    if parser == 'auto':
+        return 'lxml' if etree is not None else 'html.parser'
+    if parser == 'lxml' and etree is None:
+        raise ImportError("lxml no está instalado")
+    return parser
+
+
+def extract_analysis_data(html_content: str, parser: str = 'auto', rules=None) -> Dict:
+    """Construir `analysis_data` recorriendo el documento una sola vez.
+
+    Con `rules` (un RuleEngine) las reglas se evalúan en el mismo recorrido y sus
+    incumplimientos se añaden en `rule_findings`.
+    """
+    collector = AccessibilityFeatureCollector(rules)
+    if resolve_parser(parser) == 'lxml':
+        walk_lxml(html_content, collector)
+    else:
+        with span('parse', parser='html.parser') as parsing:
+            if TRACING:
+                parsing.add('bytes', len(html_content.encode('utf-8', 'replace')))
+            soup = BeautifulSoup(html_content, 'html.parser')
+        walk_soup(soup, collector)
+    return collector.result()
+
+
+def extract_analysis_data_stream(chunks: Iterable, rules=None) -> Dict:
+    """Construir `analysis_data` procesando el documento por fragmentos (str o bytes).
+
+    Se usa html.parser y no lxml: el parser incremental de libxml2 conserva la
+    entrada ya consumida, mientras que HTMLParser solo guarda el fragmento pendiente.
+    """
+    collector = AccessibilityFeatureCollector(rules)
+    stream_stdlib(chunks, collector)
+    return collector.result()
@@ -0,0 +1,125 @@
+"""Caché HTTP en disco con peticiones condicionales (ETag / Last-Modified).
+
+Los cuerpos se guardan comprimidos con gzip junto a un archivo de metadatos con los
+validadores y el hash del contenido. Una respuesta 304 se sirve desde disco, y el hash
+permite reutilizar el resultado de una evaluación anterior sin volver a analizar la página.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, NamedTuple
+
+from wcag.result_cache import CACHE_ROOT, hash_content
+
+DEFAULT_HTTP_CACHE_DIR = os.path.join(CACHE_ROOT, 'http')
+
+
+class CachedPage(NamedTuple):
+    url: str
+    etag: str | None
+    last_modified: str | None
+    content_hash: str
+    stored_at: float
+    size: int
+
+
+class HttpPageCache:
+    def __init__(self, directory: str = DEFAULT_HTTP_CACHE_DIR, max_bytes: int = 256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._disk_bytes = None
+
+    def _paths(self, url: str) -> tuple[str, str]:
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.directory, key)
+        return f"{base}.json", f"{base}.html.gz"
+
+    def lookup(self, url: str) -> CachedPage | None:
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, encoding='utf-8') as handle:
+                meta = json.load(handle)
+        except (OSError, ValueError):
+            return None
+        if meta.get('url') != url or not os.path.exists(body_path):
+            return None
+        return CachedPage(**meta)
+
+    @staticmethod
+    def conditional_headers(entry: CachedPage | None) -> Dict[str, str]:
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def load_body(self, entry: CachedPage) -> str | None:
+        _, body_path = self._paths(entry.url)
+        try:
+            with gzip.open(body_path, 'rt', encoding='utf-8') as handle:
+                body = handle.read()
+        except (OSError, EOFError):
+            return None
+        # La fecha de modificación marca el uso reciente para el desalojo
+        try:
+            os.utime(body_path)
+        except OSError:
+            pass  # Desalojado por otro proceso tras la lectura: el cuerpo leído sigue valiendo
+        return body
+
+    def store(self, url: str, body: str, etag: str = None, last_modified: str = None) -> CachedPage | None:
+        """Guardar la respuesta si trae validadores; sin ellos no se puede revalidar."""
+        if not etag and not last_modified:
+            return None
+        meta_path, body_path = self._paths(url)
+        os.makedirs(self.directory, exist_ok=True)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(body_path + suffix, 'wt', encoding='utf-8', compresslevel=6) as handle:
+            handle.write(body)
+        size = os.path.getsize(body_path + suffix)
+        entry = CachedPage(url, etag, last_modified, hash_content(body), time.time(), size)
+        with open(meta_path + suffix, 'w', encoding='utf-8') as handle:
+            json.dump(entry._asdict(), handle)
+        with self._lock:
+            previous = os.path.getsize(body_path) if os.path.exists(body_path) else 0
+            os.replace(body_path + suffix, body_path)
+            os.replace(meta_path + suffix, meta_path)
+            if self._disk_bytes is None:
+                self._disk_bytes = self._scan_bytes()
+            else:
+                self._disk_bytes += size - previous
+            if self._disk_bytes > self.max_bytes:
+                self._evict()
+        return entry
+
+    def _scan_bytes(self) -> int:
+        with os.scandir(self.directory) as entries:
+            return sum(entry.stat().st_size for entry in entries if entry.name.endswith('.html.gz'))
+
+    def _evict(self) -> None:
+        with os.scandir(self.directory) as entries:
+            bodies = sorted((entry.stat().st_mtime, entry.stat().st_size, entry.path)
+                            for entry in entries if entry.name.endswith('.html.gz'))
+        total = sum(size for _, size, _ in bodies)
+        for _, size, body_path in bodies:
+            if total <= self.max_bytes * 0.9:
+                break
+            for path in (body_path, body_path[:-len('.html.gz')] + '.json'):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+        self._disk_bytes = total
+
+
+@lru_cache(maxsize=None)
+def get_http_cache() -> HttpPageCache:
+    return HttpPageCache()
@@ -0,0 +1,223 @@
+"""Reauditoría incremental: solo se recorren las regiones del DOM que cambiaron.
+
+El documento se divide en regiones: se desciende por `<body>`, los envoltorios de un solo hijo
+(como `<div id="app">`), el contenido principal (`<main>`) y los contenedores grandes, y cada
+hijo restante, o grupo de hijos si son muchos, es una región. Así, cambiar un párrafo dentro
+de `<main>` solo obliga a recorrer su grupo. Cada región se identifica por el hash de su HTML
+serializado más el CSS de `<style>` y los atributos de sus ancestros, que afectan al
+contraste. Las etiquetas por las que se desciende forman el esqueleto. Para cada región se guarda el
+estado de los contadores y de las reglas (`AccessibilityFeatureCollector.state`); en la
+siguiente auditoría de la misma URL las regiones con el mismo hash reutilizan su estado y el
+resultado se obtiene combinándolos. Si `analysis_data` no cambia, la caché de resultados
+del evaluador evita además la llamada al modelo.
+"""
+import hashlib
+import zlib
+from typing import Dict, List, NamedTuple, Tuple
+
+from wcag.html_features import (AccessibilityFeatureCollector, _walk_lxml_events, etree, extract_analysis_data,
+                                parse_lxml)
+from wcag.tracing import span
+from wcag.wcag_rules import RuleEngine
+
+# Incrementar si cambia el formato de los estados guardados o el de las reglas
+STATE_VERSION = "2"
+# Por encima de este número de hijos las regiones agrupan hermanos consecutivos
+MAX_REGIONS = 64
+# Un contenedor más grande que esto se divide en sus hijos en lugar de ser una sola región
+REGION_SPLIT_BYTES = 64 * 1024
+_SPLIT_TAGS = frozenset({'main', 'section', 'article', 'div', 'aside', 'nav', 'header', 'footer', 'form',
+                         'ul', 'ol', 'dl', 'table', 'tbody'})
+SKELETON = 'skeleton'
+# Hermanos del contenido principal que no impiden descender al envoltorio (p. ej. en una SPA)
+_NON_CONTENT_TAGS = frozenset({'script', 'noscript', 'template', 'style', 'link', 'meta'})
+
+
+class IncrementalRun(NamedTuple):
+    analysis_data: Dict
+    # Hash de región -> estado, para guardar y reutilizar en la siguiente auditoría
+    regions: Dict[str, Dict]
+    reused: int
+    total: int
+
+
+def region_cache_key(url: str) -> str:
+    return hashlib.sha256(f"regions:{STATE_VERSION}:{url}".encode('utf-8')).hexdigest()
+
+
+def _digest(*parts) -> str:
+    hasher = hashlib.sha256()
+    for part in parts:
+        hasher.update(part if isinstance(part, bytes) else str(part).encode('utf-8', 'surrogatepass'))
+        hasher.update(b'\0')
+    return hasher.hexdigest()
+
+
+def _elements(node) -> list:
+    # Comentarios e instrucciones de procesamiento no tienen tag de tipo str
+    return [child for child in node if isinstance(child.tag, str)]
+
+
+def _signature(element) -> tuple:
+    return element.tag, sorted(element.attrib.items())
+
+
+class _Layout(NamedTuple):
+    # Elementos por los que se desciende, en orden del documento; su marcado forma el esqueleto
+    spine: list
+    # (grupo de hermanos como pares (elemento, HTML serializado), ancestros desde la raíz)
+    regions: List[Tuple[list, list]]
+
+
+def _layout(root) -> _Layout:
+    """Se desciende por `<body>`, por los envoltorios de un solo hijo, por el contenido principal
+    (`<main>`, role=main) y por los contenedores de más de REGION_SPLIT_BYTES; el resto de hijos
+    son regiones, agrupadas con `_group` cuando son muchos."""
+    layout = _Layout([], [])
+    _descend(root, [], layout)
+    return layout
+
+
+def _descend(element, ancestors: list, layout: _Layout) -> None:
+    path = ancestors + [element]
+    layout.spine.append(element)
+    children = _elements(element)
+    content = [child for child in children if child.tag not in _NON_CONTENT_TAGS]
+    # Hijos por los que siempre se desciende: el envoltorio único, <body> y el contenido principal
+    forced = set(element.xpath('main[*] | *[@role="main"][*]'))
+    if len(content) == 1 and _elements(content[0]):
+        forced.add(content[0])
+    if not ancestors:
+        forced.update(child for child in children if child.tag == 'body')
+    tostring = etree.tostring
+    siblings = []
+    for child in children:
+        serialized = None
+        if child in forced:
+            split = True
+        else:
+            serialized = tostring(child, with_tail=False)
+            split = len(serialized) > REGION_SPLIT_BYTES and child.tag in _SPLIT_TAGS and bool(_elements(child))
+        if split:
+            layout.regions.extend((group, path) for group in _group(siblings))
+            siblings = []
+            _descend(child, path, layout)
+        else:
+            siblings.append((child, serialized))
+    layout.regions.extend((group, path) for group in _group(siblings))
+
+
+def _group(siblings: list) -> List[list]:
+    """Con muchos hermanos se agrupan por límites que dependen del contenido (como rsync),
+    de modo que insertar un elemento solo altera el grupo donde cae. Un grupo no pasa del doble
+    del tamaño medio: sin ese tope algunos salían varias veces mayores y editarlos costaba más."""
+    if len(siblings) <= MAX_REGIONS:
+        return [[sibling] for sibling in siblings]
+    spacing = len(siblings) // MAX_REGIONS + 1
+    groups, current = [], []
+    for sibling in siblings:
+        current.append(sibling)
+        # CRC32 y no hash(): los límites deben coincidir entre procesos para reutilizar estados
+        if zlib.crc32(sibling[1]) % spacing == 0 or len(current) >= 2 * spacing:
+            groups.append(current)
+            current = []
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _new_collector(css: str, ancestors) -> AccessibilityFeatureCollector:
+    engine = RuleEngine()
+    contrast = engine.get('contrast')
+    if contrast is not None:
+        # Las reglas de estilo y los ancestros solo influyen en el contraste de la región
+        contrast.analyzer.sheet.add_css(css)
+        for element in ancestors:
+            contrast.analyzer.start(element.tag, element.attrib)
+    return AccessibilityFeatureCollector(engine)
+
+
+def _walk_skeleton(collector: AccessibilityFeatureCollector, element, spine: set) -> None:
+    """Etiquetas del esqueleto y su texto directo; el contenido de las regiones se recorre aparte."""
+    collector.start(element.tag, element.attrib)
+    if element.text:
+        collector.data(element.text)
+    for child in element:
+        if child in spine:
+            _walk_skeleton(collector, child, spine)
+        if child.tail:
+            collector.data(child.tail)
+    collector.end(element.tag)
+
+
+def _skeleton_text(spine: list) -> list:
+    return [(_signature(element), element.text, [child.tail for child in element]) for element in spine]
+
+
+class Region(NamedTuple):
+    key: str
+    state: Dict
+    # Las regiones de contenido pueden compartirse entre páginas; el esqueleto y <head> no
+    shareable: bool
+
+
+def page_regions(html_content: str, previous=None) -> Tuple[List[Region], int] | None:
+    """Regiones del documento en orden, con su estado; None si el documento no se puede dividir.
+
+    `previous` es cualquier mapeo hash -> estado ya calculado; devuelve también cuántas se reutilizaron.
+    """
+    if etree is None:
+        return None
+    root = parse_lxml(html_content)
+    if root is None:
+        return None
+    with span('walk', parser='incremental') as walk:
+        regions, reused = _walk_regions(root, previous)
+        walk.add('regions_reused', reused)
+    return regions, reused
+
+
+def _walk_regions(root, previous) -> Tuple[List[Region], int]:
+    previous = previous if previous is not None else {}
+    layout = _layout(root)
+    css = ''.join(style.text or '' for style in root.iter('style'))
+    # El CSS afecta al contraste de todo el documento; los ancestros, a cada región por separado
+    context = _digest(STATE_VERSION, css)
+    regions, reused = [], 0
+
+    skeleton_key = _digest(context, SKELETON, _skeleton_text(layout.spine))
+    state = previous.get(skeleton_key)
+    if state is None:
+        collector = _new_collector(css, ())
+        _walk_skeleton(collector, root, set(layout.spine))
+        state = collector.state()
+    else:
+        reused += 1
+    regions.append(Region(skeleton_key, state, False))
+
+    signatures = {}
+    for group, ancestors in layout.regions:
+        path = signatures.get(id(ancestors))
+        if path is None:
+            path = signatures[id(ancestors)] = _digest(*(_signature(element) for element in ancestors))
+        key = _digest(context, path, *(serialized for _, serialized in group))
+        state = previous.get(key)
+        if state is None:
+            collector = _new_collector(css, ancestors)
+            for element, _ in group:
+                _walk_lxml_events(element, collector)
+            state = collector.state()
+        else:
+            reused += 1
+        regions.append(Region(key, state, not (len(ancestors) == 1 and group[0][0].tag == 'head')))
+    return regions, reused
+
+
+def extract_analysis_data_incremental(html_content: str, previous: Dict = None) -> IncrementalRun:
+    """`analysis_data` con reglas, reutilizando los estados de `previous` (hash -> estado)."""
+    split = page_regions(html_content, previous)
+    if split is None:
+        return IncrementalRun(extract_analysis_data(html_content, rules=RuleEngine()), {}, 0, 1)
+    regions, reused = split
+    analysis_data = AccessibilityFeatureCollector.merged([region.state for region in regions]).result()
+    return IncrementalRun(analysis_data, {region.key: region.state for region in regions}, reused, len(regions))
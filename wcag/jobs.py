@@ -0,0 +1,160 @@
+"""Cola de trabajos acotada con un pool fijo de hilos y métricas de ocupación.
+
+Los trabajos se encolan y se devuelven de inmediato con un identificador; los hilos del pool
+los ejecutan en orden de llegada. Si la cola está llena `submit` lanza `QueueFull` en lugar de
+bloquear al cliente. Los trabajos terminados se conservan un tiempo limitado para consultarlos.
+"""
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Dict
+
+DEFAULT_JOB_WORKERS = int(os.getenv('WCAG_JOB_WORKERS', '4'))
+DEFAULT_QUEUE_SIZE = int(os.getenv('WCAG_JOB_QUEUE_SIZE', '100'))
+DEFAULT_JOB_TTL = 3600
+DEFAULT_MAX_FINISHED = 1000
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, payload: Dict):
+        self.id = uuid.uuid4().hex
+        self.payload = payload
+        self.status = QUEUED
+        # Etapa en curso dentro del trabajo (p. ej. scraping, evaluación, pdf)
+        self.stage = None
+        self.result = None
+        self.artifacts = {}
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def describe(self) -> Dict:
+        def elapsed(start, end):
+            return round((end or time.time()) - start, 3) if start else None
+
+        return {
+            'id': self.id,
+            'status': self.status,
+            'stage': self.stage,
+            'error': self.error,
+            'queued_s': elapsed(self.created_at, self.started_at),
+            'running_s': elapsed(self.started_at, self.finished_at),
+        }
+
+
+class JobQueue:
+    def __init__(self, handler, workers: int = DEFAULT_JOB_WORKERS, max_queued: int = DEFAULT_QUEUE_SIZE,
+                 ttl_seconds: float = DEFAULT_JOB_TTL, max_finished: int = DEFAULT_MAX_FINISHED):
+        """`handler(job)` ejecuta el trabajo y deja su salida en `job.result` y `job.artifacts`."""
+        self.handler = handler
+        self.workers = workers
+        self.ttl_seconds = ttl_seconds
+        self.max_finished = max_finished
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._jobs: Dict[str, Job] = {}
+        self._finished = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = Counter()
+        self._busy = 0
+        self._busy_seconds = 0.0
+        self._run_seconds = 0.0
+        self._wait_seconds = 0.0
+        self._started = time.monotonic()
+        self._threads = [threading.Thread(target=self._worker, name=f"wcag-job-{i}", daemon=True) for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, payload: Dict) -> Job:
+        job = Job(payload)
+        with self._lock:
+            self._jobs[job.id] = job
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job.id]
+                self._counters['rejected'] += 1
+            raise QueueFull()
+        with self._lock:
+            self._counters['submitted'] += 1
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            self._expire()
+            return self._jobs.get(job_id)
+
+    def _worker(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            started = time.monotonic()
+            with self._lock:
+                self._busy += 1
+                self._wait_seconds += time.time() - job.created_at
+            job.status, job.started_at = RUNNING, time.time()
+            try:
+                self.handler(job)
+                job.status = DONE
+            except Exception as e:
+                job.status, job.error = FAILED, f"{type(e).__name__}: {e}"
+            job.finished_at = time.time()
+            job.stage = None
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self._busy -= 1
+                self._busy_seconds += elapsed
+                self._run_seconds += elapsed
+                self._counters[job.status] += 1
+                self._finished[job.id] = job.finished_at
+                self._expire()
+
+    def _expire(self) -> None:
+        """Olvidar los trabajos terminados más antiguos o caducados (con el lock tomado)."""
+        now = time.time()
+        while self._finished:
+            job_id, finished_at = next(iter(self._finished.items()))
+            if len(self._finished) <= self.max_finished and now - finished_at <= self.ttl_seconds:
+                break
+            del self._finished[job_id]
+            self._jobs.pop(job_id, None)
+
+    def metrics(self) -> Dict:
+        """Profundidad de la cola y ocupación del pool para dimensionar el despliegue."""
+        with self._lock:
+            uptime = time.monotonic() - self._started
+            finished = self._counters[DONE] + self._counters[FAILED]
+            started = finished + self._busy
+            return {
+                'queue_depth': self._queue.qsize(),
+                'queue_capacity': self._queue.maxsize,
+                'workers': self.workers,
+                'busy_workers': self._busy,
+                # Fracción del tiempo de los hilos dedicada a trabajos desde el arranque
+                'utilization': round(self._busy_seconds / (uptime * self.workers), 4) if uptime else 0.0,
+                'submitted': self._counters['submitted'],
+                'rejected': self._counters['rejected'],
+                'done': self._counters[DONE],
+                'failed': self._counters[FAILED],
+                'retained_jobs': len(self._jobs),
+                'avg_wait_s': round(self._wait_seconds / started, 3) if started else None,
+                'avg_run_s': round(self._run_seconds / finished, 3) if finished else None,
+                'uptime_s': round(uptime, 1),
+            }
+
+    def shutdown(self, timeout: float = 5) -> None:
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
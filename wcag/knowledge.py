@@ -0,0 +1,189 @@
+"""Base de conocimiento WCAG 2.1 y persistencia de sus embeddings precalculados.
+
+Los embeddings se guardan en un artefacto versionado cuyo nombre es el hash del texto de
+las pautas, del modelo y de la versión del formato; mientras el texto no cambie se cargan
+sin acceso a la red. Para generarlo durante el despliegue:
+
+    python -m wcag.knowledge
+"""
+import hashlib
+import json
+import os
+import re
+from typing import List, NamedTuple
+
+import numpy as np
+
+from wcag.result_cache import CACHE_ROOT
+
+WCAG_GUIDELINES = (
+    """
+        WCAG 2.1 Nivel A - Requisitos básicos:
+        1.1.1 Contenido no textual: Todo contenido no textual debe tener alternativas textuales
+        1.2.1 Audio y video pregrabado: Proporcionar alternativas para medios basados en tiempo
+        1.3.1 Información y relaciones: La información debe ser programáticamente determinable
+        1.4.1 Uso del color: El color no debe ser el único medio visual para transmitir información
+        2.1.1 Teclado: Toda funcionalidad debe estar disponible desde teclado
+        2.1.2 Sin trampas de teclado: El foco del teclado no debe quedar atrapado
+        2.2.1 Tiempo ajustable: Permitir al usuario desactivar, ajustar o extender límites de tiempo
+        2.2.2 Pausar, detener, ocultar: Permitir control sobre contenido en movimiento
+        3.1.1 Idioma de la página: El idioma principal debe estar programáticamente determinado
+        3.2.1 Al recibir el foco: Los componentes no deben causar cambios de contexto inesperados
+        3.2.2 Al recibir entradas: Cambiar configuraciones no debe causar cambios de contexto inesperados
+        3.3.1 Identificación de errores: Los errores deben identificarse y describirse al usuario
+        4.1.1 Procesamiento: El contenido debe poder ser interpretado por tecnologías de asistencia
+        4.1.2 Nombre, función, valor: Los componentes UI deben tener nombres y funciones programáticamente determinables
+        """,
+    """
+        WCAG 2.1 Nivel AA - Requisitos estándar:
+        1.2.4 Subtítulos en directo: Proporcionar subtítulos para contenido de audio en directo
+        1.2.5 Audiodescripción pregrabada: Proporcionar audiodescripción para video pregrabado
+        1.3.4 Orientación: El contenido no debe restringirse a una sola orientación de pantalla
+        1.3.5 Identificar el propósito de entrada: El propósito de los campos debe ser programáticamente determinable
+        1.4.3 Contraste mínimo: Relación de contraste de al menos 4.5:1 para texto normal
+        1.4.4 Cambio de tamaño del texto: El texto debe poder redimensionarse hasta 200% sin pérdida de funcionalidad
+        1.4.5 Imágenes de texto: Evitar usar imágenes de texto excepto cuando es esencial
+        1.4.10 Reflow: El contenido debe presentarse sin scroll horizontal a 320px de ancho
+        1.4.11 Contraste de elementos no textuales: Contraste de 3:1 para componentes UI y objetos gráficos
+        1.4.12 Espaciado del texto: No debe haber pérdida de contenido o funcionalidad al ajustar espaciado
+        1.4.13 Contenido en hover o focus: El contenido adicional debe ser descartable, hoverable y persistente
+        2.1.4 Atajos de teclado de caracteres: Permitir desactivar o reasignar atajos de una sola tecla
+        2.4.3 Orden del foco: El orden de navegación debe ser lógico y significativo
+        2.4.6 Encabezados y etiquetas: Los encabezados y etiquetas deben describir el tema o propósito
+        2.4.7 Foco visible: Cualquier interfaz operable por teclado debe tener un indicador de foco visible
+        2.5.1 Gestos del puntero: Toda funcionalidad que use gestos multipunto debe tener alternativa de punto único
+        2.5.2 Cancelación del puntero: Para funcionalidad operada por puntero, debe permitirse cancelación
+        2.5.3 Etiqueta en nombre: El nombre accesible debe contener el texto visible de la etiqueta
+        2.5.4 Activación por movimiento: La funcionalidad por movimiento debe tener alternativas y poder desactivarse
+        3.1.2 Idioma de las partes: El idioma de cada pasaje debe estar programáticamente determinado
+        3.2.3 Navegación coherente: Los mecanismos de navegación deben ser coherentes
+        3.2.4 Identificación coherente: Los componentes con misma funcionalidad deben identificarse coherentemente
+        3.3.3 Sugerencia de error: Proporcionar sugerencias cuando se detecten errores
+        3.3.4 Prevención de errores legales/financieros/datos: Permitir revisión y corrección antes de envío
+        4.1.3 Mensajes de estado: Los mensajes de estado deben comunicarse a tecnologías de asistencia
+        """,
+    """
+        WCAG 2.1 Nivel AAA - Requisitos avanzados:
+        1.2.6 Lengua de señas pregrabada: Proporcionar interpretación en lengua de señas
+        1.2.7 Audiodescripción extendida: Proporcionar audiodescripción extendida para video pregrabado
+        1.2.8 Alternativa para medios pregrabados: Proporcionar alternativa textual para medios pregrabados
+        1.2.9 Solo audio en directo: Proporcionar alternativa textual para contenido de solo audio en directo
+        1.4.6 Contraste mejorado: Relación de contraste de al menos 7:1 para texto normal
+        1.4.7 Audio de fondo bajo o nulo: Audio de fondo debe ser bajo o eliminable
+        1.4.8 Presentación visual: Permitir personalización de presentación visual del texto
+        1.4.9 Imágenes de texto sin excepción: No usar imágenes de texto excepto para logotipos
+        2.1.3 Teclado sin excepción: Toda funcionalidad debe estar disponible desde teclado sin excepciones
+        2.2.3 Sin límite de tiempo: No imponer límites de tiempo excepto para eventos en tiempo real
+        2.2.4 Interrupciones: Las interrupciones pueden ser pospuestas o suprimidas por el usuario
+        2.2.5 Reautenticación: Cuando expire una sesión, el usuario puede continuar sin pérdida de datos
+        2.2.6 Tiempos de espera: Advertir a los usuarios sobre tiempos de espera que causan pérdida de datos
+        2.3.2 Tres destellos: Las páginas no deben contener elementos que destellen más de tres veces por segundo
+        2.3.3 Animación de interacciones: Permitir desactivar animaciones no esenciales
+        2.4.8 Ubicación: Proporcionar información sobre ubicación del usuario dentro de un conjunto de páginas
+        2.4.9 Propósito del enlace solo contexto: El propósito de cada enlace debe determinarse solo por el texto del enlace
+        2.4.10 Encabezados de sección: Usar encabezados de sección para organizar contenido
+        3.1.3 Palabras inusuales: Proporcionar mecanismo para identificar definiciones de palabras inusuales
+        3.1.4 Abreviaciones: Proporcionar mecanismo para identificar la forma expandida de abreviaciones
+        3.1.5 Nivel de lectura: Cuando el texto requiera habilidad de lectura avanzada, proporcionar contenido suplementario
+        3.1.6 Pronunciación: Proporcionar mecanismo para identificar pronunciación específica de palabras
+        3.2.5 Cambio a petición: Los cambios de contexto solo deben iniciarse por petición del usuario
+        3.3.5 Ayuda contextual: Proporcionar ayuda contextual
+        3.3.6 Prevención de errores general: Permitir revisión, corrección y confirmación antes de envío
+        """
+)
+PRINCIPLES = {'1': 'Perceptible', '2': 'Operable', '3': 'Comprensible', '4': 'Robusto'}
+EMBEDDING_MODEL = "text-embedding-ada-002"
+ARTIFACT_VERSION = 1
+DEFAULT_EMBEDDINGS_DIR = os.getenv('WCAG_EMBEDDINGS_DIR', os.path.join(CACHE_ROOT, 'embeddings'))
+
+
+_LEVEL_RE = re.compile(r'Nivel (A{1,3})\b')
+_CRITERION_RE = re.compile(r'^\s*(\d\.\d+\.\d+) ([^:]+): (.+?)\s*$')
+
+
+class Criterion(NamedTuple):
+    id: str
+    name: str
+    description: str
+    level: str
+    principle: str
+
+    @property
+    def text(self) -> str:
+        """Texto que se indexa: incluye nivel y principio para que influyan en la similitud."""
+        return f"{self.id} {self.name} (Nivel {self.level}, {self.principle}): {self.description}"
+
+
+def parse_criteria(texts=WCAG_GUIDELINES) -> List[Criterion]:
+    """Separar las pautas en un registro por criterio de conformidad."""
+    criteria = []
+    for text in texts:
+        level = _LEVEL_RE.search(text).group(1)
+        for line in text.splitlines():
+            match = _CRITERION_RE.match(line)
+            if match:
+                criterion_id, name, description = match.groups()
+                criteria.append(Criterion(criterion_id, name, description, level, PRINCIPLES[criterion_id[0]]))
+    return criteria
+
+
+def guidelines_fingerprint(texts=WCAG_GUIDELINES, model: str = EMBEDDING_MODEL) -> str:
+    payload = json.dumps({'version': ARTIFACT_VERSION, 'model': model, 'texts': list(texts)}, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def artifact_path(fingerprint: str, directory: str = DEFAULT_EMBEDDINGS_DIR) -> str:
+    return os.path.join(directory, f"wcag-embeddings-v{ARTIFACT_VERSION}-{fingerprint[:16]}.npz")
+
+
+def load_embeddings(texts=WCAG_GUIDELINES, model: str = EMBEDDING_MODEL,
+                    directory: str = DEFAULT_EMBEDDINGS_DIR) -> np.ndarray | None:
+    """Cargar los vectores guardados si el artefacto corresponde exactamente a `texts` y `model`."""
+    fingerprint = guidelines_fingerprint(texts, model)
+    try:
+        with np.load(artifact_path(fingerprint, directory), allow_pickle=False) as artifact:
+            if str(artifact['fingerprint']) != fingerprint:
+                return None
+            return artifact['vectors']
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def save_embeddings(vectors, texts=WCAG_GUIDELINES, model: str = EMBEDDING_MODEL,
+                    directory: str = DEFAULT_EMBEDDINGS_DIR) -> str:
+    fingerprint = guidelines_fingerprint(texts, model)
+    path = artifact_path(fingerprint, directory)
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as handle:
+        np.savez(
+            handle,
+            vectors=np.asarray(vectors, dtype=np.float32),
+            texts=np.array(texts),
+            model=np.array(model),
+            fingerprint=np.array(fingerprint),
+        )
+    # Escritura atómica: varios workers pueden generar el artefacto a la vez
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_or_build_embeddings(embed_documents, texts=WCAG_GUIDELINES, model: str = EMBEDDING_MODEL,
+                             directory: str = DEFAULT_EMBEDDINGS_DIR) -> np.ndarray:
+    """Devolver los embeddings persistidos; solo se llama a `embed_documents` si el texto cambió."""
+    vectors = load_embeddings(texts, model, directory)
+    if vectors is None:
+        vectors = np.asarray(embed_documents(list(texts)), dtype=np.float32)
+        save_embeddings(vectors, texts, model, directory)
+    return vectors
+
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+    from langchain_openai import OpenAIEmbeddings
+
+    load_dotenv()
+    texts = [criterion.text for criterion in parse_criteria()]
+    embeddings = OpenAIEmbeddings(openai_api_key=os.getenv("OPENAI_API_KEY"), model=EMBEDDING_MODEL)
+    load_or_build_embeddings(embeddings.embed_documents, texts)
+    print(artifact_path(guidelines_fingerprint(texts)))
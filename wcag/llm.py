@@ -0,0 +1,178 @@
+"""Etapa asíncrona de evaluación con el LLM: concurrencia acotada, presupuesto de tokens por
+minuto y reintentos con backoff.
+
+Las respuestas se piden en modo JSON (`response_format={"type": "json_object"}`), de modo que el
+modelo no puede envolver el resultado en prosa y `json.loads` no falla por formato.
+"""
+import asyncio
+import json
+import os
+import random
+import time
+from typing import Dict, List
+
+import openai
+
+from wcag.tracing import count, span
+
+DEFAULT_LLM_CONCURRENCY = int(os.getenv('WCAG_LLM_CONCURRENCY', '4'))
+DEFAULT_TOKENS_PER_MINUTE = int(os.getenv('WCAG_LLM_TPM', '30000'))
+JSON_RESPONSE_FORMAT = {"type": "json_object"}
+# Límite de la respuesta en todas las rutas; si el JSON se corta por longitud se reintenta con
+# el doble, hasta MAX_TOKENS_CEILING
+MAX_COMPLETION_TOKENS = 1500
+MAX_TOKENS_CEILING = 4000
+# Aproximación suficiente para reservar presupuesto antes de conocer el uso real
+CHARS_PER_TOKEN = 4
+TRANSIENT_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+# USD por cada 1K tokens (entrada, salida); los modelos que no figuran quedan sin coste estimado
+MODEL_PRICING = {
+    'gpt-4o-mini': (0.00015, 0.0006),
+    'gpt-4o': (0.0025, 0.01),
+    'gpt-4-turbo': (0.01, 0.03),
+    'gpt-4': (0.03, 0.06),
+    'gpt-3.5-turbo': (0.0005, 0.0015),
+}
+
+
+def estimate_tokens(messages: List[Dict], max_tokens: int) -> int:
+    return sum(len(message['content']) for message in messages) // CHARS_PER_TOKEN + max_tokens
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float | None:
+    # Las versiones con fecha (gpt-4o-2024-08-06) usan el precio de su familia; gana el prefijo más largo
+    family = max((name for name in MODEL_PRICING if model.startswith(name)), key=len, default=None)
+    if family is None:
+        return None
+    prompt_price, completion_price = MODEL_PRICING[family]
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+
+
+def larger_max_tokens(choice, max_tokens: int) -> int | None:
+    """Nuevo límite si la respuesta se cortó por `max_tokens`; repetirla igual se volvería a cortar."""
+    if choice.finish_reason != 'length' or max_tokens >= MAX_TOKENS_CEILING:
+        return None
+    return min(MAX_TOKENS_CEILING, max_tokens * 2)
+
+
+def usage_record(model: str, usage, latency: float, estimated_prompt_tokens: int = 0) -> Dict:
+    """Consumo de una llamada; si la API no informa `usage` se usa la estimación local."""
+    prompt_tokens = usage.prompt_tokens if usage is not None else estimated_prompt_tokens
+    completion_tokens = usage.completion_tokens if usage is not None else 0
+    return {
+        'model': model,
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'total_tokens': prompt_tokens + completion_tokens,
+        'latency_s': round(latency, 3),
+        'cost_usd': estimate_cost(model, prompt_tokens, completion_tokens),
+    }
+
+
+class TokenBudget:
+    """Token bucket de tokens del modelo por minuto; `acquire` espera sin bloquear el bucle."""
+
+    def __init__(self, tokens_per_minute: int = DEFAULT_TOKENS_PER_MINUTE, clock=time.monotonic):
+        self.capacity = tokens_per_minute
+        self.rate = tokens_per_minute / 60
+        self.tokens = float(tokens_per_minute)
+        self._clock = clock
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: int) -> None:
+        # Una petición mayor que el presupuesto completo se limita a él para no esperar para siempre
+        tokens = min(tokens, self.capacity)
+        # El lock mantiene el orden de llegada: una petición grande no queda postergada por pequeñas
+        async with self._lock:
+            self._refill()
+            while self.tokens < tokens:
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= tokens
+
+    def refund(self, tokens: int) -> None:
+        """Devolver la parte reservada que la respuesta no llegó a usar."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + tokens)
+
+
+class AsyncLLMStage:
+    def __init__(self, client: openai.AsyncOpenAI, model: str, max_concurrency: int = DEFAULT_LLM_CONCURRENCY,
+                 tokens_per_minute: int = DEFAULT_TOKENS_PER_MINUTE, max_retries: int = 4,
+                 base_backoff: float = 1.0, max_backoff: float = 60.0, max_tokens: int = MAX_COMPLETION_TOKENS):
+        self.client = client
+        self.model = model
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.max_tokens = max_tokens
+        self.budget = TokenBudget(tokens_per_minute)
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self.retries = 0
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        response = getattr(error, 'response', None)
+        retry_after = response.headers.get('retry-after') if response is not None else None
+        try:
+            return min(self.max_backoff, float(retry_after))
+        except (TypeError, ValueError):
+            # Backoff exponencial con "full jitter"
+            return random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** attempt))
+
+    async def complete_json(self, messages: List[Dict], prompt_tokens: int = None,
+                            temperature: float = 0.1) -> tuple[Dict, Dict]:
+        """(resultado, consumo) de la llamada; `prompt_tokens` afina la reserva de presupuesto."""
+        max_tokens = self.max_tokens
+        for attempt in range(self.max_retries + 1):
+            reserved = (prompt_tokens + max_tokens) if prompt_tokens else estimate_tokens(messages, max_tokens)
+            await self.budget.acquire(reserved)
+            try:
+                async with self._slots:
+                    # El span cubre solo la llamada, no la espera por turno o presupuesto
+                    with span('llm', mode='async') as call:
+                        started = time.perf_counter()
+                        response = await self.client.chat.completions.create(
+                            model=self.model,
+                            messages=messages,
+                            temperature=temperature,
+                            max_tokens=max_tokens,
+                            response_format=JSON_RESPONSE_FORMAT,
+                        )
+                        latency = time.perf_counter() - started
+                        if response.usage is not None:
+                            call.add('tokens', response.usage.total_tokens)
+            except Exception as e:
+                # Sin respuesta no se gastó nada de lo reservado
+                self.budget.refund(reserved)
+                if not isinstance(e, TRANSIENT_ERRORS) or attempt == self.max_retries:
+                    raise
+                await self._retry(attempt, e)
+                continue
+            if response.usage is not None:
+                self.budget.refund(max(0, reserved - response.usage.total_tokens))
+            choice = response.choices[0]
+            try:
+                result = json.loads(choice.message.content)
+            except json.JSONDecodeError as e:
+                if attempt == self.max_retries:
+                    raise
+                larger = larger_max_tokens(choice, max_tokens)
+                if choice.finish_reason == 'length' and larger is None:
+                    raise
+                if larger is not None:
+                    max_tokens = larger
+                await self._retry(attempt, e)
+                continue
+            return result, usage_record(self.model, response.usage, latency, prompt_tokens or 0)
+
+    async def _retry(self, attempt: int, error: Exception) -> None:
+        self.retries += 1
+        count('llm_retries')
+        if not isinstance(error, json.JSONDecodeError):
+            await asyncio.sleep(self._backoff(attempt, error))
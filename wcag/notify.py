@@ -0,0 +1,15 @@
+"""Avisos de progreso independientes de la interfaz.
+
+Los componentes reciben un callable `notify(level, message)` con `level` en
+'info', 'success', 'warning' o 'error'. Por defecto los avisos van al logger `wcag`;
+la aplicación de Streamlit pasa uno que los muestra en la página.
+"""
+import logging
+
+LOG_LEVELS = {'info': logging.INFO, 'success': logging.INFO, 'warning': logging.WARNING, 'error': logging.ERROR}
+
+logger = logging.getLogger('wcag')
+
+
+def log_notify(level: str, message: str) -> None:
+    logger.log(LOG_LEVELS.get(level, logging.INFO), message)
@@ -0,0 +1,73 @@
+"""Lectura incremental de un objeto JSON que llega por fragmentos (respuestas del LLM en streaming).
+
+`PartialJSONParser` mantiene el estado léxico (pila de contenedores, dentro/fuera de cadena)
+al recibir cada fragmento, de modo que `snapshot()` puede cerrar el documento provisionalmente
+sin volver a recorrer todo el texto. Las cadenas a medio llegar se devuelven truncadas.
+"""
+import json
+from typing import Dict
+
+_CLOSERS = {'{': '}', '[': ']'}
+
+
+class PartialJSONParser:
+    def __init__(self):
+        self._parts = []
+        self._length = 0
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        # Último punto en que el prefijo, cerrado con la pila de ese momento, es JSON válido
+        self._safe = (0, '')
+
+    @property
+    def text(self) -> str:
+        if len(self._parts) > 1:
+            self._parts = [''.join(self._parts)]
+        return self._parts[0] if self._parts else ''
+
+    def feed(self, fragment: str) -> None:
+        offset = self._length
+        for i, char in enumerate(fragment, offset):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in _CLOSERS:
+                self._stack.append(_CLOSERS[char])
+                self._safe = (i + 1, self._closers())
+            elif char in '}]':
+                if self._stack:
+                    self._stack.pop()
+                self._safe = (i + 1, self._closers())
+            elif char == ',':
+                # Todo lo anterior a la coma es un valor completo
+                self._safe = (i, self._closers())
+        self._parts.append(fragment)
+        self._length += len(fragment)
+
+    def _closers(self) -> str:
+        return ''.join(reversed(self._stack))
+
+    def snapshot(self) -> Dict:
+        """Mejor objeto parcial disponible; {} si todavía no hay nada interpretable."""
+        text = self.text
+        start = text.find('{')
+        if start < 0:
+            return {}
+        candidate = text + ('"' if self._in_string and not self._escape else '') + self._closers()
+        try:
+            value = json.loads(candidate[start:])
+        except ValueError:
+            # Clave sin valor, literal o número a medias: se vuelve al último punto seguro
+            index, closers = self._safe
+            try:
+                value = json.loads(text[start:index] + closers) if index > start else {}
+            except ValueError:
+                return {}
+        return value if isinstance(value, dict) else {}
@@ -0,0 +1,151 @@
+"""Construcción compacta del prompt de evaluación dentro de un presupuesto de tokens.
+
+Los hallazgos repetidos se agregan en conteos por mensaje y la secuencia de encabezados se
+resume por tramos (run-length), de modo que el tamaño del prompt no crece con el documento.
+Si aun así se supera el presupuesto, se recortan primero los detalles menos relevantes.
+"""
+import os
+from collections import Counter
+from functools import lru_cache
+from itertools import groupby
+from typing import Dict, List, NamedTuple, Sequence
+
+DEFAULT_PROMPT_TOKEN_BUDGET = int(os.getenv('WCAG_PROMPT_TOKENS', '1500'))
+CHARS_PER_TOKEN = 4
+SYSTEM_PROMPT = "Eres un experto en accesibilidad web y WCAG 2.1. Analiza sitios web y proporciona evaluaciones detalladas."
+# Niveles de detalle de mayor a menor: (tramos de encabezados, mensajes por hallazgo, criterios)
+DETAIL_LEVELS = ((40, 10, 10), (20, 5, 6), (10, 3, 3), (5, 1, 1), (0, 0, 0))
+
+
+class PromptBuild(NamedTuple):
+    messages: List[Dict]
+    prompt_tokens: int
+    truncated: bool
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        try:
+            return tiktoken.get_encoding('cl100k_base')
+        except Exception:
+            # Sin red para descargar la codificación: se usa la aproximación por caracteres
+            return None
+
+
+def count_tokens(text: str, model: str) -> int:
+    """Tokens de `text` con tiktoken si está disponible; si no, una estimación por caracteres."""
+    encoding = _encoding(model)
+    if encoding is None:
+        return len(text) // CHARS_PER_TOKEN + 1
+    return len(encoding.encode(text))
+
+
+def summarize_headings(headings: Sequence[str], max_runs: int) -> str:
+    """'h1, h2 ×3, h3 ×12, …' con los saltos de nivel contados aparte."""
+    if not headings:
+        return "ninguno"
+    runs = [(tag, sum(1 for _ in group)) for tag, group in groupby(headings)]
+    levels = [int(tag[1]) for tag, _ in runs]
+    skips = sum(1 for previous, current in zip(levels, levels[1:]) if current > previous + 1)
+    counts = Counter(headings)
+    totals = ", ".join(f"{tag}: {counts[tag]}" for tag in sorted(counts))
+    summary = f"{len(headings)} encabezados ({totals}); saltos de nivel: {skips}"
+    if max_runs <= 0:
+        return summary
+    order = ", ".join(tag if count == 1 else f"{tag} ×{count}" for tag, count in runs[:max_runs])
+    if len(runs) > max_runs:
+        order += f", … (+{len(runs) - max_runs} tramos)"
+    return f"{summary}; orden: {order}"
+
+
+def summarize_findings(findings: Sequence[str], max_messages: int) -> str:
+    """Mensajes distintos con su número de apariciones, de más a menos frecuente."""
+    if not findings:
+        return "ninguno"
+    counts = Counter(findings).most_common()
+    summary = f"{len(findings)} en total"
+    if max_messages <= 0:
+        return summary
+    lines = [f"{message} ({count})" for message, count in counts[:max_messages]]
+    if len(counts) > max_messages:
+        lines.append(f"… (+{len(counts) - max_messages} tipos)")
+    return f"{summary}: " + "; ".join(lines)
+
+
+def summarize_rule_findings(findings: Sequence[Dict], max_findings: int) -> str:
+    """Reglas locales incumplidas, de más a menos ocurrencias."""
+    if not findings:
+        return "ninguna"
+    ordered = sorted(findings, key=lambda finding: -finding['count'])
+    lines = [f"{f['criteria']} {f['title']} ({f['count']})" for f in ordered[:max(1, max_findings)]]
+    if len(ordered) > max(1, max_findings):
+        lines.append(f"… (+{len(ordered) - max(1, max_findings)} reglas)")
+    return "; ".join(lines)
+
+
+def _template_line(analysis_data: Dict, max_messages: int) -> str:
+    """Componentes compartidos con otras páginas del sitio: evaluados aparte, solo como contexto."""
+    if 'template_findings' not in analysis_data:
+        return ""
+    return ("\n        - Componentes de plantilla compartidos con otras páginas (ya evaluados aparte; no los incluyas en issues): "
+            f"{summarize_rule_findings(analysis_data['template_findings'], max_messages * 2)}")
+
+
+def _user_prompt(analysis_data: Dict, related_criteria: Sequence, detail) -> str:
+    max_runs, max_messages, max_criteria = detail
+    criteria_text = "\n".join(
+        f"        - {c.id} {c.name} (Nivel {c.level}): {c.description}" for c in related_criteria[:max_criteria]
+    ) or "        - No se recuperaron criterios"
+    return f"""
+        Analiza la siguiente información de accesibilidad de un sitio web según los estándares WCAG 2.1:
+        Datos del análisis:
+        - Imágenes totales: {analysis_data['images']}
+        - Imágenes con alt text: {analysis_data['images_with_alt']}
+        - Estructura de encabezados: {summarize_headings(analysis_data['headings'], max_runs)}
+        - Enlaces totales: {analysis_data['links']}
+        - Formularios: {analysis_data['forms']}
+        - Campos de entrada: {analysis_data['inputs']}
+        - Etiquetas: {analysis_data['labels']}
+        - Atributo lang en HTML: {analysis_data['lang_attr']}
+        - Título de página: {analysis_data['title']}
+        - Enlaces de salto: {analysis_data['skip_links']}
+        - Elementos con aria-label: {analysis_data['aria_labels']}
+        - Elementos con roles ARIA: {analysis_data['roles']}
+        Problemas detectados:
+        - Contraste: {summarize_findings(analysis_data['contrast_issues'], max_messages)}
+        - Navegación por teclado: {summarize_findings(analysis_data['keyboard_focus'], max_messages)}
+        - Estructura semántica: {summarize_findings(analysis_data['semantic_structure'], max(1, max_messages))}
+        - Reglas automáticas incumplidas: {summarize_rule_findings(analysis_data.get('rule_findings', []), max_messages * 2)}{_template_line(analysis_data, max_messages)}
+        Criterios WCAG 2.1 relacionados con los problemas detectados:
+{criteria_text}
+        Proporciona:
+        1. Evaluación de conformidad WCAG 2.1 (A, AA, o AAA)
+        2. Lista de problemas específicos encontrados
+        3. Recomendaciones detalladas de mejora
+        4. Puntuación numérica del 1-100
+        Responde en formato JSON con las claves: level, score, issues, recommendations, summary
+        """
+
+
+def build_prompt(analysis_data: Dict, related_criteria: Sequence, model: str,
+                 token_budget: int = DEFAULT_PROMPT_TOKEN_BUDGET) -> PromptBuild:
+    """Mensajes para el modelo con el mayor nivel de detalle que cabe en `token_budget`."""
+    system_tokens = count_tokens(SYSTEM_PROMPT, model)
+    for level, detail in enumerate(DETAIL_LEVELS):
+        prompt = _user_prompt(analysis_data, related_criteria, detail)
+        prompt_tokens = system_tokens + count_tokens(prompt, model)
+        if prompt_tokens <= token_budget:
+            break
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+    # Con el nivel mínimo se envía igualmente: su tamaño ya no depende del documento
+    return PromptBuild(messages, prompt_tokens, level > 0)
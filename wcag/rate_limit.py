@@ -0,0 +1,122 @@
+"""Limitador de peticiones por host (token bucket) con backoff exponencial y jitter.
+
+El limitador nunca duerme: `try_acquire` consume un token y devuelve 0, o devuelve cuántos
+segundos faltan sin consumir nada. Así quien lo usa decide si reprogramar la petición (el
+rastreador asíncrono sigue con otros hosts) o desistir en lugar de bloquear el hilo.
+"""
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from typing import Dict
+
+DEFAULT_RATE = float(os.getenv('WCAG_HOST_RATE', '4'))
+DEFAULT_BURST = int(os.getenv('WCAG_HOST_BURST', '8'))
+
+
+class HostThrottled(Exception):
+    """El host está limitado durante más tiempo del que se acepta esperar en línea."""
+
+    def __init__(self, host: str, wait: float):
+        super().__init__(f"{host} limitado durante {wait:.0f} s")
+        self.host = host
+        self.wait = wait
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Segundos indicados por la cabecera Retry-After (entero o fecha HTTP)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class _HostState:
+    __slots__ = ('tokens', 'updated', 'blocked_until', 'failures')
+
+    def __init__(self, capacity: float, now: float):
+        self.tokens = capacity
+        self.updated = now
+        self.blocked_until = 0.0
+        self.failures = 0
+
+
+class HostRateLimiter:
+    def __init__(self, rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST, base_backoff: float = 1.0,
+                 max_backoff: float = 300.0, clock=time.monotonic, rng: random.Random = None):
+        self.rate = rate
+        self.burst = burst
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._clock = clock
+        self._rng = rng or random.Random()
+        self._hosts: Dict[str, _HostState] = {}
+        self._lock = threading.Lock()
+        self.throttled_seconds: Dict[str, float] = defaultdict(float)
+
+    def _state(self, host: str, now: float) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(self.burst, now)
+        state.tokens = min(self.burst, state.tokens + (now - state.updated) * self.rate)
+        state.updated = now
+        return state
+
+    def try_acquire(self, host: str) -> float:
+        """0 si se puede enviar ya (consume un token); si no, segundos de espera necesarios."""
+        with self._lock:
+            now = self._clock()
+            state = self._state(host, now)
+            if state.blocked_until > now:
+                return state.blocked_until - now
+            if state.tokens >= 1:
+                state.tokens -= 1
+                return 0.0
+            return (1 - state.tokens) / self.rate
+
+    def backoff(self, host: str, retry_after: float = None) -> float:
+        """Registrar un fallo o un 429 y bloquear el host; respeta Retry-After si viene."""
+        with self._lock:
+            now = self._clock()
+            state = self._state(host, now)
+            state.failures += 1
+            if retry_after is None:
+                # Backoff exponencial con "full jitter"
+                ceiling = min(self.max_backoff, self.base_backoff * 2 ** (state.failures - 1))
+                retry_after = self._rng.uniform(0, ceiling)
+            wait = min(self.max_backoff, retry_after)
+            new_until = now + wait
+            if new_until > state.blocked_until:
+                self.throttled_seconds[host] += new_until - max(now, state.blocked_until)
+                state.blocked_until = new_until
+            return wait
+
+    def on_success(self, host: str) -> None:
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is not None:
+                state.failures = 0
+
+    def report(self, since: Dict[str, float] = None) -> Dict[str, float]:
+        """Segundos que cada host ha estado bloqueado por el limitador; con `since` (un informe
+        anterior) solo los acumulados desde entonces."""
+        with self._lock:
+            totals = dict(self.throttled_seconds)
+        if since is None:
+            return totals
+        return {host: seconds - since.get(host, 0.0) for host, seconds in totals.items()
+                if seconds > since.get(host, 0.0)}
+
+
+@lru_cache(maxsize=None)
+def get_rate_limiter() -> HostRateLimiter:
+    return HostRateLimiter()
@@ -0,0 +1,189 @@
+"""Estilos calculados del DOM renderizado, obtenidos con una sola llamada a `page.evaluate`.
+
+El script recorre en el navegador los elementos con texto propio y los enfocables, y devuelve
+columnas planas (colores, tamaños, cajas y banderas) en lugar de un objeto por elemento, de
+modo que el coste de serialización es mínimo y no hay un viaje de ida y vuelta por elemento.
+Con esos datos se recalculan el contraste (1.4.3/1.4.6) y se añaden la visibilidad del foco
+(2.4.7) y el ajuste a 320 px de ancho (1.4.10), que no se pueden juzgar desde el HTML estático.
+"""
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+
+from wcag.contrast import (AA_LARGE, AA_NORMAL, AAA_LARGE, AAA_NORMAL, LARGE_BOLD_TEXT_PX, LARGE_TEXT_PX,
+                           contrast_ratios)
+from wcag.wcag_rules import Finding
+
+# 1.4.10: el contenido debe caber en 320 px CSS de ancho sin desplazamiento horizontal
+REFLOW_VIEWPORT = {'width': 320, 'height': 256}
+# Los elementos enfocables se enfocan uno a uno dentro del navegador; se acota el número
+MAX_FOCUS_CHECKS = 500
+# Sin hojas de estilo no hay estilos calculados: solo se bloquean imágenes y fuentes
+STYLED_BLOCKED_RESOURCES = "**/*.{png,jpg,jpeg,gif,svg,woff,woff2}"
+# Las reglas estáticas que estos datos sustituyen
+STATIC_CONTRAST_RULES = ('contrast', 'contrast-enhanced')
+
+VISIBLE, FOCUSABLE, FOCUS_INDICATOR, BOLD, HAS_TEXT = 1, 2, 4, 8, 16
+
+COLLECT_RENDERED_STYLES_JS = """
+(maxFocus) => {
+    const FOCUSABLE = 'a[href], area[href], button, input:not([type=hidden]), select, textarea, summary, '
+        + 'iframe, [tabindex]:not([tabindex="-1"]), [contenteditable=""], [contenteditable="true"]';
+    const rgba = (value) => {
+        const parts = (value.match(/[\\d.]+/g) || []).map(Number);
+        return parts.length >= 3 ? [parts[0], parts[1], parts[2], parts.length > 3 ? parts[3] : 1] : [0, 0, 0, 0];
+    };
+    const blend = (c, under) => [0, 1, 2].map((i) => c[i] * c[3] + under[i] * (1 - c[3]));
+    // Fondo efectivo (composición de capas semitransparentes); null si hay imagen o degradado
+    const backgrounds = new Map();
+    const backgroundOf = (el) => {
+        if (!el) return [255, 255, 255];
+        if (backgrounds.has(el)) return backgrounds.get(el);
+        const style = getComputedStyle(el);
+        let value;
+        if (style.backgroundImage !== 'none') {
+            value = null;
+        } else {
+            const color = rgba(style.backgroundColor);
+            if (color[3] >= 1) {
+                value = color.slice(0, 3);
+            } else {
+                const under = backgroundOf(el.parentElement);
+                value = under === null ? null : blend(color, under);
+            }
+        }
+        backgrounds.set(el, value);
+        return value;
+    };
+    const focusSignature = (style) => [style.outlineStyle, style.outlineWidth, style.outlineColor, style.boxShadow,
+        style.borderColor, style.backgroundColor, style.textDecorationLine].join('|');
+
+    const focusable = new Set(document.querySelectorAll(FOCUSABLE));
+    const elements = [];
+    for (const el of document.body ? document.body.querySelectorAll('*') : []) {
+        const ownText = Array.prototype.some.call(el.childNodes, (n) => n.nodeType === 3 && n.data.trim());
+        if (ownText || focusable.has(el)) elements.push([el, ownText]);
+    }
+    const previous = document.activeElement;
+    const out = {viewport: [innerWidth, document.documentElement.scrollWidth],
+                 tags: [], colors: [], fonts: [], boxes: [], flags: []};
+    let focusChecks = 0;
+    for (const [el, ownText] of elements) {
+        const style = getComputedStyle(el);
+        const rect = el.getBoundingClientRect();
+        const visible = style.display !== 'none' && style.visibility !== 'hidden' && Number(style.opacity) > 0
+            && rect.width > 0 && rect.height > 0;
+        const background = backgroundOf(el);
+        const color = rgba(style.color);
+        const foreground = blend(color, background || [255, 255, 255]);
+        let flags = (visible ? 1 : 0) | (ownText ? 16 : 0) | (Number(style.fontWeight) >= 700 ? 8 : 0);
+        if (focusable.has(el)) {
+            flags |= 2;
+            if (visible && focusChecks < maxFocus) {
+                focusChecks++;
+                const before = focusSignature(style);
+                el.focus({preventScroll: true});
+                const focused = getComputedStyle(el);
+                const outline = focused.outlineStyle !== 'none' && parseFloat(focused.outlineWidth) > 0;
+                if (document.activeElement === el && (outline || focusSignature(focused) !== before)) flags |= 4;
+                el.blur();
+            } else {
+                flags |= 4;  // Sin comprobar: no se cuenta como incumplimiento
+            }
+        }
+        out.tags.push(el.localName);
+        out.colors.push(...foreground.map(Math.round), ...(background ? background.map(Math.round) : [-1, -1, -1]));
+        out.fonts.push(parseFloat(style.fontSize) || 16);
+        out.boxes.push(Math.round(rect.left), Math.round(rect.top), Math.round(rect.width), Math.round(rect.height));
+        out.flags.push(flags);
+    }
+    if (previous && previous.focus) previous.focus({preventScroll: true});
+    return out;
+}
+"""
+
+
+class RenderedStyles(NamedTuple):
+    viewport_width: float
+    scroll_width: float
+    tags: List[str]
+    foreground: np.ndarray
+    # Filas con -1 cuando el fondo es una imagen o un degradado
+    background: np.ndarray
+    font_px: np.ndarray
+    # x, y, ancho, alto en px CSS
+    boxes: np.ndarray
+    flags: np.ndarray
+
+    @classmethod
+    def from_payload(cls, payload: Dict) -> 'RenderedStyles':
+        colors = np.asarray(payload['colors'], dtype=float).reshape(-1, 6)
+        viewport_width, scroll_width = payload['viewport']
+        return cls(float(viewport_width), float(scroll_width), list(payload['tags']), colors[:, :3], colors[:, 3:],
+                   np.asarray(payload['fonts'], dtype=float), np.asarray(payload['boxes'], dtype=float).reshape(-1, 4),
+                   np.asarray(payload['flags'], dtype=np.int32))
+
+    def has(self, flag: int) -> np.ndarray:
+        return (self.flags & flag) != 0
+
+
+def fetch_rendered(pool, url: str, timeout: float = 120) -> Tuple[str, Dict]:
+    """HTML y estilos calculados de `url` renderizada en un navegador del pool."""
+    def collect(page):
+        html = page.content()
+        page.set_viewport_size(REFLOW_VIEWPORT)
+        return html, page.evaluate(COLLECT_RENDERED_STYLES_JS, MAX_FOCUS_CHECKS)
+
+    return pool.run(url, collect, timeout=timeout, blocked_resources=STYLED_BLOCKED_RESOURCES)
+
+
+def _contrast(styles: RenderedStyles) -> Tuple[np.ndarray, np.ndarray]:
+    """Máscaras de texto visible por debajo de AA y de AAA."""
+    text = styles.has(VISIBLE) & styles.has(HAS_TEXT) & (styles.background[:, 0] >= 0)
+    if not text.any():
+        empty = np.zeros(len(styles.tags), dtype=bool)
+        return empty, empty
+    ratios = contrast_ratios(styles.foreground, np.where(styles.background < 0, 255.0, styles.background))
+    large = (styles.font_px >= LARGE_TEXT_PX) | (styles.has(BOLD) & (styles.font_px >= LARGE_BOLD_TEXT_PX))
+    aa_fail = text & (ratios < np.where(large, AA_LARGE, AA_NORMAL))
+    aaa_fail = text & (ratios < np.where(large, AAA_LARGE, AAA_NORMAL))
+    return aa_fail, aaa_fail
+
+
+def rendered_findings(styles: RenderedStyles) -> Tuple[List[Finding], List[str]]:
+    """Incumplimientos según el DOM renderizado y los mensajes de contraste por etiqueta."""
+    findings = []
+    aa_fail, aaa_fail = _contrast(styles)
+    if aa_fail.any():
+        findings.append(Finding('contrast', '1.4.3', 'AA', "Texto con contraste insuficiente", int(aa_fail.sum()),
+                                "Asegurar un contraste de al menos 4.5:1 para el texto normal y 3:1 para el texto grande"))
+    if aaa_fail.any():
+        findings.append(Finding('contrast-enhanced', '1.4.6', 'AAA', "Texto por debajo del contraste mejorado",
+                                int(aaa_fail.sum()), "Para nivel AAA, llevar el contraste a 7:1 (4.5:1 en texto grande)"))
+    hidden_focus = styles.has(FOCUSABLE) & styles.has(VISIBLE) & ~styles.has(FOCUS_INDICATOR)
+    if hidden_focus.any():
+        findings.append(Finding('focus-visible', '2.4.7', 'AA', "Elementos sin indicador de foco visible",
+                                int(hidden_focus.sum()),
+                                "No eliminar el outline en :focus sin sustituirlo por un indicador equivalente"))
+    if styles.scroll_width > styles.viewport_width + 1:
+        overflowing = styles.has(VISIBLE) & (styles.boxes[:, 0] + styles.boxes[:, 2] > styles.viewport_width + 1)
+        findings.append(Finding('reflow', '1.4.10', 'AA', "Contenido con desplazamiento horizontal a 320 px",
+                                max(1, int(overflowing.sum())),
+                                "Usar anchos relativos y diseño adaptable para que el contenido quepa en 320 px"))
+    messages = [f"Contraste inferior a {AA_NORMAL}:1 en {tag}" for tag in np.asarray(styles.tags, dtype=object)[aa_fail]]
+    return findings, messages
+
+
+def apply_rendered_styles(analysis_data: Dict, payload: Dict) -> Dict:
+    """Sustituir en `analysis_data` las estimaciones estáticas por las del DOM renderizado."""
+    styles = RenderedStyles.from_payload(payload)
+    findings, messages = rendered_findings(styles)
+    static = [finding for finding in analysis_data.get('rule_findings', []) if finding['rule'] not in STATIC_CONTRAST_RULES]
+    analysis_data['rule_findings'] = static + [finding._asdict() for finding in findings]
+    analysis_data['contrast_issues'] = messages
+    analysis_data['rendered_styles'] = {
+        'elements': len(styles.tags),
+        'viewport_width': styles.viewport_width,
+        'scroll_width': styles.scroll_width,
+    }
+    return analysis_data
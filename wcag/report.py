@@ -0,0 +1,459 @@
+"""Informes PDF: el de una evaluación y el consolidado de una auditoría de sitio.
+
+El informe de sitio (`SiteReportBuilder`) admite miles de páginas con memoria acotada: los
+resultados se guardan en un archivo temporal JSONL a medida que llegan y solo se conservan en
+memoria los agregados. Al escribir el PDF la historia de ReportLab se genera de forma perezosa,
+página a página, desde ese archivo; los gráficos se dibujan una sola vez y se reutilizan.
+"""
+import json
+import re
+import statistics
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+from io import BytesIO
+from typing import Dict, Iterator, List
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import cm
+from reportlab.platypus import CondPageBreak, Image, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+from xml.sax.saxutils import escape
+
+from wcag.tracing import span
+
+# Filas por tabla del resumen de páginas; tablas pequeñas se maquetan en tiempo lineal
+SUMMARY_ROWS_PER_TABLE = 40
+# Problemas listados por página en el informe de sitio
+MAX_PAGE_ISSUES = 15
+MAX_CRITERIA_IN_CHART = 12
+_CRITERION_ID = re.compile(r'\b([1-4]\.\d{1,2}\.\d{1,2})\b')
+_ISSUE_COUNT = re.compile(r'\((\d+)\)\s*$')
+_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1f4e79')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f2f2f2')]),
+    ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
+])
+
+
+@lru_cache(maxsize=None)
+def report_styles():
+    """Hojas de estilo compartidas por todos los informes; construirlas cuesta más que un informe corto."""
+    styles = getSampleStyleSheet()
+    custom_styles = {}
+    custom_styles['Title'] = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        spaceAfter=30,
+        textColor=colors.HexColor('#1f4e79'),
+        alignment=1
+    )
+    custom_styles['Subtitle'] = ParagraphStyle(
+        'CustomSubtitle',
+        parent=styles['Heading2'],
+        fontSize=16,
+        spaceAfter=20,
+        textColor=colors.HexColor('#2c5aa0')
+    )
+    custom_styles['Issue'] = ParagraphStyle(
+        'Issue',
+        parent=styles['Normal'],
+        fontSize=11,
+        leftIndent=20,
+        bulletIndent=10,
+        textColor=colors.HexColor('#d63384')
+    )
+    custom_styles['Recommendation'] = ParagraphStyle(
+        'Recommendation',
+        parent=styles['Normal'],
+        fontSize=11,
+        leftIndent=20,
+        bulletIndent=10,
+        textColor=colors.HexColor('#198754')
+    )
+    custom_styles['PageHeading'] = ParagraphStyle(
+        'PageHeading',
+        parent=styles['Heading3'],
+        fontSize=11,
+        spaceBefore=12,
+        spaceAfter=4,
+        textColor=colors.HexColor('#1f4e79')
+    )
+    custom_styles['Cell'] = ParagraphStyle('Cell', parent=styles['Normal'], fontSize=8, leading=10)
+    custom_styles['SmallIssue'] = ParagraphStyle(
+        'SmallIssue',
+        parent=custom_styles['Issue'],
+        fontSize=9,
+        leading=11
+    )
+    return styles, custom_styles
+
+
+class ReportGenerator:
+    def __init__(self):
+        self.styles, self.custom_styles = report_styles()
+
+    def generate_pdf_report(self, analysis_result: Dict, url: str = None) -> BytesIO:
+        buffer = BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
+        story = []
+
+        story.append(Paragraph("Reporte de Accesibilidad Web WCAG 2.1", self.custom_styles['Title']))
+        story.append(Spacer(1, 20))
+
+        if url:
+            story.append(Paragraph(f"<b>URL analizada:</b> {escape(url)}", self.styles['Normal']))
+        story.append(Paragraph(f"<b>Fecha del análisis:</b> {datetime.now().strftime('%d/%m/%Y %H:%M')}", self.styles['Normal']))
+        story.append(Paragraph(f"<b>Nivel de conformidad:</b> {escape(str(analysis_result.get('level', 'No determinado')))}", self.styles['Normal']))
+        story.append(Paragraph(f"<b>Puntuación:</b> {analysis_result.get('score', 0)}/100", self.styles['Normal']))
+        story.append(Spacer(1, 30))
+
+        story.append(Paragraph("Resumen Ejecutivo", self.custom_styles['Subtitle']))
+        story.append(Paragraph(escape(str(analysis_result.get('summary', 'No disponible'))), self.styles['Normal']))
+        story.append(Spacer(1, 20))
+
+        story.append(Paragraph("Problemas Identificados", self.custom_styles['Subtitle']))
+        issues = analysis_result.get('issues', [])
+        if issues:
+            for issue in issues:
+                story.append(Paragraph(f"• {escape(str(issue))}", self.custom_styles['Issue']))
+        else:
+            story.append(Paragraph("No se identificaron problemas específicos.", self.styles['Normal']))
+        story.append(Spacer(1, 20))
+
+        template_issues = analysis_result.get('template_issues')
+        if template_issues:
+            story.append(Paragraph("Problemas de la Plantilla Compartida", self.custom_styles['Subtitle']))
+            story.append(Paragraph("Componentes repetidos en otras páginas del sitio (cabecera, navegación, pie...).",
+                                   self.styles['Normal']))
+            for issue in template_issues:
+                story.append(Paragraph(f"• {escape(str(issue))}", self.custom_styles['Issue']))
+            story.append(Spacer(1, 20))
+
+        story.append(Paragraph("Recomendaciones de Mejora", self.custom_styles['Subtitle']))
+        recommendations = analysis_result.get('recommendations', [])
+        if recommendations:
+            for rec in recommendations:
+                story.append(Paragraph(f"• {escape(str(rec))}", self.custom_styles['Recommendation']))
+        else:
+            story.append(Paragraph("No se generaron recomendaciones específicas.", self.styles['Normal']))
+        story.append(Spacer(1, 30))
+
+        story.append(Paragraph("Criterios WCAG 2.1 Evaluados", self.custom_styles['Subtitle']))
+        table_data = [
+            ['Criterio', 'Nivel', 'Estado', 'Observaciones'],
+            ['1.1.1 Contenido no textual', 'A', '✓' if analysis_result.get('score', 0) > 60 else '✗', 'Texto alternativo para imágenes'],
+            ['1.4.3 Contraste mínimo', 'AA', '✓' if analysis_result.get('score', 0) > 70 else '✗', 'Contraste de colores'],
+            ['2.1.1 Teclado', 'A', '✓' if analysis_result.get('score', 0) > 60 else '✗', 'Navegación por teclado'],
+            ['3.1.1 Idioma de página', 'A', '✓' if analysis_result.get('score', 0) > 50 else '✗', 'Atributo lang definido'],
+            ['4.1.2 Nombre, función, valor', 'A', '✓' if analysis_result.get('score', 0) > 65 else '✗', 'Elementos de interfaz accesibles']
+        ]
+        table = Table(table_data)
+        table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1f4e79')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ]))
+        story.append(table)
+
+        with span('pdf', report='page') as build:
+            doc.build(story)
+            build.add('bytes', buffer.tell())
+        buffer.seek(0)
+        return buffer
+
+
+def _criteria_names() -> Dict[str, tuple]:
+    from wcag.knowledge import parse_criteria
+    return {criterion.id: (criterion.name, criterion.level) for criterion in parse_criteria()}
+
+
+def issue_criteria(issue: str) -> tuple[List[str], int]:
+    """Criterios citados en un problema ('1.3.1/4.1.2 ... (3)') y sus ocurrencias (1 si no constan)."""
+    match = _ISSUE_COUNT.search(issue)
+    return list(dict.fromkeys(_CRITERION_ID.findall(issue))), int(match.group(1)) if match else 1
+
+
+def _figure_png(figure) -> bytes:
+    buffer = BytesIO()
+    figure.savefig(buffer, format='png', dpi=110, bbox_inches='tight')
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=None)
+def score_badge_png(band: int) -> bytes:
+    """Indicador de puntuación por tramos de 10; se dibuja una vez por tramo y el PDF lo incrusta una vez."""
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=(1.2, 0.25))
+    ax = figure.add_axes([0, 0, 1, 1])
+    color = '#28a745' if band >= 8 else '#ffc107' if band >= 6 else '#dc3545'
+    ax.barh([0], [band * 10], color=color, height=1)
+    ax.barh([0], [100 - band * 10], left=[band * 10], color='#e9ecef', height=1)
+    ax.set_xlim(0, 100)
+    ax.axis('off')
+    return _figure_png(figure)
+
+
+class _LazyStory:
+    """Lista de flowables que ReportLab consume por el principio y que se rellena bajo demanda.
+
+    `build` solo necesita `len`, acceso por índice y borrar o insertar al principio; los bloques
+    (los flowables de una página del sitio) se generan cuando se agota el anterior, de modo que
+    en memoria solo hay un bloque ya maquetado a medias.
+    """
+
+    def __init__(self, blocks: Iterator[list]):
+        self._blocks = iter(blocks)
+        self._buffer = []
+
+    def _fill(self) -> None:
+        while not self._buffer:
+            block = next(self._blocks, None)
+            if block is None:
+                return
+            self._buffer = list(block)
+
+    def __len__(self):
+        self._fill()
+        return len(self._buffer)
+
+    def __getitem__(self, index):
+        return self._buffer[index]
+
+    def __setitem__(self, index, value):
+        self._buffer[index] = value
+
+    def __delitem__(self, index):
+        del self._buffer[index]
+
+    def insert(self, index, value):
+        self._buffer.insert(index, value)
+
+
+class SiteReportBuilder:
+    """Informe consolidado de una auditoría: resumen, agregados por criterio y una sección por página.
+
+    `add` acepta los registros de `wcag.cli` o los resultados del evaluador (con `url`); `write`
+    genera el PDF en disco y devuelve los tiempos de construcción por página.
+    """
+
+    def __init__(self):
+        self.styles, self.custom_styles = report_styles()
+        self._spool = tempfile.TemporaryFile(mode='w+', encoding='utf-8')
+        self.pages = 0
+        self.errors = 0
+        self.levels = Counter()
+        self.score_bands = Counter()
+        self.score_total = 0
+        # Criterio -> páginas afectadas y ocurrencias, por separado para la plantilla compartida
+        self.criteria_pages = Counter()
+        self.criteria_occurrences = Counter()
+        self.template_criteria = Counter()
+        self.page_seconds: List[float] = []
+
+    def add(self, record: Dict, url: str = None) -> None:
+        url = url or record.get('url') or record.get('source') or f"Página {self.pages + 1}"
+        self.pages += 1
+        if record.get('error'):
+            self.errors += 1
+        else:
+            score = record.get('score', 0)
+            self.score_total += score
+            self.score_bands[min(9, int(score) // 10)] += 1
+            self.levels[record.get('level', 'No determinado')] += 1
+            seen = set()
+            for issue in record.get('issues', []):
+                criteria, count = issue_criteria(str(issue))
+                for criterion in criteria:
+                    self.criteria_occurrences[criterion] += count
+                    seen.add(criterion)
+            self.criteria_pages.update(seen)
+            for issue in record.get('template_issues') or []:
+                criteria, count = issue_criteria(str(issue))
+                for criterion in criteria:
+                    # Un componente compartido cuenta una vez aunque se repita en todas las páginas
+                    self.template_criteria[criterion] = max(self.template_criteria[criterion], count)
+        self._spool.write(json.dumps({
+            'url': url, 'error': record.get('error'), 'score': record.get('score'), 'level': record.get('level'),
+            'summary': record.get('summary'), 'issues': record.get('issues', []),
+            'template_issues': len(record.get('template_issues') or []),
+        }, ensure_ascii=False) + '\n')
+
+    def _records(self) -> Iterator[Dict]:
+        self._spool.seek(0)
+        for line in self._spool:
+            yield json.loads(line)
+
+    def _charts_png(self) -> bytes:
+        from matplotlib.figure import Figure
+
+        figure = Figure(figsize=(9, 3.2))
+        levels_ax, scores_ax = figure.subplots(1, 2)
+        if self.levels:
+            labels, values = zip(*self.levels.most_common())
+            levels_ax.pie(values, labels=labels, autopct='%1.0f%%', startangle=90, wedgeprops=dict(width=0.5))
+        levels_ax.set_title('Nivel WCAG 2.1 por página', fontsize=10)
+        bands = range(10)
+        scores_ax.bar([f"{band * 10}-" for band in bands], [self.score_bands[band] for band in bands],
+                      color=['#dc3545'] * 6 + ['#ffc107'] * 2 + ['#28a745'] * 2)
+        scores_ax.set_title('Distribución de puntuaciones', fontsize=10)
+        scores_ax.tick_params(labelsize=7)
+        return _figure_png(figure)
+
+    def _criteria_chart_png(self) -> bytes:
+        from matplotlib.figure import Figure
+
+        top = self.criteria_pages.most_common(MAX_CRITERIA_IN_CHART)
+        figure = Figure(figsize=(7, 0.3 * len(top) + 0.8))
+        ax = figure.add_subplot()
+        ax.barh([criterion for criterion, _ in reversed(top)], [pages for _, pages in reversed(top)], color='#2c5aa0')
+        ax.set_xlabel('Páginas afectadas', fontsize=8)
+        ax.tick_params(labelsize=8)
+        return _figure_png(figure)
+
+    def _overview(self, title: str) -> list:
+        styles, custom = self.styles, self.custom_styles
+        evaluated = self.pages - self.errors
+        story = [
+            Paragraph(escape(title), custom['Title']),
+            Paragraph(f"<b>Fecha del informe:</b> {datetime.now().strftime('%d/%m/%Y %H:%M')}", styles['Normal']),
+            Paragraph(f"<b>Páginas auditadas:</b> {self.pages} ({self.errors} con error)", styles['Normal']),
+            Paragraph(f"<b>Puntuación media:</b> {self.score_total / evaluated:.1f}/100" if evaluated else
+                      "<b>Puntuación media:</b> —", styles['Normal']),
+            Spacer(1, 12),
+        ]
+        if evaluated:
+            story.append(Image(BytesIO(self._charts_png()), width=17 * cm, height=6 * cm, kind='proportional'))
+        return story
+
+    def _criteria_section(self) -> list:
+        custom = self.custom_styles
+        story = [Paragraph("Agregados por criterio WCAG", custom['Subtitle'])]
+        criteria = set(self.criteria_pages) | set(self.template_criteria)
+        if not criteria:
+            return story + [Paragraph("No se identificaron criterios incumplidos.", self.styles['Normal'])]
+        names = _criteria_names()
+        rows = [['Criterio', 'Nombre', 'Nivel', 'Páginas', 'Ocurrencias', 'En plantilla']]
+        for criterion in sorted(criteria, key=lambda c: (-self.criteria_pages[c], c)):
+            name, level = names.get(criterion, ('—', '—'))
+            rows.append([criterion, Paragraph(escape(name), custom['Cell']), level, self.criteria_pages[criterion],
+                         self.criteria_occurrences[criterion], self.template_criteria[criterion] or ''])
+        table = Table(rows, colWidths=[2 * cm, 7 * cm, 1.4 * cm, 1.8 * cm, 2.2 * cm, 2.2 * cm], repeatRows=1)
+        table.setStyle(_TABLE_STYLE)
+        story.append(table)
+        if self.criteria_pages:
+            story.append(Spacer(1, 10))
+            story.append(Image(BytesIO(self._criteria_chart_png()), width=15 * cm,
+                               height=(0.3 * min(len(self.criteria_pages), MAX_CRITERIA_IN_CHART) + 0.8) * cm * 2,
+                               kind='proportional'))
+        return story
+
+    def _summary_tables(self) -> Iterator[list]:
+        cell = self.custom_styles['Cell']
+        header = ['URL', 'Puntuación', 'Nivel', 'Problemas', 'Plantilla']
+        rows = []
+
+        def table():
+            block = Table([header] + rows, colWidths=[9.5 * cm, 2 * cm, 2.3 * cm, 1.8 * cm, 1.8 * cm], repeatRows=1)
+            block.setStyle(_TABLE_STYLE)
+            return [block]
+
+        yield [CondPageBreak(4 * cm), Paragraph("Resumen por página", self.custom_styles['Subtitle'])]
+        for record in self._records():
+            if record['error']:
+                rows.append([Paragraph(escape(record['url']), cell), '—', 'Error', '—', '—'])
+            else:
+                rows.append([Paragraph(escape(record['url']), cell), record['score'], record['level'] or '—',
+                             len(record['issues']), record['template_issues']])
+            if len(rows) == SUMMARY_ROWS_PER_TABLE:
+                yield table()
+                rows = []
+        if rows:
+            yield table()
+
+    def _page_sections(self) -> Iterator[list]:
+        """Una sección por página; el bloque siguiente se pide cuando ReportLab terminó de maquetar
+        el anterior, así que el tiempo entre dos peticiones es lo que cuesta cada página."""
+        styles, custom = self.styles, self.custom_styles
+        yield [CondPageBreak(6 * cm), Paragraph("Detalle por página", custom['Subtitle'])]
+        started = time.perf_counter()
+        for record in self._records():
+            block = [Paragraph(escape(record['url']), custom['PageHeading'])]
+            if record['error']:
+                block.append(Paragraph(f"Error: {escape(record['error'])}", styles['Normal']))
+                yield block
+                started = self._page_built(started)
+                continue
+            score = record['score'] or 0
+            badge = Image(BytesIO(score_badge_png(min(9, int(score) // 10) + (score >= 100))), width=3 * cm, height=0.6 * cm)
+            block.append(Table([[badge, Paragraph(f"<b>{score}/100</b> · {escape(str(record['level']))}", styles['Normal'])]],
+                               colWidths=[3.4 * cm, None], hAlign='LEFT'))
+            if record['summary']:
+                block.append(Paragraph(escape(record['summary']), styles['Normal']))
+            for issue in record['issues'][:MAX_PAGE_ISSUES]:
+                block.append(Paragraph(f"• {escape(str(issue))}", custom['SmallIssue']))
+            if len(record['issues']) > MAX_PAGE_ISSUES:
+                block.append(Paragraph(f"… y {len(record['issues']) - MAX_PAGE_ISSUES} problemas más", custom['SmallIssue']))
+            if record['template_issues']:
+                block.append(Paragraph(f"Además, {record['template_issues']} problemas de la plantilla compartida "
+                                       "(ver agregados por criterio).", styles['Italic']))
+            yield block
+            started = self._page_built(started)
+
+    def _page_built(self, started: float) -> float:
+        now = time.perf_counter()
+        self.page_seconds.append(now - started)
+        return now
+
+    def write(self, path: str, title: str = "Auditoría de Accesibilidad WCAG 2.1 del Sitio") -> Dict:
+        """Escribir el PDF en `path`; devuelve el total y los milisegundos de construcción por página."""
+        started = time.perf_counter()
+        self.page_seconds = []
+
+        def blocks():
+            yield self._overview(title) + self._criteria_section()
+            yield from self._summary_tables()
+            yield from self._page_sections()
+
+        doc = SimpleDocTemplate(path, pagesize=A4, rightMargin=50, leftMargin=50, topMargin=50, bottomMargin=40,
+                                title=title)
+        with span('pdf', report='site') as build:
+            doc.build(_LazyStory(blocks()))
+            build.add('pages', self.pages)
+        return self.timings(time.perf_counter() - started)
+
+    def timings(self, total_seconds: float) -> Dict:
+        per_page = sorted(self.page_seconds)
+        tenth = max(1, len(self.page_seconds) // 10)
+        return {
+            'pages': self.pages,
+            'total_s': round(total_seconds, 3),
+            'per_page_ms_p50': round(statistics.median(per_page) * 1000, 3) if per_page else None,
+            'per_page_ms_p95': round(per_page[min(len(per_page) - 1, int(len(per_page) * 0.95))] * 1000, 3) if per_page else None,
+            # Si la construcción es lineal, el primer y el último décimo de páginas cuestan lo mismo
+            'first_tenth_ms': round(statistics.mean(self.page_seconds[:tenth]) * 1000, 3) if per_page else None,
+            'last_tenth_ms': round(statistics.mean(self.page_seconds[-tenth:]) * 1000, 3) if per_page else None,
+        }
+
+    def close(self) -> None:
+        self._spool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
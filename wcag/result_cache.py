@@ -0,0 +1,194 @@
+"""Caché de resultados de evaluación direccionada por contenido (memoria LRU + disco)."""
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from functools import lru_cache
+from typing import Dict
+
+CACHE_ROOT = os.getenv('WCAG_CACHE_DIR', '.wcag_cache')
+DEFAULT_CACHE_DIR = os.path.join(CACHE_ROOT, 'results')
+# Listas de hallazgos cuyo orden no cambia el significado del resumen
+UNORDERED_KEYS = ('contrast_issues', 'keyboard_focus', 'semantic_structure')
+
+
+def normalize_features(analysis_data: Dict) -> Dict:
+    """Resumen canónico de `analysis_data`: los hallazgos se reducen a conteos ordenados."""
+    normalized = {}
+    for key, value in analysis_data.items():
+        if key in UNORDERED_KEYS and isinstance(value, list):
+            value = sorted(Counter(value).items())
+        normalized[key] = value
+    return normalized
+
+
+def make_cache_key(analysis_data: Dict, prompt_version: str, model: str) -> str:
+    payload = json.dumps(
+        {'features': normalize_features(analysis_data), 'prompt_version': prompt_version, 'model': model},
+        sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def hash_content(text: str) -> str:
+    """Hash del documento tal como se descargó; identifica páginas idénticas sin analizarlas."""
+    return hashlib.sha256(text.encode('utf-8', errors='surrogatepass')).hexdigest()
+
+
+def make_content_key(content_hash: str, prompt_version: str, model: str) -> str:
+    payload = f"content:{content_hash}:{prompt_version}:{model}"
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """Caché de dos niveles con LRU en memoria y archivos JSON en disco con TTL y límite de tamaño.
+
+    El lock solo protege la LRU y los contadores; la lectura, escritura y desalojo en disco se
+    hacen fuera (cada archivo se sustituye de forma atómica). Los aciertos y fallos se cuentan
+    por `kind`: los resultados y el estado incremental de regiones no se mezclan en las métricas.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, memory_entries: int = 256,
+                 ttl_seconds: float = 7 * 24 * 3600, max_disk_bytes: int = 64 * 1024 * 1024):
+        self.directory = directory
+        self.memory_entries = memory_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = Counter()
+        self._disk_bytes = None
+        self._evicting = False
+
+    def get(self, key: str, kind: str = 'results') -> Dict | None:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if time.time() - entry[0] <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self._counters[kind, 'memory_hits'] += 1
+                else:
+                    del self._memory[key]
+                    entry = None
+        if entry is not None:
+            # Las entradas no se modifican nunca: se copian fuera del lock
+            return copy.deepcopy(entry[1])
+
+        entry = self._read_disk(key)
+        with self._lock:
+            if entry is None:
+                self._counters[kind, 'misses'] += 1
+                return None
+            self._remember(key, entry)
+            self._counters[kind, 'disk_hits'] += 1
+        return copy.deepcopy(entry[1])
+
+    def set(self, key: str, result: Dict, kind: str = 'results') -> None:
+        entry = (time.time(), copy.deepcopy(result))
+        with self._lock:
+            self._remember(key, entry)
+            self._counters[kind, 'writes'] += 1
+        self._write_disk(key, entry)
+
+    def stats(self, kind: str = 'results') -> Dict:
+        with self._lock:
+            hits = self._counters[kind, 'memory_hits'] + self._counters[kind, 'disk_hits']
+            lookups = hits + self._counters[kind, 'misses']
+            return {
+                **{name: self._counters[kind, name] for name in ('memory_hits', 'disk_hits', 'misses', 'writes')},
+                'evictions': self._counters['evictions'],
+                'hit_rate': hits / lookups if lookups else 0.0,
+                'memory_entries': len(self._memory),
+                'disk_bytes': self._disk_bytes or 0,
+            }
+
+    def _remember(self, key: str, entry) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _read_disk(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, encoding='utf-8') as handle:
+                payload = json.load(handle)
+        except (OSError, ValueError):
+            return None
+        if time.time() - payload.get('stored_at', 0) > self.ttl_seconds:
+            self._remove(path)
+            return None
+        # La fecha de acceso marca la antigüedad para el desalojo por tamaño
+        try:
+            os.utime(path)
+        except OSError:
+            pass  # Desalojado por otro proceso tras la lectura: el resultado leído sigue valiendo
+        return payload['stored_at'], payload['result']
+
+    def _write_disk(self, key: str, entry) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        previous = os.path.getsize(path) if os.path.exists(path) else 0
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as handle:
+            json.dump({'stored_at': entry[0], 'result': entry[1]}, handle, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        size = os.path.getsize(path)
+        scanned = self._scan_disk_bytes() if self._disk_bytes is None else None
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = scanned
+            else:
+                self._disk_bytes += size - previous
+            # Un solo hilo desaloja a la vez; los demás siguen escribiendo
+            evict = self._disk_bytes > self.max_disk_bytes and not self._evicting
+            if evict:
+                self._evicting = True
+        if evict:
+            try:
+                self._evict_disk()
+            finally:
+                with self._lock:
+                    self._evicting = False
+
+    def _scan_disk_bytes(self) -> int:
+        with os.scandir(self.directory) as entries:
+            return sum(entry.stat().st_size for entry in entries if entry.name.endswith('.json'))
+
+    def _evict_disk(self) -> None:
+        with os.scandir(self.directory) as entries:
+            files = sorted(
+                ((entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in entries if entry.name.endswith('.json')),
+            )
+        now = time.time()
+        total = sum(size for _, size, _ in files)
+        for mtime, size, path in files:
+            expired = now - mtime > self.ttl_seconds
+            if not expired and total <= self.max_disk_bytes * 0.9:
+                break
+            self._remove(path)
+            total -= size
+
+    def _remove(self, path: str) -> None:
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        # Se descuenta lo borrado en lugar de fijar un total: otros hilos pueden estar escribiendo
+        with self._lock:
+            self._counters['evictions'] += 1
+            if self._disk_bytes is not None:
+                self._disk_bytes -= size
+
+
+@lru_cache(maxsize=None)
+def get_result_cache() -> ResultCache:
+    """Instancia compartida por proceso; el directorio base se configura con WCAG_CACHE_DIR."""
+    return ResultCache()
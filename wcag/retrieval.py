@@ -0,0 +1,102 @@
+"""Índice vectorial en memoria de criterios WCAG 2.1 con búsqueda top-k por lotes."""
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from wcag.knowledge import DEFAULT_EMBEDDINGS_DIR, EMBEDDING_MODEL, Criterion, load_or_build_embeddings, parse_criteria
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+class CriterionIndex:
+    """Un registro por criterio; todas las consultas se resuelven con un único producto matricial."""
+
+    def __init__(self, criteria: Sequence[Criterion], vectors):
+        self.criteria = list(criteria)
+        self._matrix = _normalize_rows(np.asarray(vectors, dtype=np.float32))
+        self._levels = np.array([criterion.level for criterion in self.criteria])
+
+    @classmethod
+    def from_embeddings(cls, embed_documents, model: str = EMBEDDING_MODEL,
+                        directory: str = DEFAULT_EMBEDDINGS_DIR) -> 'CriterionIndex':
+        criteria = parse_criteria()
+        vectors = load_or_build_embeddings(embed_documents, [c.text for c in criteria], model, directory)
+        return cls(criteria, vectors)
+
+    def search(self, query_vectors, k: int = 3, levels: Sequence[str] = None) -> List[List[Tuple[Criterion, float]]]:
+        """Top-k por similitud coseno para cada fila de `query_vectors`."""
+        queries = _normalize_rows(np.atleast_2d(np.asarray(query_vectors, dtype=np.float32)))
+        scores = queries @ self._matrix.T
+        if levels is not None:
+            scores[:, ~np.isin(self._levels, list(levels))] = -np.inf
+        k = min(k, scores.shape[1])
+        if k <= 0 or not len(queries):
+            return [[] for _ in range(len(queries))]
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        return [
+            [(self.criteria[i], float(score)) for i, score in zip(row, row_scores) if np.isfinite(score)]
+            for row, row_scores in zip(top, top_scores)
+        ]
+
+    def related_criteria(self, query_vectors, k: int = 3, min_score: float = 0.0) -> List[Tuple[Criterion, float]]:
+        """Unión de los top-k de todas las consultas, conservando la mejor puntuación de cada criterio."""
+        best: Dict[str, Tuple[Criterion, float]] = {}
+        for results in self.search(query_vectors, k):
+            for criterion, score in results:
+                if score >= min_score and (criterion.id not in best or score > best[criterion.id][1]):
+                    best[criterion.id] = (criterion, score)
+        return sorted(best.values(), key=lambda item: -item[1])
+
+
+class QueryEmbedder:
+    """Embeddings de consultas con caché LRU; las consultas nuevas se envían en una sola llamada."""
+
+    def __init__(self, embed_documents, max_entries: int = 2048):
+        self._embed_documents = embed_documents
+        self._max_entries = max_entries
+        self._vectors = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(self, queries: Sequence[str]) -> np.ndarray:
+        unique = list(dict.fromkeys(queries))
+        with self._lock:
+            found = {query: self._vectors[query] for query in unique if query in self._vectors}
+        missing = [query for query in unique if query not in found]
+        if missing:
+            vectors = self._embed_documents(missing)
+            found.update((query, np.asarray(vector, dtype=np.float32)) for query, vector in zip(missing, vectors))
+        with self._lock:
+            for query, vector in found.items():
+                self._vectors[query] = vector
+                self._vectors.move_to_end(query)
+            while len(self._vectors) > self._max_entries:
+                self._vectors.popitem(last=False)
+        return np.stack([found[query] for query in queries])
+
+
+def issue_queries(analysis_data: Dict) -> List[str]:
+    """Consultas de búsqueda a partir de los problemas detectados en `analysis_data`."""
+    queries = []
+    if analysis_data['images'] > analysis_data['images_with_alt']:
+        queries.append("Imágenes sin texto alternativo")
+    if not analysis_data['lang_attr']:
+        queries.append("Falta el idioma de la página en el elemento html")
+    if not analysis_data['title']:
+        queries.append("Página sin título descriptivo")
+    if analysis_data['inputs'] > analysis_data['labels']:
+        queries.append("Campos de formulario sin etiqueta asociada")
+    if analysis_data['links'] and not analysis_data['skip_links']:
+        queries.append("Sin enlaces para saltar bloques de contenido repetido")
+    for key in ('contrast_issues', 'keyboard_focus', 'semantic_structure'):
+        queries.extend(analysis_data[key])
+    # Los mensajes repetidos producen la misma consulta: se conserva el orden de aparición
+    return list(dict.fromkeys(queries))
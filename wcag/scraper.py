@@ -0,0 +1,208 @@
+"""Obtención de páginas con requests, Selenium o Playwright según lo que funcionó antes por dominio."""
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+from wcag.browser_pool import get_playwright_pool, get_selenium_pool
+from wcag.crawler import AsyncCrawler
+from wcag.fetch_strategy import DomainStrategyStore, get_strategy_store
+from wcag.html_features import STREAM_CHUNK_SIZE
+from wcag.http_cache import HttpPageCache, get_http_cache
+from wcag.notify import log_notify
+from wcag.rate_limit import HostRateLimiter, HostThrottled, get_rate_limiter, parse_retry_after
+from wcag.rendered import fetch_rendered
+from wcag.tracing import ENABLED as TRACING, count, span
+
+
+class RobustWebScraper:
+    TIER_LABELS = {'requests': 'requests', 'selenium': 'Selenium', 'playwright': 'Playwright'}
+
+    # Espera máxima aceptable dentro del hilo que atiende la petición antes de desistir
+    MAX_INLINE_WAIT = 5.0
+
+    def __init__(self, strategy: DomainStrategyStore = None, rate_limiter: HostRateLimiter = None,
+                 page_cache: HttpPageCache = None, render_styles: bool = False, notify=log_notify):
+        self.session = requests.Session()
+        self.notify = notify
+        self.strategy = strategy or get_strategy_store()
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.page_cache = page_cache or get_http_cache()
+        # Hash del último cuerpo obtenido con requests; permite reutilizar la evaluación sin analizar
+        self.last_content_hash = None
+        # Con `render_styles` se usa Playwright primero y se guardan los estilos calculados
+        self.render_styles = render_styles
+        self.last_rendered = None
+        self.setup_session()
+
+    def setup_session(self):
+        from fake_useragent import UserAgent
+        ua = UserAgent()
+        self.session.headers.update({
+            'User-Agent': ua.random,
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+            'Accept-Language': 'es-ES,es;q=0.8,en-US;q=0.5,en;q=0.3',
+            'Accept-Encoding': 'gzip, deflate',
+            'DNT': '1',
+            'Connection': 'keep-alive',
+            'Upgrade-Insecure-Requests': '1',
+            'Sec-Fetch-Dest': 'document',
+            'Sec-Fetch-Mode': 'navigate',
+            'Sec-Fetch-Site': 'none',
+            'Cache-Control': 'max-age=0',
+        })
+
+    def _wait_for_slot(self, host: str) -> None:
+        """Esperas cortas en línea; si el host está bloqueado más tiempo se desiste sin congelar la sesión"""
+        wait = self.rate_limiter.try_acquire(host)
+        while wait > 0:
+            if wait > self.MAX_INLINE_WAIT:
+                raise HostThrottled(host, wait)
+            time.sleep(wait)
+            wait = self.rate_limiter.try_acquire(host)
+
+    def get_with_retries(self, url: str, max_retries: int = 3) -> str | None:
+        host = urlsplit(url).netloc
+        cached = self.page_cache.lookup(url)
+        for attempt in range(max_retries):
+            if attempt:
+                count('http_retries')
+            try:
+                self._wait_for_slot(host)
+                response = self.session.get(url, timeout=30, headers=self.page_cache.conditional_headers(cached))
+                count('http_responses', status=response.status_code)
+                if response.status_code == 304 and cached is not None:
+                    content = self.page_cache.load_body(cached)
+                    if content is not None:
+                        self.rate_limiter.on_success(host)
+                        self.last_content_hash = cached.content_hash
+                        self.notify('info', "♻️ La página no cambió desde la última descarga (HTTP 304); se usa la copia en caché")
+                        return content
+                    # Copia local ilegible: se repite la petición sin cabeceras condicionales
+                    cached = None
+                    continue
+                if response.status_code == 200:
+                    self.rate_limiter.on_success(host)
+                    stored = self.page_cache.store(
+                        url, response.text, response.headers.get('ETag'), response.headers.get('Last-Modified')
+                    )
+                    self.last_content_hash = stored.content_hash if stored else None
+                    return response.text
+                elif response.status_code == 429:
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                    wait_time = self.rate_limiter.backoff(host, retry_after)
+                    self.notify('warning', f"Rate limit detectado en {host}. Reintento programado en {wait_time:.0f} segundos")
+                    continue
+                elif response.status_code == 403:
+                    from fake_useragent import UserAgent
+                    ua = UserAgent()
+                    self.session.headers['User-Agent'] = ua.random
+                    # Otro User-Agent, pero sin reintentar de inmediato
+                    self.rate_limiter.backoff(host)
+                    continue
+                else:
+                    # 5xx y demás: no se insiste sobre un servidor con problemas sin esperar
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                    wait_time = self.rate_limiter.backoff(host, retry_after)
+                    self.notify('warning', f"HTTP {response.status_code} en {host}. Reintento programado en {wait_time:.0f} segundos")
+                    continue
+            except HostThrottled:
+                raise
+            except Exception as e:
+                self.rate_limiter.backoff(host)
+                self.notify('warning', f"Intento {attempt + 1} falló: {str(e)}")
+        return None
+
+    def scrape_with_selenium(self, url: str) -> str | None:
+        try:
+            # Los drivers se toman de un pool compartido y se reciclan tras N páginas
+            return get_selenium_pool().fetch(url)
+        except Exception as e:
+            self.notify('error', f"Error con Selenium: {str(e)}")
+            return None
+
+    def scrape_with_playwright(self, url: str) -> str | None:
+        try:
+            # Cada petición usa un contexto nuevo sobre un navegador persistente del pool
+            if self.render_styles:
+                html, self.last_rendered = fetch_rendered(get_playwright_pool(), url)
+                return html
+            return get_playwright_pool().fetch(url)
+        except Exception as e:
+            self.notify('error', f"Error con Playwright: {str(e)}")
+            return None
+
+    def _fetch_tier(self, tier: str, url: str) -> str | None:
+        if tier == 'selenium':
+            return self.scrape_with_selenium(url)
+        if tier == 'playwright':
+            return self.scrape_with_playwright(url)
+        return self.get_with_retries(url)
+
+    def scrape_website(self, url: str) -> str | None:
+        self.notify('info', "🔍 Iniciando scraping del sitio web...")
+        self.last_content_hash = None
+        self.last_rendered = None
+        domain = urlsplit(url).netloc
+        # El orden de los niveles depende de cuál funcionó antes para este dominio
+        plan = self.strategy.plan(domain)
+        if self.render_styles:
+            plan = ['playwright'] + [tier for tier in plan if tier != 'playwright']
+        for tier in plan:
+            label = self.TIER_LABELS[tier]
+            if tier != 'requests':
+                self.notify('info', f"🔄 Intentando con {label}...")
+            started = time.perf_counter()
+            with span('fetch', tier=tier) as fetch:
+                try:
+                    content = self._fetch_tier(tier, url)
+                except HostThrottled as e:
+                    fetch.label(outcome='throttled')
+                    self.notify('warning', f"⏳ {e.host} está limitando las peticiones. Vuelve a intentarlo en {e.wait:.0f} segundos")
+                    return None
+                usable = bool(content) and len(content) > 1000
+                fetch.label(outcome='ok' if usable else 'failed')
+                if content and TRACING:
+                    fetch.add('bytes', len(content.encode('utf-8', 'replace')))
+            self.strategy.record(domain, tier, usable, time.perf_counter() - started)
+            if usable:
+                count('fetch_tier_won', tier=tier)
+                if tier != 'requests':
+                    self.last_content_hash = None
+                self.notify('success', f"✅ Contenido obtenido con {label}")
+                return content
+
+        self.notify('error', "❌ No se pudo obtener el contenido del sitio web")
+        return None
+
+    def stream_website(self, url: str, chunk_size: int = STREAM_CHUNK_SIZE):
+        """Descargar la página por fragmentos sin retener el documento completo en memoria"""
+        try:
+            self._wait_for_slot(urlsplit(url).netloc)
+            response = self.session.get(url, timeout=30, stream=True)
+        except Exception as e:
+            self.notify('warning', f"Descarga por streaming falló: {str(e)}")
+            return None
+        if response.status_code != 200:
+            response.close()
+            return None
+        return self._iter_response(response, chunk_size)
+
+    @staticmethod
+    def _iter_response(response, chunk_size: int):
+        with response:
+            # Con codificación conocida se entregan cadenas; si no, bytes que el parser decodifica
+            yield from response.iter_content(chunk_size=chunk_size, decode_unicode=True)
+
+    def crawl(self, urls=(), sitemap: str = None, start_url: str = None, max_depth: int = 0,
+              max_pages: int = 500, max_concurrency: int = 16, per_host_concurrency: int = 4):
+        """Rastreo asíncrono de varias páginas; devuelve un iterador asíncrono de CrawlResult"""
+        crawler = AsyncCrawler(
+            max_concurrency=max_concurrency,
+            per_host_concurrency=per_host_concurrency,
+            max_pages=max_pages,
+            headers=dict(self.session.headers),
+            rate_limiter=self.rate_limiter,
+            page_cache=self.page_cache
+        )
+        return crawler.crawl(urls, sitemap=sitemap, start_url=start_url, max_depth=max_depth)
@@ -0,0 +1,127 @@
+"""Componentes de plantilla compartidos entre las páginas de una auditoría de sitio.
+
+Cabecera, navegación, pie y banner de cookies se repiten en casi todas las páginas de un
+sitio. `SiteTemplates` reutiliza las regiones de wcag.incremental con un registro común a
+toda la auditoría: una región cuyo hash ya apareció en otra página es un componente de
+plantilla; sus reglas se evalúan una sola vez y sus incumplimientos se atribuyen a cada página
+que la contiene, pero fuera de los datos de la página (`template_findings`). Así el modelo solo
+recibe el detalle de lo específico de cada página y el informe agrupa los problemas en
+"plantilla" y "específicos de la página".
+
+La primera página que contiene un componente aún no sabe que se repite; `summary()` vuelve a
+clasificar todas las regiones al terminar la auditoría, con el conteo definitivo de páginas.
+"""
+import threading
+from collections import defaultdict
+from typing import Dict, List, NamedTuple
+
+from wcag.html_features import AccessibilityFeatureCollector, extract_analysis_data
+from wcag.incremental import Region, page_regions
+from wcag.wcag_rules import RULES, RuleEngine
+
+# Páginas en las que debe aparecer una región para considerarla de plantilla
+MIN_TEMPLATE_PAGES = 2
+# Datos que describen la página entera aunque provengan de un componente compartido
+PAGE_LEVEL_FIELDS = ('skip_links', 'semantic_structure')
+
+
+class TemplateRun(NamedTuple):
+    analysis_data: Dict
+    # Hash de región -> estado, para la caché incremental por URL
+    regions: Dict[str, Dict]
+    reused: int
+    total: int
+    template_regions: int
+
+
+def _is_page_level(finding: Dict) -> bool:
+    rule_class = RULES.get(finding['rule'])
+    return rule_class is not None and rule_class.page_level
+
+
+def _page_data(regions: List[Region], shared: set) -> Dict:
+    """`analysis_data` de lo específico de la página, con los componentes de `shared` aparte."""
+    full = AccessibilityFeatureCollector.merged([region.state for region in regions]).result()
+    own = [region.state for region in regions if region.key not in shared]
+    template = [region.state for region in regions if region.key in shared]
+    data = AccessibilityFeatureCollector.merged(own).result()
+    for field in PAGE_LEVEL_FIELDS:
+        data[field] = full[field]
+    data['rule_findings'] = ([finding for finding in data['rule_findings'] if not _is_page_level(finding)]
+                             + [finding for finding in full['rule_findings'] if _is_page_level(finding)])
+    template_findings = AccessibilityFeatureCollector.merged(template).result()['rule_findings'] if template else []
+    data['template_findings'] = [finding for finding in template_findings if not _is_page_level(finding)]
+    return data
+
+
+class SiteTemplates:
+    """Registro de regiones de una auditoría; seguro entre los hilos que analizan páginas a la vez."""
+
+    def __init__(self, min_pages: int = MIN_TEMPLATE_PAGES):
+        self.min_pages = min_pages
+        self._lock = threading.Lock()
+        self._states: Dict[str, Dict] = {}
+        self._pages: Dict[str, set] = defaultdict(set)
+        self._page_regions: Dict[str, List[Region]] = {}
+
+    def extract(self, html_content: str, page_url: str, previous: Dict = None) -> TemplateRun:
+        """`analysis_data` de la página con los componentes ya vistos en otras páginas aparte.
+
+        Las regiones se buscan primero en el registro de la auditoría y después en `previous`
+        (estados de la auditoría anterior de esta URL)."""
+        with self._lock:
+            known = dict(previous or {})
+            known.update(self._states)
+        split = page_regions(html_content, known)
+        if split is None:
+            data = extract_analysis_data(html_content, rules=RuleEngine())
+            data['template_findings'] = []
+            return TemplateRun(data, {}, 0, 1, 0)
+        regions, reused = split
+        with self._lock:
+            shared = {region.key for region in regions
+                      if region.shareable and len(self._pages[region.key] - {page_url}) >= self.min_pages - 1}
+            for region in regions:
+                self._states.setdefault(region.key, region.state)
+                if region.shareable:
+                    self._pages[region.key].add(page_url)
+            self._page_regions[page_url] = regions
+        return TemplateRun(_page_data(regions, shared), {region.key: region.state for region in regions},
+                           reused, len(regions), len(shared))
+
+    def template_keys(self) -> set:
+        with self._lock:
+            return {key for key, pages in self._pages.items() if len(pages) >= self.min_pages}
+
+    def summary(self) -> Dict:
+        """Clasificación definitiva al terminar la auditoría.
+
+        Cada componente de plantilla se cuenta una vez aunque aparezca en muchas páginas; los
+        incumplimientos específicos se dan por página."""
+        shared = self.template_keys()
+        with self._lock:
+            page_regions_by_url = dict(self._page_regions)
+            pages_by_key = {key: len(self._pages[key]) for key in shared}
+            states = {key: self._states[key] for key in shared}
+
+        template_findings = {}
+        for key, state in states.items():
+            for finding in AccessibilityFeatureCollector.merged([state]).result()['rule_findings']:
+                if _is_page_level(finding):
+                    continue
+                grouped = template_findings.setdefault(finding['rule'], {**finding, 'count': 0, 'components': 0, 'pages': 0})
+                grouped['count'] += finding['count']
+                grouped['components'] += 1
+                grouped['pages'] = max(grouped['pages'], pages_by_key[key])
+
+        page_findings = {
+            url: _page_data(regions, shared)['rule_findings'] for url, regions in page_regions_by_url.items()
+        }
+        return {
+            'pages': len(page_regions_by_url),
+            'components': len(shared),
+            'template_findings': sorted(template_findings.values(), key=lambda finding: -finding['count']),
+            'page_findings': page_findings,
+            'template_regions': {url: sum(1 for region in regions if region.key in shared)
+                                 for url, regions in page_regions_by_url.items()},
+        }
@@ -0,0 +1,235 @@
+"""Medición ligera por etapas (spans) y exportación en formato de texto de Prometheus.
+
+Cada etapa (descarga por nivel, parseo, reglas, recuperación de criterios, modelo, PDF) se
+envuelve en `span(nombre, **etiquetas)`. Al cerrarse, el span suma su duración a los totales
+del proceso (`registry`) y, si hay una traza activa (`collect()`), la añade al desglose de esa
+evaluación. Los spans rodean etapas, nunca elementos del DOM, así que el coste es de unos
+microsegundos por evaluación; con WCAG_TRACING=0 `span` devuelve un objeto inerte compartido.
+
+El tiempo por regla requiere envolver cada evento del recorrido y es caro: solo se mide con
+WCAG_TRACE_RULES=1.
+
+Los totales se sirven en texto de Prometheus desde la API (`/metrics/prometheus`) o, en la
+aplicación de Streamlit, desde un servidor propio si se define WCAG_METRICS_PORT.
+"""
+import contextvars
+import os
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, List
+
+ENABLED = os.getenv('WCAG_TRACING', '1') != '0'
+RULE_TIMING = ENABLED and os.getenv('WCAG_TRACE_RULES', '0') == '1'
+METRICS_PREFIX = 'wcag'
+
+
+class MetricsRegistry:
+    """Totales del proceso: duración y llamadas por etapa y contadores con etiquetas."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = defaultdict(lambda: [0, 0.0])
+        self._counters = defaultdict(float)
+
+    def observe(self, stage: str, labels: tuple, seconds: float) -> None:
+        with self._lock:
+            totals = self._stages[(stage, labels)]
+            totals[0] += 1
+            totals[1] += seconds
+
+    def inc(self, name: str, labels: tuple, value: float = 1) -> None:
+        with self._lock:
+            self._counters[(name, labels)] += value
+
+    def prometheus_text(self, gauges: Dict[str, float] = None) -> str:
+        """Exposición en texto de Prometheus; `gauges` añade valores instantáneos (p. ej. la cola)."""
+        with self._lock:
+            stages = {key: list(value) for key, value in self._stages.items()}
+            counters = dict(self._counters)
+        lines = [
+            f"# HELP {METRICS_PREFIX}_stage_seconds_total Tiempo acumulado por etapa",
+            f"# TYPE {METRICS_PREFIX}_stage_seconds_total counter",
+        ]
+        lines += [f"{METRICS_PREFIX}_stage_seconds_total{_labels(stage=stage, **dict(labels))} {total:.6f}"
+                  for (stage, labels), (_, total) in sorted(stages.items())]
+        lines += [
+            f"# HELP {METRICS_PREFIX}_stage_calls_total Ejecuciones de cada etapa",
+            f"# TYPE {METRICS_PREFIX}_stage_calls_total counter",
+        ]
+        lines += [f"{METRICS_PREFIX}_stage_calls_total{_labels(stage=stage, **dict(labels))} {calls}"
+                  for (stage, labels), (calls, _) in sorted(stages.items())]
+        for name in sorted({name for name, _ in counters}):
+            lines.append(f"# TYPE {METRICS_PREFIX}_{name}_total counter")
+            lines += [f"{METRICS_PREFIX}_{name}_total{_labels(**dict(labels))} {_number(value)}"
+                      for (counter, labels), value in sorted(counters.items()) if counter == name]
+        for name, value in sorted((gauges or {}).items()):
+            if value is None:
+                continue
+            lines.append(f"# TYPE {METRICS_PREFIX}_{name} gauge")
+            lines.append(f"{METRICS_PREFIX}_{name} {_number(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(**labels) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in sorted(labels.items())) + '}'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else f"{value:.6f}"
+
+
+registry = MetricsRegistry()
+
+
+class Trace:
+    """Spans de una evaluación, en orden de cierre."""
+
+    def __init__(self):
+        self.spans: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def add(self, record: Dict) -> None:
+        # Las etapas de una evaluación pueden cerrarse en hilos distintos (asyncio.to_thread)
+        with self._lock:
+            self.spans.append(record)
+
+    def breakdown(self) -> List[Dict]:
+        """Totales por etapa y etiquetas, en el orden en que aparecieron."""
+        totals = {}
+        with self._lock:
+            spans = list(self.spans)
+        for record in spans:
+            key = (record['stage'], tuple(sorted(record['labels'].items())))
+            entry = totals.get(key)
+            if entry is None:
+                entry = totals[key] = {'stage': record['stage'], **record['labels'], 'calls': 0, 'seconds': 0.0}
+            entry['calls'] += 1
+            entry['seconds'] += record['seconds']
+            for name, value in record['counts'].items():
+                entry[name] = entry.get(name, 0) + value
+        for entry in totals.values():
+            entry['seconds'] = round(entry['seconds'], 4)
+        return list(totals.values())
+
+
+_current_trace = contextvars.ContextVar('wcag_trace', default=None)
+
+
+class collect:
+    """`with collect() as trace:` reúne los spans que se cierran dentro, también en hilos lanzados con
+    asyncio.to_thread (copian el contexto)."""
+
+    def __enter__(self) -> Trace:
+        self.trace = Trace()
+        self._token = _current_trace.set(self.trace)
+        return self.trace
+
+    def __exit__(self, *exc):
+        _current_trace.reset(self._token)
+
+
+class _Span:
+    __slots__ = ('stage', 'labels', 'counts', '_started')
+
+    def __init__(self, stage: str, labels: Dict):
+        self.stage = stage
+        self.labels = labels
+        self.counts = {}
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self._started
+        if exc_type is not None:
+            self.labels['outcome'] = 'error'
+        labels = tuple(sorted(self.labels.items()))
+        registry.observe(self.stage, labels, seconds)
+        for name, value in self.counts.items():
+            registry.inc(name, (('stage', self.stage),) + labels, value)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add({'stage': self.stage, 'labels': dict(self.labels), 'seconds': seconds, 'counts': self.counts})
+
+    def label(self, **labels) -> None:
+        """Etiquetas conocidas al terminar la etapa (p. ej. el resultado); deben tener pocos valores."""
+        self.labels.update(labels)
+
+    def add(self, name: str, value: float) -> None:
+        """Cantidad asociada a la etapa (bytes, reintentos); se acumula en `<nombre>_total`."""
+        self.counts[name] = self.counts.get(name, 0) + value
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def label(self, **labels) -> None:
+        pass
+
+    def add(self, name: str, value: float) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+def span(stage: str, **labels):
+    return _Span(stage, labels) if ENABLED else _NOOP
+
+
+def count(name: str, value: float = 1, **labels) -> None:
+    """Contador suelto, fuera de un span (p. ej. qué nivel de descarga ganó)."""
+    if ENABLED:
+        registry.inc(name, tuple(sorted(labels.items())), value)
+
+
+def record(stage: str, seconds: float, **labels) -> None:
+    """Duración medida por otro medio (p. ej. el tiempo por regla) como si fuera un span."""
+    if not ENABLED:
+        return
+    registry.observe(stage, tuple(sorted(labels.items())), seconds)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add({'stage': stage, 'labels': labels, 'seconds': seconds, 'counts': {}})
+
+
+def metrics_wsgi_app(environ, start_response):
+    body = registry.prometheus_text().encode('utf-8')
+    start_response('200 OK', [('Content-Type', 'text/plain; version=0.0.4; charset=utf-8'),
+                              ('Content-Length', str(len(body)))])
+    return [body]
+
+
+@lru_cache(maxsize=None)
+def serve_metrics(port: int, host: str = '127.0.0.1'):
+    """Servidor local en un hilo que expone los totales; uno por proceso y puerto."""
+    from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+    server = make_server(host, port, metrics_wsgi_app, handler_class=QuietHandler)
+    threading.Thread(target=server.serve_forever, name='wcag-metrics', daemon=True).start()
+    return server
+
+
+def serve_metrics_from_env():
+    """Arrancar el servidor de métricas si WCAG_METRICS_PORT está definido."""
+    port = os.getenv('WCAG_METRICS_PORT')
+    return serve_metrics(int(port)) if port else None
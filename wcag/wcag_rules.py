@@ -0,0 +1,644 @@
+"""Motor de reglas locales, cada una asociada a criterios de conformidad WCAG 2.1.
+
+Las reglas se registran con `@register_rule` y reciben los eventos del mismo recorrido del
+DOM que construye `analysis_data` (inicio de etiqueta, fin de etiqueta y texto). `RuleEngine`
+solo entrega a cada regla las etiquetas que declara en `tags`, de modo que añadir reglas no
+multiplica el coste por elemento. `evaluate_offline` produce un veredicto sin red a partir de
+los incumplimientos.
+
+Cada regla puede resumir lo visto en una parte del documento con `state()` (valores JSON) y
+combinar los estados de varias partes con `merge()`; así se reutilizan las regiones que no
+cambiaron entre dos auditorías de la misma página (wcag.incremental).
+"""
+import re
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, NamedTuple
+
+from wcag.contrast import AA_NORMAL, ContrastAnalyzer, ContrastReport
+from wcag.html_features import HEADING_TAGS, INTERACTIVE_TAGS
+from wcag.tracing import RULE_TIMING, record
+
+RULES: Dict[str, type] = {}
+# Puntos que resta una regla incumplida según el nivel del criterio
+LEVEL_WEIGHTS = {'A': 12, 'AA': 7, 'AAA': 3}
+
+
+class Finding(NamedTuple):
+    rule: str
+    criteria: str
+    level: str
+    title: str
+    count: int
+    recommendation: str
+
+
+def register_rule(rule_class: type) -> type:
+    if rule_class.id in RULES:
+        raise ValueError(f"Regla duplicada: {rule_class.id}")
+    RULES[rule_class.id] = rule_class
+    return rule_class
+
+
+class Rule:
+    id = ''
+    criteria = ()
+    level = 'A'
+    title = ''
+    recommendation = ''
+    # Etiquetas cuyos eventos recibe la regla; None = todas
+    tags = None
+    # Si necesita el texto del documento (nombres accesibles, títulos)
+    wants_text = False
+    # Se cumple o no para la página entera; no se atribuye a un componente compartido (wcag.templates)
+    page_level = False
+
+    def __init__(self):
+        self.count = 0
+
+    def start(self, tag: str, attrs) -> None:
+        pass
+
+    def end(self, tag: str) -> None:
+        pass
+
+    def data(self, text: str) -> None:
+        pass
+
+    def finish(self) -> int:
+        """Número de incumplimientos al terminar el documento."""
+        return self.count
+
+    def state(self):
+        """Resumen serializable de lo visto; por defecto, los incumplimientos de la región."""
+        return self.finish()
+
+    @classmethod
+    def merge(cls, states) -> 'Rule':
+        """Regla con el resultado combinado de los estados de varias regiones, en orden."""
+        rule = cls()
+        rule.count = sum(states)
+        return rule
+
+    def results(self) -> List[Finding]:
+        """Incumplimientos de la regla; las reglas que cubren varios criterios lo redefinen."""
+        count = self.finish()
+        if not count:
+            return []
+        return [Finding(self.id, '/'.join(self.criteria), self.level, self.title, count, self.recommendation)]
+
+
+def _has_text(attrs, name: str) -> bool:
+    value = attrs.get(name)
+    return bool(value and value.strip())
+
+
+def _has_accessible_label(attrs) -> bool:
+    return _has_text(attrs, 'aria-label') or _has_text(attrs, 'aria-labelledby') or _has_text(attrs, 'title')
+
+
+@register_rule
+class ImageAltRule(Rule):
+    id = 'image-alt'
+    criteria = ('1.1.1',)
+    title = "Imágenes sin texto alternativo"
+    recommendation = "Agregar atributos alt descriptivos (o alt=\"\" si la imagen es decorativa)"
+    tags = frozenset({'img', 'area', 'input'})
+
+    def start(self, tag, attrs):
+        if tag == 'input' and (attrs.get('type') or '').lower() != 'image':
+            return
+        if 'alt' not in attrs and attrs.get('role') not in ('presentation', 'none') and not _has_accessible_label(attrs):
+            self.count += 1
+
+
+@register_rule
+class UnlabeledControlRule(Rule):
+    id = 'unlabeled-control'
+    criteria = ('1.3.1', '4.1.2')
+    title = "Campos de formulario sin etiqueta"
+    recommendation = "Asociar cada campo a un <label for> o darle aria-label / aria-labelledby"
+    tags = frozenset({'input', 'select', 'textarea', 'label'})
+    UNLABELED_TYPES = frozenset({'hidden', 'submit', 'button', 'reset', 'image'})
+
+    def __init__(self):
+        super().__init__()
+        self._label_depth = 0
+        self._label_targets = set()
+        # Los <label for> pueden aparecer después del campo: se resuelven al final
+        self._pending_ids = []
+
+    def start(self, tag, attrs):
+        if tag == 'label':
+            self._label_depth += 1
+            if attrs.get('for'):
+                self._label_targets.add(attrs.get('for'))
+            return
+        if tag == 'input' and (attrs.get('type') or 'text').lower() in self.UNLABELED_TYPES:
+            return
+        if self._label_depth or _has_accessible_label(attrs):
+            return
+        if attrs.get('id'):
+            self._pending_ids.append(attrs.get('id'))
+        else:
+            self.count += 1
+
+    def end(self, tag):
+        if tag == 'label' and self._label_depth:
+            self._label_depth -= 1
+
+    def finish(self):
+        return self.count + sum(1 for element_id in self._pending_ids if element_id not in self._label_targets)
+
+    def state(self):
+        # Un <label for> de otra región puede etiquetar los campos pendientes de esta
+        return {'count': self.count, 'pending': self._pending_ids, 'targets': sorted(self._label_targets)}
+
+    @classmethod
+    def merge(cls, states):
+        rule = cls()
+        for state in states:
+            rule.count += state['count']
+            rule._pending_ids.extend(state['pending'])
+            rule._label_targets.update(state['targets'])
+        return rule
+
+
+class _AccessibleNameRule(Rule):
+    """Elementos cuyo nombre accesible sale de su contenido (texto o imágenes con alt)."""
+
+    element = ''
+    wants_text = True
+
+    def __init__(self):
+        super().__init__()
+        # Un indicador por elemento abierto: ¿tiene ya nombre accesible?
+        self._open = []
+
+    def applies(self, attrs) -> bool:
+        return True
+
+    def start(self, tag, attrs):
+        if tag == self.element:
+            if self.applies(attrs):
+                self._open.append(_has_accessible_label(attrs))
+        elif self._open and tag == 'img' and _has_text(attrs, 'alt'):
+            self._open[-1] = True
+
+    def end(self, tag):
+        if tag == self.element and self._open and not self._open.pop():
+            self.count += 1
+
+    def data(self, text):
+        if self._open and not self._open[-1] and not text.isspace():
+            self._open[-1] = True
+
+    def finish(self):
+        return self.count + self._open.count(False)
+
+
+@register_rule
+class EmptyLinkRule(_AccessibleNameRule):
+    id = 'empty-link'
+    criteria = ('2.4.4',)
+    title = "Enlaces sin texto"
+    recommendation = "Dar a cada enlace un texto que describa su destino o un aria-label"
+    tags = frozenset({'a', 'img'})
+    element = 'a'
+
+    def applies(self, attrs):
+        return 'href' in attrs
+
+
+@register_rule
+class EmptyButtonRule(_AccessibleNameRule):
+    id = 'empty-button'
+    criteria = ('4.1.2',)
+    title = "Botones sin nombre accesible"
+    recommendation = "Incluir texto visible en los botones o un aria-label en los botones de solo icono"
+    tags = frozenset({'button', 'img'})
+    element = 'button'
+
+
+@register_rule
+class HeadingSkipRule(Rule):
+    id = 'heading-skip'
+    criteria = ('1.3.1',)
+    title = "Saltos en la jerarquía de encabezados"
+    recommendation = "No saltar niveles de encabezado (por ejemplo, de h2 a h4)"
+    tags = frozenset(HEADING_TAGS)
+
+    def __init__(self):
+        super().__init__()
+        self._first = 0
+        self._previous = 0
+
+    def start(self, tag, attrs):
+        level = int(tag[1])
+        if self._previous and level > self._previous + 1:
+            self.count += 1
+        self._first = self._first or level
+        self._previous = level
+
+    def state(self):
+        return [self.count, self._first, self._previous]
+
+    @classmethod
+    def merge(cls, states):
+        rule = cls()
+        for count, first, last in states:
+            # El salto puede estar entre el último encabezado de una región y el primero de la siguiente
+            if first and rule._previous and first > rule._previous + 1:
+                rule.count += 1
+            rule.count += count
+            rule._previous = last or rule._previous
+        return rule
+
+
+@register_rule
+class DuplicateIdRule(Rule):
+    id = 'duplicate-id'
+    criteria = ('4.1.1',)
+    title = "Atributos id duplicados"
+    recommendation = "Usar valores de id únicos; las referencias de label y ARIA dependen de ellos"
+
+    def __init__(self):
+        super().__init__()
+        self._ids = Counter()
+
+    def start(self, tag, attrs):
+        if attrs:
+            element_id = attrs.get('id')
+            if element_id:
+                self._ids[element_id] += 1
+
+    def finish(self):
+        return sum(1 for seen in self._ids.values() if seen > 1)
+
+    def state(self):
+        return dict(self._ids)
+
+    @classmethod
+    def merge(cls, states):
+        rule = cls()
+        for state in states:
+            rule._ids.update(state)
+        return rule
+
+
+@register_rule
+class PageLangRule(Rule):
+    id = 'page-lang'
+    criteria = ('3.1.1',)
+    title = "Falta atributo lang en el elemento html"
+    recommendation = "Agregar atributo lang='es' (o el idioma correspondiente) al elemento HTML"
+    tags = frozenset({'html'})
+    page_level = True
+
+    def __init__(self):
+        super().__init__()
+        self._has_lang = False
+
+    def start(self, tag, attrs):
+        self._has_lang = self._has_lang or _has_text(attrs, 'lang')
+
+    def finish(self):
+        return 0 if self._has_lang else 1
+
+    def state(self):
+        return self._has_lang
+
+    @classmethod
+    def merge(cls, states):
+        rule = cls()
+        rule._has_lang = any(states)
+        return rule
+
+
+@register_rule
+class PageTitleRule(Rule):
+    id = 'page-title'
+    criteria = ('2.4.2',)
+    title = "Falta un título de página descriptivo"
+    recommendation = "Agregar un elemento <title> que describa el tema o propósito de la página"
+    tags = frozenset({'title'})
+    wants_text = True
+    page_level = True
+
+    def __init__(self):
+        super().__init__()
+        self._in_title = False
+        self._has_title = False
+
+    def start(self, tag, attrs):
+        self._in_title = True
+
+    def end(self, tag):
+        self._in_title = False
+
+    def data(self, text):
+        if self._in_title and not text.isspace():
+            self._has_title = True
+
+    def finish(self):
+        return 0 if self._has_title else 1
+
+    def state(self):
+        return self._has_title
+
+    @classmethod
+    def merge(cls, states):
+        rule = cls()
+        rule._has_title = any(states)
+        return rule
+
+
+@register_rule
+class FocusExcludedRule(Rule):
+    id = 'focus-excluded'
+    criteria = ('2.1.1',)
+    title = "Elementos interactivos excluidos de la navegación por teclado"
+    recommendation = "Eliminar tabindex=\"-1\" de enlaces, botones y campos que deben ser operables con teclado"
+    tags = frozenset(INTERACTIVE_TAGS)
+
+    def start(self, tag, attrs):
+        if attrs.get('tabindex') == '-1':
+            self.count += 1
+
+
+@register_rule
+class PositiveTabindexRule(Rule):
+    id = 'positive-tabindex'
+    criteria = ('2.4.3',)
+    title = "tabindex positivo que altera el orden del foco"
+    recommendation = "Usar tabindex=\"0\" y el orden del documento en lugar de valores positivos"
+
+    def start(self, tag, attrs):
+        if attrs:
+            tabindex = attrs.get('tabindex')
+            if tabindex and tabindex.strip().isdigit() and int(tabindex) > 0:
+                self.count += 1
+
+
+@register_rule
+class BypassBlocksRule(Rule):
+    id = 'bypass-blocks'
+    criteria = ('2.4.1',)
+    title = "Sin enlace de salto ni región principal"
+    recommendation = "Agregar un enlace \"Saltar al contenido\" o un elemento <main> / role=\"main\""
+    page_level = True
+
+    def __init__(self):
+        super().__init__()
+        self._has_bypass = False
+
+    def start(self, tag, attrs):
+        if self._has_bypass:
+            return
+        if tag == 'main' or (attrs and attrs.get('role') == 'main'):
+            self._has_bypass = True
+        elif tag == 'a' and (attrs.get('href') or '').startswith('#') and len(attrs.get('href')) > 1:
+            self._has_bypass = True
+
+    def finish(self):
+        return 0 if self._has_bypass else 1
+
+    def state(self):
+        return self._has_bypass
+
+    @classmethod
+    def merge(cls, states):
+        rule = cls()
+        rule._has_bypass = any(states)
+        return rule
+
+
+@register_rule
+class AutoplayMediaRule(Rule):
+    id = 'autoplay-media'
+    criteria = ('1.4.2',)
+    title = "Audio o vídeo con reproducción automática y sonido"
+    recommendation = "Evitar autoplay o iniciar silenciado (muted) con controles para pausar"
+    tags = frozenset({'audio', 'video'})
+
+    def start(self, tag, attrs):
+        if 'autoplay' in attrs and 'muted' not in attrs:
+            self.count += 1
+
+
+@register_rule
+class ViewportZoomRule(Rule):
+    id = 'viewport-zoom'
+    level = 'AA'
+    criteria = ('1.4.4',)
+    title = "El viewport impide ampliar la página"
+    recommendation = "No usar user-scalable=no ni maximum-scale menor que 2 en la etiqueta meta viewport"
+    tags = frozenset({'meta'})
+    MAXIMUM_SCALE = re.compile(r'maximum-scale=(\d+(?:\.\d+)?)')
+
+    def start(self, tag, attrs):
+        if (attrs.get('name') or '').lower() != 'viewport':
+            return
+        content = (attrs.get('content') or '').lower().replace(' ', '')
+        match = self.MAXIMUM_SCALE.search(content)
+        if 'user-scalable=no' in content or 'user-scalable=0' in content or (match and float(match.group(1)) < 2):
+            self.count += 1
+
+
+@register_rule
+class FrameTitleRule(Rule):
+    id = 'frame-title'
+    criteria = ('4.1.2',)
+    title = "iframes sin título"
+    recommendation = "Agregar un atributo title que describa el contenido de cada iframe"
+    tags = frozenset({'iframe', 'frame'})
+
+    def start(self, tag, attrs):
+        if not _has_accessible_label(attrs) and attrs.get('aria-hidden') != 'true':
+            self.count += 1
+
+
+@register_rule
+class ContrastRule(Rule):
+    """Razones de contraste reales (1.4.3, 1.4.6 y 1.4.11) a partir del CSS del documento."""
+
+    id = 'contrast'
+    criteria = ('1.4.3', '1.4.6', '1.4.11')
+    level = 'AA'
+    title = "Texto con contraste insuficiente"
+    recommendation = "Asegurar un contraste de al menos 4.5:1 para el texto normal y 3:1 para el texto grande"
+    wants_text = True
+
+    def __init__(self):
+        super().__init__()
+        self.analyzer = ContrastAnalyzer()
+        self.start = self.analyzer.start
+        self.end = self.analyzer.end
+        self.data = self.analyzer.data
+        self._report = None
+
+    def report(self):
+        if self._report is None:
+            self._report = self.analyzer.report()
+        return self._report
+
+    def state(self):
+        return self.report()._asdict()
+
+    @classmethod
+    def merge(cls, states):
+        rule = cls()
+        failures_by_tag = Counter()
+        ratios = []
+        totals = Counter()
+        for state in states:
+            failures_by_tag.update(state['failures_by_tag'])
+            if state['min_ratio'] is not None:
+                ratios.append(state['min_ratio'])
+            totals.update({field: state[field] for field in
+                           ('text_nodes', 'undetermined', 'aa_failures', 'aaa_failures', 'non_text_failures')})
+        rule._report = ContrastReport(totals['text_nodes'], totals['undetermined'], totals['aa_failures'],
+                                      totals['aaa_failures'], totals['non_text_failures'], dict(failures_by_tag),
+                                      min(ratios) if ratios else None)
+        return rule
+
+    def messages(self) -> List[str]:
+        """Un mensaje por nodo de texto bajo el mínimo AA, en el formato de `contrast_issues`."""
+        messages = []
+        for tag, count in self.report().failures_by_tag.items():
+            messages.extend([f"Contraste inferior a {AA_NORMAL}:1 en {tag}"] * count)
+        return messages
+
+    def results(self) -> List[Finding]:
+        report = self.report()
+        findings = []
+        if report.aa_failures:
+            findings.append(Finding(self.id, '1.4.3', 'AA', self.title, report.aa_failures, self.recommendation))
+        if report.non_text_failures:
+            findings.append(Finding('contrast-non-text', '1.4.11', 'AA', "Componentes de interfaz con contraste insuficiente",
+                                    report.non_text_failures,
+                                    "Dar a bordes y fondos de controles un contraste de al menos 3:1 con su entorno"))
+        if report.aaa_failures:
+            findings.append(Finding('contrast-enhanced', '1.4.6', 'AAA', "Texto por debajo del contraste mejorado",
+                                    report.aaa_failures,
+                                    "Para nivel AAA, llevar el contraste a 7:1 (4.5:1 en texto grande)"))
+        return findings
+
+
+class RuleEngine:
+    """Instancia las reglas registradas para un documento y les reparte los eventos."""
+
+    def __init__(self, rule_ids=None):
+        self.rules = [rule_class() for rule_id, rule_class in RULES.items() if rule_ids is None or rule_id in rule_ids]
+        self._any_start, self._any_end = [], []
+        self._start, self._end = defaultdict(list), defaultdict(list)
+        # Con WCAG_TRACE_RULES=1 cada manejador se envuelve para medir el tiempo de su regla
+        self._rule_seconds = defaultdict(float) if RULE_TIMING else None
+        handler = self._timed if RULE_TIMING else (lambda rule, method: method)
+        for rule in self.rules:
+            overrides_end = type(rule).end is not Rule.end or 'end' in vars(rule)
+            if rule.tags is None:
+                self._any_start.append(handler(rule, rule.start))
+                if overrides_end:
+                    self._any_end.append(handler(rule, rule.end))
+            else:
+                start = handler(rule, rule.start)
+                end = handler(rule, rule.end) if overrides_end else None
+                for tag in rule.tags:
+                    self._start[tag].append(start)
+                    if end is not None:
+                        self._end[tag].append(end)
+        self._text = [handler(rule, rule.data) for rule in self.rules if rule.wants_text]
+
+    def _timed(self, rule: Rule, method):
+        seconds, rule_id, clock = self._rule_seconds, rule.id, time.perf_counter
+
+        def timed(*args):
+            started = clock()
+            method(*args)
+            seconds[rule_id] += clock() - started
+        return timed
+
+    def _record_timings(self) -> None:
+        if self._rule_seconds:
+            for rule_id, seconds in self._rule_seconds.items():
+                record('rule', seconds, rule=rule_id)
+            self._rule_seconds.clear()
+
+    def start(self, tag: str, attrs) -> None:
+        for handler in self._any_start:
+            handler(tag, attrs)
+        for handler in self._start.get(tag, ()):
+            handler(tag, attrs)
+
+    def end(self, tag: str) -> None:
+        for handler in self._any_end:
+            handler(tag)
+        for handler in self._end.get(tag, ()):
+            handler(tag)
+
+    def data(self, text: str) -> None:
+        for handler in self._text:
+            handler(text)
+
+    def get(self, rule_id: str) -> Rule | None:
+        return next((rule for rule in self.rules if rule.id == rule_id), None)
+
+    def states(self) -> Dict:
+        self._record_timings()
+        return {rule.id: rule.state() for rule in self.rules}
+
+    @classmethod
+    def merged(cls, region_states: List[Dict]) -> 'RuleEngine':
+        """Motor ya evaluado a partir de los `states()` de cada región, en orden del documento."""
+        engine = cls(rule_ids=())
+        engine.rules = [rule_class.merge([states[rule_id] for states in region_states])
+                        for rule_id, rule_class in RULES.items()
+                        if region_states and all(rule_id in states for states in region_states)]
+        return engine
+
+    def findings(self) -> List[Finding]:
+        self._record_timings()
+        return [finding for rule in self.rules for finding in rule.results()]
+
+
+def issue_text(finding: Dict) -> str:
+    return f"{finding['criteria']} {finding['title']} ({finding['count']})"
+
+
+def evaluate_offline(analysis_data: Dict) -> Dict:
+    """Veredicto local en milisegundos a partir de los incumplimientos de las reglas.
+
+    Los de componentes de plantilla compartidos (`template_findings`) cuentan en la puntuación
+    pero se listan aparte, en `template_issues`.
+    """
+    findings = analysis_data.get('rule_findings') or []
+    template_findings = analysis_data.get('template_findings') or []
+    # Una regla incumplida en la plantilla y en la página puntúa como un único incumplimiento
+    counts, levels = Counter(), {}
+    for finding in findings + template_findings:
+        counts[finding['rule']] += finding['count']
+        levels[finding['rule']] = finding['level']
+    score = 100.0
+    for rule_id, count in counts.items():
+        # Un incumplimiento aislado resta la mitad del peso; diez o más, el peso completo
+        score -= LEVEL_WEIGHTS[levels[rule_id]] * min(1.0, 0.5 + count / 20)
+    failed_levels = set(levels.values())
+    score = max(0, round(score))
+    # Las comprobaciones automáticas no bastan para declarar AAA
+    level = "No conforme" if 'A' in failed_levels else "A" if 'AA' in failed_levels else "AA"
+
+    issues = [issue_text(finding) for finding in findings]
+    recommendations = list(dict.fromkeys(finding['recommendation'] for finding in findings + template_findings))
+    result = {
+        'level': level,
+        'score': score,
+        'issues': issues,
+        'recommendations': recommendations,
+        'summary': f"Evaluación local con {len(RULES)} reglas automáticas: {len(counts)} incumplidas. "
+                   f"Puntuación: {score}/100",
+        'engine': 'local',
+    }
+    if 'template_findings' in analysis_data:
+        result['template_issues'] = [issue_text(finding) for finding in template_findings]
+    return result